@@ -3,8 +3,10 @@ from __future__ import annotations
 import logging
 from abc import abstractmethod
 from collections import defaultdict
-from collections.abc import Callable, Collection
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Collection, Generator, Mapping
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
 from threading import Lock
 from typing import Any
 
@@ -12,15 +14,32 @@ from attrs import define, field
 
 from cloudshell.logging.context_filters import pass_log_context  # type: ignore
 
+from cloudshell.shell.flows.connectivity.helpers.action_results import (
+    get_response_emsg,
+)
+from cloudshell.shell.flows.connectivity.helpers.context_executor import (
+    ContextExecutor,
+)
+from cloudshell.shell.flows.connectivity.helpers.json_backend import JsonBackend
+from cloudshell.shell.flows.connectivity.helpers.limited_executor import (
+    execute_limited,
+)
+from cloudshell.shell.flows.connectivity.helpers.pipeline_executor import (
+    Phase,
+    execute_pipelines,
+)
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.helpers.target_cache import TargetCache
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectivityActionModel,
-    get_vm_uuid,
+    get_resource_name,
     get_vm_uuid_or_target,
-    get_vnic,
 )
 from cloudshell.shell.flows.connectivity.models.driver_response import (
-    ConnectivityActionResult,
-    DriverResponseRoot,
+    ActionResult,
+    serialize_response,
 )
 from cloudshell.shell.flows.connectivity.parse_request_service import (
     AbstractParseConnectivityService,
@@ -31,28 +50,67 @@ logger = logging.getLogger(__name__)
 
 @define
 class AbcConnectivityFlow:
+    """Base connectivity flow.
+
+    :param max_workers: number of threads used for the request, by default depends
+        on the CPU count
+    :param executor: long-lived executor shared between requests, it isn't shut down
+        by the flow; max_workers is ignored if it's set. Tasks of the request are
+        executed in the context of the request, e.g. with its log context
+    :param target_cache: cache of loaded targets shared between requests, checked
+        before load_target
+    :param max_concurrent_actions_per_resource: limit of groups of actions executed
+        at the same time for one resource (resource part of the action target name),
+        the rest are queued; not limited by default
+    :param pipeline_targets: execute clear, remove, set and rollback phases per
+        target (VM for Cloud Providers) instead of waiting for every target to
+        finish the phase, slow target doesn't hold up others
+    :param ordered_results: merge messages and interfaces of sub actions in the
+        order of the request instead of sets, identical requests give identical
+        responses
+    :param json_backend: backend to dump the response, the fastest installed
+        (orjson, ujson, json) by default
+    """
+
     _parse_connectivity_request_service: AbstractParseConnectivityService
-    results: dict[str, list[ConnectivityActionResult]] = field(
-        init=False, factory=lambda: defaultdict(list)
-    )
+    max_workers: int | None = field(default=None, kw_only=True)
+    _executor: Executor | None = field(default=None, kw_only=True)
+    max_concurrent_actions_per_resource: int | None = field(default=None, kw_only=True)
+    target_cache: TargetCache | None = field(default=None, kw_only=True)
+    pipeline_targets: bool = field(default=False, kw_only=True)
+    ordered_results: bool = field(default=False, kw_only=True)
+    json_backend: JsonBackend | None = field(default=None, kw_only=True)
+    results: ResultsAggregator = field(init=False)
     _targets_map: dict[str, Any] = field(init=False, factory=dict)
+    _loading_targets: dict[str, Future[Any]] = field(init=False, factory=dict)
+    # errors of the targets failed to prefetch in the running request
+    _prefetch_errors: dict[str, Exception] = field(init=False, factory=dict)
     _get_target_lock: Lock = field(init=False, factory=Lock)
 
+    @results.default
+    def _create_results(self) -> ResultsAggregator:
+        return ResultsAggregator(self.ordered_results)
+
     def apply_connectivity(self, request: str) -> str:
         logger.debug(f"Apply connectivity request: {request}")
         actions = self.parse_request(request)
         self.validate_actions(actions)
+        self.results.register(actions)
 
-        with ThreadPoolExecutor(initializer=pass_log_context()) as executor:
+        with self._get_executor() as executor:
             try:
                 self.pre_connectivity(actions, executor)
-                self._clear_targets(actions, executor)
-                remove_actions = self._prepare_remove_actions(actions)
-                tuple(executor.map(self.remove_vlans, remove_actions))
+                self._prefetch_targets(actions, executor)
+                if self.pipeline_targets:
+                    self._execute_pipelines(actions, executor)
+                else:
+                    self._clear_targets(actions, executor)
+                    remove_actions = self._prepare_remove_actions(actions)
+                    self._execute_groups(self.remove_vlans, remove_actions, executor)
 
-                set_actions = self._prepare_set_actions(actions)
-                tuple(executor.map(self.set_vlans, set_actions))
-                self._rollback_failed_set_actions(set_actions, executor)
+                    set_actions = self._prepare_set_actions(actions, executor)
+                    self._execute_groups(self.set_vlans, set_actions, executor)
+                    self._rollback_failed_set_actions(set_actions, executor)
             finally:
                 self.post_connectivity(actions, executor)
 
@@ -60,6 +118,17 @@ class AbcConnectivityFlow:
         logger.debug(f"Connectivity result: {result}")
         return result
 
+    @contextmanager
+    def _get_executor(self) -> Generator[Executor, None, None]:
+        if self._executor is not None:
+            # threads of the shared executor have the context of another request
+            yield ContextExecutor(self._executor)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=self.max_workers, initializer=pass_log_context()
+            ) as executor:
+                yield executor
+
     def parse_request(self, request: str) -> list[ConnectivityActionModel]:
         """Parse request and return list of actions.
 
@@ -73,7 +142,7 @@ class AbcConnectivityFlow:
         pass
 
     def pre_connectivity(
-        self, actions: Collection[ConnectivityActionModel], executor: ThreadPoolExecutor
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
     ) -> None:
         """Executes before set/remove VLAN actions."""
         pass
@@ -111,7 +180,7 @@ class AbcConnectivityFlow:
         raise NotImplementedError()
 
     def post_connectivity(
-        self, actions: Collection[ConnectivityActionModel], executor: ThreadPoolExecutor
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
     ) -> None:
         """Executes after set/remove VLAN actions."""
         pass
@@ -119,20 +188,204 @@ class AbcConnectivityFlow:
     def load_target(self, target_name: str) -> Any:
         return None
 
+    def load_targets(self, target_names: Collection[str]) -> Mapping[str, Any]:
+        """Load several targets at once, e.g. with one API call.
+
+        Returns targets by names, missed targets will be loaded with load_target.
+        If it isn't implemented targets are loaded in parallel with load_target.
+        """
+        raise NotImplementedError
+
+    def _get_target_names(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[str]:
+        """Names of the targets that will be loaded for the actions."""
+        return {get_vm_uuid_or_target(a) for a in actions}
+
+    def _prefetch_targets(
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
+    ) -> None:
+        """Load all the targets before set/remove actions."""
+        self._prefetch_errors = {}
+        target_names = set(self._get_target_names(actions))
+        target_names -= self._targets_map.keys()
+        if self.target_cache is not None:
+            target_names = set(filter(self._set_target_from_cache, target_names))
+        if not target_names:
+            return
+
+        try:
+            targets = self.load_targets(target_names)
+        except NotImplementedError:
+            # targets are loaded on demand if load_target isn't implemented either
+            if type(self).load_target is not AbcConnectivityFlow.load_target:
+                wait([executor.submit(self._prefetch_target, n) for n in target_names])
+        except Exception:
+            logger.exception("Failed to prefetch targets, will load them one by one")
+        else:
+            self._store_targets(targets)
+
+    def _prefetch_target(self, target_name: str) -> None:
+        try:
+            target = self.load_target(target_name)
+        except Exception as e:
+            # the error is raised again while executing actions of the target
+            logger.exception(f"Failed to prefetch target {target_name}")
+            with self._get_target_lock:
+                self._prefetch_errors[target_name] = e
+        else:
+            self._store_targets({target_name: target})
+
+    def _store_targets(self, targets: Mapping[str, Any]) -> None:
+        with self._get_target_lock:
+            self._targets_map.update(targets)
+        if self.target_cache is not None:
+            for target_name, target in targets.items():
+                self.target_cache.set(target_name, target)
+
+    def _set_target_from_cache(self, target_name: str) -> bool:
+        """Move the target from the shared cache, returns True if it's missed."""
+        assert self.target_cache is not None
+        try:
+            target = self.target_cache.get(target_name)
+        except KeyError:
+            return True
+        with self._get_target_lock:
+            self._targets_map[target_name] = target
+        return False
+
     def get_target(self, target_name_or_action: str | ConnectivityActionModel) -> Any:
+        """Get target from the cache or load it.
+
+        Concurrent calls for the same target share one loading, different targets
+        are loaded in parallel. Failed loading isn't cached, except the targets
+        failed to prefetch, they aren't loaded again during the request.
+        """
         if isinstance(target_name_or_action, ConnectivityActionModel):
             target_name = get_vm_uuid_or_target(target_name_or_action)
         else:
             target_name = target_name_or_action
 
+        # cache hit doesn't need the lock
+        try:
+            return self._targets_map[target_name]
+        except KeyError:
+            pass
+
         with self._get_target_lock:
             try:
-                target = self._targets_map[target_name]
+                return self._targets_map[target_name]
             except KeyError:
-                target = self.load_target(target_name)
-                self._targets_map[target_name] = target
+                pass
+            if (error := self._prefetch_errors.get(target_name)) is not None:
+                raise error
+            future = self._loading_targets.get(target_name)
+            is_loader = future is None
+            if future is None:
+                future = self._loading_targets[target_name] = Future()
+
+        if not is_loader:
+            # another thread is loading the target, wait for it
+            return future.result()
+
+        # load without the lock, other targets can be loaded in parallel
+        try:
+            target = self._load_target_cached(target_name)
+        except BaseException as e:
+            with self._get_target_lock:
+                del self._loading_targets[target_name]
+            future.set_exception(e)
+            raise
+        with self._get_target_lock:
+            self._targets_map[target_name] = target
+            del self._loading_targets[target_name]
+        future.set_result(target)
         return target
 
+    def _load_target_cached(self, target_name: str) -> Any:
+        if self.target_cache is None:
+            return self.load_target(target_name)
+        try:
+            return self.target_cache.get(target_name)
+        except KeyError:
+            target = self.load_target(target_name)
+            self.target_cache.set(target_name, target)
+            return target
+
+    def _execute_groups(
+        self,
+        fn: Callable[[Collection[ConnectivityActionModel]], None],
+        groups: Collection[Collection[ConnectivityActionModel]],
+        executor: Executor,
+        raise_errors: bool = True,
+    ) -> None:
+        """Execute groups of actions in parallel and wait for them.
+
+        Number of groups executed at the same time for one resource is limited by
+        max_concurrent_actions_per_resource.
+        """
+        futures = execute_limited(
+            executor,
+            fn,
+            groups,
+            key_fn=lambda group: get_resource_name(next(iter(group))),
+            limit=self.max_concurrent_actions_per_resource,
+        )
+        if raise_errors:
+            for future in futures:
+                future.result()
+
+    def _execute_pipelines(
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
+    ) -> None:
+        """Execute phases for every target independently."""
+        actions_by_key: dict[str, list[ConnectivityActionModel]] = defaultdict(list)
+        for action in actions:
+            actions_by_key[self._get_pipeline_key(action)].append(action)
+
+        execute_pipelines(
+            executor,
+            [self._iterate_phases(actions) for actions in actions_by_key.values()],
+            key_fn=lambda group: get_resource_name(next(iter(group))),
+            limit=self.max_concurrent_actions_per_resource,
+        )
+
+    def _get_pipeline_key(self, action: ConnectivityActionModel) -> str:
+        """Actions with the same key are executed in one pipeline."""
+        return get_vm_uuid_or_target(action)
+
+    def _iterate_phases(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Generator[Phase[Collection[ConnectivityActionModel]], None, None]:
+        """Phases for the actions of one pipeline.
+
+        The same as clear, remove, set and rollback steps of apply_connectivity,
+        the next phase is prepared when the previous one is done.
+        """
+        clear_groups = [(a,) for a in self._prepare_clear_actions(actions)]
+        clear_fn = partial(self._execute_actions, self.clear)
+        yield Phase(clear_fn, clear_groups, raise_errors=False)
+
+        yield Phase(self.remove_vlans, self._prepare_remove_actions(actions))
+
+        # prepared in the pipeline worker, do not wait for other tasks of the executor
+        set_actions = self._prepare_set_actions(actions)
+        yield Phase(self.set_vlans, set_actions)
+
+        rollback_groups = [(a,) for a in self._prepare_rollback_actions(set_actions)]
+        yield Phase(self._clear_group, rollback_groups, raise_errors=False)
+
+    def _clear_actions(
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
+    ) -> None:
+        """Execute clear for the actions, ignore results."""
+        groups = [(a,) for a in actions]
+        self._execute_groups(self._clear_group, groups, executor, raise_errors=False)
+
+    def _clear_group(self, actions: Collection[ConnectivityActionModel]) -> None:
+        for action in actions:
+            self.clear(action, self.get_target(action))
+
     def _execute_actions(
         self,
         fn: Callable[[ConnectivityActionModel, Any], str],
@@ -147,36 +400,50 @@ class AbcConnectivityFlow:
         for action in actions:
             if failed_action:
                 logger.debug(f"Skip action {action} due to previous failure")
-                result = ConnectivityActionResult.skip_result(action)
+                result = ActionResult.skip_result(action)
             else:
                 target = self.get_target(action)
                 try:
                     iface = fn(action, target)
                 except Exception as e:
-                    emsg = _get_response_emsg(action, e)
+                    emsg = get_response_emsg(action, e)
                     logger.exception(emsg)
-                    result = ConnectivityActionResult.fail_result(action, emsg)
+                    result = ActionResult.fail_result(action, emsg)
                     failed_action = action
                 else:
-                    result = ConnectivityActionResult.success_result(
-                        action, iface=iface
-                    )
+                    result = ActionResult.success_result(action, iface=iface)
 
-            self.results[result.actionId].append(result)
+            self.results.add(action, result)
 
-    @abstractmethod
     def _rollback_failed_set_actions(
         self,
         set_actions: Collection[Collection[ConnectivityActionModel]],
-        executor: ThreadPoolExecutor,
+        executor: Executor,
     ) -> None:
-        raise NotImplementedError
+        actions_to_rollback = self._prepare_rollback_actions(set_actions)
+        # execute clear actions, ignore results
+        self._clear_actions(actions_to_rollback, executor)
 
-    @abstractmethod
     def _clear_targets(
-        self, actions: Collection[ConnectivityActionModel], executor: ThreadPoolExecutor
+        self, actions: Collection[ConnectivityActionModel], executor: Executor
     ) -> None:
         """Remove all VLANs for the targets."""
+        groups = [(a,) for a in self._prepare_clear_actions(actions)]
+        clear_fn = partial(self._execute_actions, self.clear)
+        self._execute_groups(clear_fn, groups, executor, raise_errors=False)
+
+    @abstractmethod
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
+        """Prepare actions which targets are cleared before remove and set actions."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        """Prepare failed set actions which targets are cleared."""
         raise NotImplementedError
 
     @abstractmethod
@@ -193,61 +460,26 @@ class AbcConnectivityFlow:
 
     @abstractmethod
     def _prepare_set_actions(
-        self, actions: Collection[ConnectivityActionModel]
+        self,
+        actions: Collection[ConnectivityActionModel],
+        executor: Executor | None = None,
     ) -> Collection[Collection[ConnectivityActionModel]]:
         """Prepare set actions.
 
         Return list of actions in groups.
         Groups of actions will be executed in parallel.
         Actions in group will be executed in sequence.
+
+        :param executor: executor to prepare the actions in parallel, None if the
+            actions have to be prepared in the current thread
         """
         raise NotImplementedError
 
     def _get_result(self) -> str:
-        single_results: dict[str, ConnectivityActionResult] = {}
-        for action_id, results in self.results.items():
-            for result in results:
-                if existed_result := single_results.get(action_id):
-                    _merge_results(existed_result, result)
-                else:
-                    single_results[action_id] = result
-
-        return str(
-            DriverResponseRoot.prepare_response(list(single_results.values())).json()
-        )
-
-
-def _merge_results(ex: ConnectivityActionResult, new: ConnectivityActionResult) -> None:
-    ex.success = ex.success and new.success
-    if ex.success:
-        ex.infoMessage = _merge_result_messages(ex.infoMessage, new.infoMessage)
-    else:
-        ex.infoMessage = ""  # clear info message if any of actions failed
-
-    ex.errorMessage = _merge_result_messages(ex.errorMessage, new.errorMessage)
-    ex.updatedInterface = _merge_ifaces(ex.updatedInterface, new.updatedInterface)
-
-
-def _merge_result_messages(ex: str, new: str) -> str:
-    messages = set(ex.split("\n"))
-    messages.add(new)
-    return "\n".join(filter(bool, messages))
-
-
-def _merge_ifaces(ex: str, new: str) -> str:
-    ifaces = set(ex.split(";"))
-    ifaces.add(new)
-    return ";".join(filter(bool, ifaces))
+        return _results_to_response(self.results.get_records(), self.json_backend)
 
 
-def _get_response_emsg(action: ConnectivityActionModel, e: Exception) -> str:
-    vlan = action.connection_params.vlan_id
-    target_name = action.action_target.name
-    type_ = action.type.value
-    emsg = f"Failed to {type_} {vlan} for {target_name}"
-    if vm_uuid := get_vm_uuid(action):
-        emsg += f" on VM ID {vm_uuid}"
-        if vnic := get_vnic(action):
-            emsg += f" for vNIC {vnic}"
-    emsg = f"{emsg}. Error: {e}"
-    return emsg
+def _results_to_response(
+    results: list[ActionResult], json_backend: JsonBackend | None = None
+) -> str:
+    return serialize_response(results, json_backend)
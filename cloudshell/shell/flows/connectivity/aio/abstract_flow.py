@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import abstractmethod
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Collection, Mapping
+from functools import partial
+from typing import Any
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.abstrace_flow import (
+    _results_to_response,
+)
+from cloudshell.shell.flows.connectivity.helpers.action_results import (
+    get_response_emsg,
+)
+from cloudshell.shell.flows.connectivity.helpers.json_backend import JsonBackend
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.helpers.target_cache import TargetCache
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+    get_resource_name,
+    get_vm_uuid_or_target,
+)
+from cloudshell.shell.flows.connectivity.models.driver_response import (
+    ActionResult,
+)
+from cloudshell.shell.flows.connectivity.parse_request_service import (
+    AbstractParseConnectivityService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class AbcAsyncConnectivityFlow:
+    """Base asyncio connectivity flow.
+
+    The same as AbcConnectivityFlow but hooks are coroutines and groups of actions
+    are executed as tasks in the running event loop instead of threads.
+
+    :param target_cache: cache of loaded targets shared between requests, checked
+        before load_target
+    :param max_concurrent_actions_per_resource: limit of groups of actions executed
+        at the same time for one resource (resource part of the action target name),
+        the rest are waiting; not limited by default
+    :param pipeline_targets: execute clear, remove, set and rollback phases per
+        target (VM for Cloud Providers) instead of waiting for every target to
+        finish the phase, slow target doesn't hold up others
+    :param ordered_results: merge messages and interfaces of sub actions in the
+        order of the request instead of sets, identical requests give identical
+        responses
+    :param json_backend: backend to dump the response, the fastest installed
+        (orjson, ujson, json) by default
+    """
+
+    _parse_connectivity_request_service: AbstractParseConnectivityService
+    max_concurrent_actions_per_resource: int | None = field(default=None, kw_only=True)
+    target_cache: TargetCache | None = field(default=None, kw_only=True)
+    pipeline_targets: bool = field(default=False, kw_only=True)
+    ordered_results: bool = field(default=False, kw_only=True)
+    json_backend: JsonBackend | None = field(default=None, kw_only=True)
+    results: ResultsAggregator = field(init=False)
+    _targets_tasks: dict[str, asyncio.Future[Any]] = field(init=False, factory=dict)
+    # errors of the targets failed to prefetch in the running request
+    _prefetch_errors: dict[str, Exception] = field(init=False, factory=dict)
+    _resource_semaphores: dict[str, asyncio.Semaphore] = field(init=False, factory=dict)
+
+    @results.default
+    def _create_results(self) -> ResultsAggregator:
+        return ResultsAggregator(self.ordered_results)
+
+    async def apply_connectivity(self, request: str) -> str:
+        logger.debug(f"Apply connectivity request: {request}")
+        actions = self.parse_request(request)
+        await self.validate_actions(actions)
+        self.results.register(actions)
+
+        try:
+            await self.pre_connectivity(actions)
+            await self._prefetch_targets(actions)
+            if self.pipeline_targets:
+                await self._execute_pipelines(actions)
+            else:
+                await self._execute_phases(actions)
+        finally:
+            await self.post_connectivity(actions)
+
+        result = self._get_result()
+        logger.debug(f"Connectivity result: {result}")
+        return result
+
+    def parse_request(self, request: str) -> list[ConnectivityActionModel]:
+        """Parse request and return list of actions.
+
+        Split VLANs on different actions based on a configuration.
+        Split VMs vNICs on different actions.
+        """
+        actions = self._parse_connectivity_request_service.get_actions(request)
+        return actions
+
+    async def validate_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        pass
+
+    async def pre_connectivity(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Executes before set/remove VLAN actions."""
+        pass
+
+    async def set_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        """Set VLANs for the sequence of actions."""
+        await self._execute_actions(self.set_vlan, actions)
+
+    async def remove_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        """Remove VLANs for the sequence of actions."""
+        await self._execute_actions(self.remove_vlan, actions)
+
+    @abstractmethod
+    async def clear(self, action: ConnectivityActionModel, target: Any) -> str:
+        """Executes before set VLAN actions or for rolling back failed.
+
+        Returns updated interface if it's different from target name.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_vlan(self, action: ConnectivityActionModel, target: Any) -> str:
+        """Execute set VLAN action for the target.
+
+        Returns updated interface if it's different from target name.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def remove_vlan(self, action: ConnectivityActionModel, target: Any) -> str:
+        """Remove VLAN for the target.
+
+        Returns updated interface if it's different from target name.
+        """
+        raise NotImplementedError
+
+    async def post_connectivity(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Executes after set/remove VLAN actions."""
+        pass
+
+    async def load_target(self, target_name: str) -> Any:
+        return None
+
+    async def load_targets(self, target_names: Collection[str]) -> Mapping[str, Any]:
+        """Load several targets at once, e.g. with one API call.
+
+        Returns targets by names, missed targets will be loaded with load_target.
+        If it isn't implemented targets are loaded concurrently with load_target.
+        """
+        raise NotImplementedError
+
+    def _get_target_names(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[str]:
+        """Names of the targets that will be loaded for the actions."""
+        return {get_vm_uuid_or_target(a) for a in actions}
+
+    async def _prefetch_targets(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Load all the targets before set/remove actions."""
+        self._prefetch_errors = {}
+        target_names = set(self._get_target_names(actions))
+        target_names -= self._targets_tasks.keys()
+        if self.target_cache is not None:
+            target_names = set(filter(self._set_target_from_cache, target_names))
+        if not target_names:
+            return
+
+        try:
+            targets = await self.load_targets(target_names)
+        except NotImplementedError:
+            # targets are loaded on demand if load_target isn't implemented either
+            if type(self).load_target is not AbcAsyncConnectivityFlow.load_target:
+                await asyncio.gather(*map(self._prefetch_target, target_names))
+        except Exception:
+            logger.exception("Failed to prefetch targets, will load them one by one")
+        else:
+            self._store_targets(targets)
+
+    async def _prefetch_target(self, target_name: str) -> None:
+        try:
+            target = await self.load_target(target_name)
+        except Exception as e:
+            # the error is raised again while executing actions of the target
+            logger.exception(f"Failed to prefetch target {target_name}")
+            self._prefetch_errors[target_name] = e
+        else:
+            self._store_targets({target_name: target})
+
+    def _store_targets(self, targets: Mapping[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        for target_name, target in targets.items():
+            future = loop.create_future()
+            future.set_result(target)
+            self._targets_tasks[target_name] = future
+            if self.target_cache is not None:
+                self.target_cache.set(target_name, target)
+
+    def _set_target_from_cache(self, target_name: str) -> bool:
+        """Move the target from the shared cache, returns True if it's missed."""
+        assert self.target_cache is not None
+        try:
+            target = self.target_cache.get(target_name)
+        except KeyError:
+            return True
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(target)
+        self._targets_tasks[target_name] = future
+        return False
+
+    async def get_target(
+        self, target_name_or_action: str | ConnectivityActionModel
+    ) -> Any:
+        """Get target, concurrent calls for the same target share one loading.
+
+        Targets failed to prefetch aren't loaded again during the request.
+        """
+        if isinstance(target_name_or_action, ConnectivityActionModel):
+            target_name = get_vm_uuid_or_target(target_name_or_action)
+        else:
+            target_name = target_name_or_action
+
+        if (error := self._prefetch_errors.get(target_name)) is not None:
+            raise error
+        try:
+            task = self._targets_tasks[target_name]
+        except KeyError:
+            task = asyncio.ensure_future(self._load_target_cached(target_name))
+            self._targets_tasks[target_name] = task
+
+        try:
+            # shield the loading from cancellation of one of the waiters
+            return await asyncio.shield(task)
+        except Exception:
+            # do not cache failed loading, next call will try again
+            if self._targets_tasks.get(target_name) is task:
+                del self._targets_tasks[target_name]
+            raise
+
+    async def _load_target_cached(self, target_name: str) -> Any:
+        if self.target_cache is None:
+            return await self.load_target(target_name)
+        try:
+            return self.target_cache.get(target_name)
+        except KeyError:
+            target = await self.load_target(target_name)
+            self.target_cache.set(target_name, target)
+            return target
+
+    def _get_resource_semaphore(self, resource_name: str) -> asyncio.Semaphore | None:
+        if not self.max_concurrent_actions_per_resource:
+            return None
+        try:
+            semaphore = self._resource_semaphores[resource_name]
+        except KeyError:
+            semaphore = asyncio.Semaphore(self.max_concurrent_actions_per_resource)
+            self._resource_semaphores[resource_name] = semaphore
+        return semaphore
+
+    async def _execute_groups(
+        self,
+        fn: Callable[[Collection[ConnectivityActionModel]], Awaitable[None]],
+        groups: Collection[Collection[ConnectivityActionModel]],
+        raise_errors: bool = True,
+    ) -> None:
+        """Execute groups of actions concurrently and wait for them.
+
+        Number of groups executed at the same time for one resource is limited by
+        max_concurrent_actions_per_resource.
+        """
+
+        async def execute_group(group: Collection[ConnectivityActionModel]) -> None:
+            resource_name = get_resource_name(next(iter(group)))
+            semaphore = self._get_resource_semaphore(resource_name)
+            if semaphore is None:
+                await fn(group)
+            else:
+                async with semaphore:
+                    await fn(group)
+
+        results = await asyncio.gather(
+            *map(execute_group, groups), return_exceptions=True
+        )
+        if raise_errors:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+    async def _execute_pipelines(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Execute phases for every target independently."""
+        actions_by_key: dict[str, list[ConnectivityActionModel]] = defaultdict(list)
+        for action in actions:
+            actions_by_key[self._get_pipeline_key(action)].append(action)
+
+        results = await asyncio.gather(
+            *map(self._execute_phases, actions_by_key.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def _get_pipeline_key(self, action: ConnectivityActionModel) -> str:
+        """Actions with the same key are executed in one pipeline."""
+        return get_vm_uuid_or_target(action)
+
+    async def _execute_phases(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Execute clear, remove, set and rollback phases for the actions."""
+        await self._clear_targets(actions)
+        remove_actions = await self._prepare_remove_actions(actions)
+        await self._execute_groups(self.remove_vlans, remove_actions)
+
+        set_actions = await self._prepare_set_actions(actions)
+        await self._execute_groups(self.set_vlans, set_actions)
+        await self._rollback_failed_set_actions(set_actions)
+
+    async def _clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Execute clear for the actions, ignore results."""
+
+        async def clear(group: Collection[ConnectivityActionModel]) -> None:
+            for action in group:
+                await self.clear(action, await self.get_target(action))
+
+        groups = [(a,) for a in actions]
+        await self._execute_groups(clear, groups, raise_errors=False)
+
+    async def _execute_actions(
+        self,
+        fn: Callable[[ConnectivityActionModel, Any], Awaitable[str]],
+        actions: Collection[ConnectivityActionModel],
+    ) -> None:
+        """Execute actions sequentially and save results."""
+        action_targets = {action.action_target.name for action in actions}
+        action_vm_uuids = {action.custom_action_attrs.vm_uuid for action in actions}
+        assert len(action_targets) == 1 and len(action_vm_uuids) in (1, 0)
+
+        failed_action = None
+        for action in actions:
+            if failed_action:
+                logger.debug(f"Skip action {action} due to previous failure")
+                result = ActionResult.skip_result(action)
+            else:
+                target = await self.get_target(action)
+                try:
+                    iface = await fn(action, target)
+                except Exception as e:
+                    emsg = get_response_emsg(action, e)
+                    logger.exception(emsg)
+                    result = ActionResult.fail_result(action, emsg)
+                    failed_action = action
+                else:
+                    result = ActionResult.success_result(action, iface=iface)
+
+            self.results.add(action, result)
+
+    async def _rollback_failed_set_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> None:
+        actions_to_rollback = self._prepare_rollback_actions(set_actions)
+        # execute clear actions, ignore results
+        await self._clear_actions(actions_to_rollback)
+
+    async def _clear_targets(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        """Remove all VLANs for the targets."""
+        groups = [(a,) for a in self._prepare_clear_actions(actions)]
+        clear_fn = partial(self._execute_actions, self.clear)
+        await self._execute_groups(clear_fn, groups, raise_errors=False)
+
+    @abstractmethod
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
+        """Prepare actions which targets are cleared before remove and set actions."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        """Prepare failed set actions which targets are cleared."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _prepare_remove_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[Collection[ConnectivityActionModel]]:
+        """Prepare remove actions.
+
+        Return list of actions in groups.
+        Groups of actions will be executed concurrently.
+        Actions in group will be executed in sequence.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _prepare_set_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[Collection[ConnectivityActionModel]]:
+        """Prepare set actions.
+
+        Return list of actions in groups.
+        Groups of actions will be executed concurrently.
+        Actions in group will be executed in sequence.
+        """
+        raise NotImplementedError
+
+    def _get_result(self) -> str:
+        return _results_to_response(self.results.get_records(), self.json_backend)
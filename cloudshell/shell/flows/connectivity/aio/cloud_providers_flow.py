@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import abstractmethod
+from collections.abc import Collection, Sequence
+from itertools import chain
+from typing import Any, ClassVar
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.aio.abstract_flow import (
+    AbcAsyncConnectivityFlow,
+)
+from cloudshell.shell.flows.connectivity.cloud_providers_flow import (
+    _get_actions_to_rollback,
+    _group_actions_by_vm,
+    _save_prepare_vm_error,
+    _validate_not_duplicated_vnics,
+)
+from cloudshell.shell.flows.connectivity.helpers.action_results import (
+    BatchResult,
+    save_batch_result,
+)
+from cloudshell.shell.flows.connectivity.helpers.group_cp_actions import (
+    NewVnicsGroup,
+    group_actions,
+)
+from cloudshell.shell.flows.connectivity.helpers.vnic_inventory import VnicInventory
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+    get_vm_uuid,
+    get_vnic,
+    is_remove_action,
+    is_set_action,
+)
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class AbcAsyncCloudProviderConnectivityFlow(AbcAsyncConnectivityFlow):
+    """Base asyncio connectivity flow for Cloud Providers.
+
+    vNICs of the VMs are kept in vnics_inventory during the request, use
+    get_cached_vnics in set_vlan, clear, etc. instead of getting them again.
+    """
+
+    # if True actions creating new vNICs on one VM are passed to create_vnics_batch
+    # at once instead of calling set_vlan per action
+    batch_new_vnics_per_vm: ClassVar[bool] = False
+
+    vnics_inventory: VnicInventory = field(init=False, factory=VnicInventory)
+
+    async def apply_connectivity(self, request: str) -> str:
+        # vNICs can be changed between the requests
+        self.vnics_inventory = VnicInventory()
+        return await super().apply_connectivity(request)
+
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
+        """Do not clear targets for Cloud Provider."""
+        return ()
+
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_rollback(set_actions, self.results)
+
+    @abstractmethod
+    async def get_vnics(self, vm: Any) -> Collection[VnicInfo]:
+        raise NotImplementedError
+
+    async def get_cached_vnics(self, vm_uuid: str) -> list[VnicInfo]:
+        """Get vNICs of the VM from the inventory or with get_vnics.
+
+        vNICs created or replaced by successful set actions are updated.
+        """
+        try:
+            return self.vnics_inventory.get(vm_uuid)
+        except KeyError:
+            pass
+        vnics = await self.get_vnics(await self.get_target(vm_uuid))
+        self.vnics_inventory.set(vm_uuid, vnics)
+        return self.vnics_inventory.get(vm_uuid)
+
+    def vnic_name_to_index(self, name: str, vm: Any) -> str:
+        return name.rsplit(" ", 1)[-1]
+
+    async def create_vnics_batch(
+        self, vm: Any, actions: Sequence[ConnectivityActionModel]
+    ) -> BatchResult:
+        """Create new vNICs for all the actions and set VLANs on one VM.
+
+        The same as AbcCloudProviderConnectivityFlow.create_vnics_batch.
+        """
+        raise NotImplementedError
+
+    async def set_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        """Set VLANs for the sequence of actions and update vNICs inventory."""
+        if self.batch_new_vnics_per_vm and self._is_new_vnics_group(actions):
+            await self._create_vnics_batch(actions)
+        else:
+            await self._execute_actions(self._set_vlan_and_update_vnics, actions)
+
+    def _is_new_vnics_group(self, actions: Collection[ConnectivityActionModel]) -> bool:
+        return isinstance(actions, NewVnicsGroup)
+
+    async def _create_vnics_batch(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> None:
+        actions = tuple(actions)
+        vm_uuid = get_vm_uuid(actions[0])
+        try:
+            batch_result: BatchResult | Exception = await self.create_vnics_batch(
+                await self.get_target(vm_uuid), actions
+            )
+        except Exception as e:
+            batch_result = e
+        # vNICs are created in order, the ones after the failed vNIC are skipped
+        action_results = save_batch_result(
+            self.results, actions, batch_result, skip_after_failure=True
+        )
+        for action, result in zip(actions, action_results):
+            if result.success:
+                self.vnics_inventory.set_vnic_connected(
+                    vm_uuid, int(get_vnic(action)), result.updated_interface
+                )
+
+    async def _set_vlan_and_update_vnics(
+        self, action: ConnectivityActionModel, target: Any
+    ) -> str:
+        iface = await self.set_vlan(action, target)
+        self.vnics_inventory.set_vnic_connected(
+            get_vm_uuid(action), int(get_vnic(action)), iface
+        )
+        return iface
+
+    async def _prepare_remove_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[Collection[ConnectivityActionModel]]:
+        remove_actions_groups = [(a,) for a in filter(is_remove_action, actions)]
+        return remove_actions_groups
+
+    async def _prepare_set_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> list[tuple[ConnectivityActionModel, ...]]:
+        """Prepare set actions for a Cloud Provider.
+
+        Check that we can connect actions to the VM.
+        Set vNIC index for each action.
+        Return groups of actions:
+            existed vNICs in separate groups (one action per group)
+            new vNICs in one group in the right order
+        VMs are prepared concurrently, if preparation for a VM fails its actions
+        are failed and not returned.
+        """
+        set_actions = list(filter(is_set_action, actions))
+
+        vms_actions = _group_actions_by_vm(set_actions).values()
+        vms_groups = await asyncio.gather(
+            *map(self._prepare_vm_set_actions, vms_actions)
+        )
+        return list(chain.from_iterable(vms_groups))
+
+    async def _prepare_vm_set_actions(
+        self, actions: list[ConnectivityActionModel]
+    ) -> list[tuple[ConnectivityActionModel, ...]]:
+        """Prepare set actions for one VM, errors are saved as the actions results."""
+        try:
+            vm_uuid = get_vm_uuid(actions[0])
+            vm = await self.get_target(vm_uuid)
+            self._replace_vnic_names_with_indexes(actions, vm)
+            _validate_not_duplicated_vnics(actions)
+            vnics = await self.get_cached_vnics(vm_uuid)
+            return group_actions(actions, vnics)
+        except Exception as e:
+            logger.exception("Failed to prepare set actions for the VM")
+            _save_prepare_vm_error(self.results, actions, e)
+            return []
+
+    def _replace_vnic_names_with_indexes(
+        self, actions: Collection[ConnectivityActionModel], vm: Any
+    ) -> None:
+        for action in actions:
+            vnic_name = action.custom_action_attrs.vnic
+            vnic_index = self.vnic_name_to_index(vnic_name, vm)
+            action.custom_action_attrs.vnic = vnic_index
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from abc import ABC
+from collections.abc import Collection
+
+from cloudshell.shell.flows.connectivity.aio.abstract_flow import (
+    AbcAsyncConnectivityFlow,
+)
+from cloudshell.shell.flows.connectivity.devices_flow import (
+    _get_actions_to_clear,
+    _get_actions_to_rollback,
+    _get_not_failed_set_actions,
+)
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+    is_remove_action,
+)
+
+
+class AbcAsyncDeviceConnectivityFlow(AbcAsyncConnectivityFlow, ABC):
+    async def _prepare_remove_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[Collection[ConnectivityActionModel]]:
+        remove_actions_groups = [(a,) for a in actions if is_remove_action(a)]
+        return remove_actions_groups
+
+    async def _prepare_set_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[Collection[ConnectivityActionModel]]:
+        set_actions = _get_not_failed_set_actions(actions, self.results)
+        return [(a,) for a in set_actions]
+
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_clear(actions)
+
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_rollback(set_actions, self.results)
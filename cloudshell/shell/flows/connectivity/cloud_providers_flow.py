@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import logging
 from abc import abstractmethod
-from collections.abc import Collection
-from concurrent.futures import ThreadPoolExecutor, wait
+from collections.abc import Collection, Sequence
+from concurrent.futures import Executor
 from itertools import chain, groupby
-from typing import Any
+from typing import Any, ClassVar
 
-from attrs import define
+from attrs import define, field
 
 from cloudshell.shell.flows.connectivity.abstrace_flow import AbcConnectivityFlow
-from cloudshell.shell.flows.connectivity.helpers.group_cp_actions import group_actions
+from cloudshell.shell.flows.connectivity.helpers.action_results import (
+    BatchResult,
+    get_failed_action_ids,
+    get_response_emsg,
+    save_batch_result,
+)
+from cloudshell.shell.flows.connectivity.helpers.group_cp_actions import (
+    NewVnicsGroup,
+    group_actions,
+)
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.helpers.vnic_inventory import VnicInventory
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectivityActionModel,
     get_vm_uuid,
@@ -17,46 +31,114 @@ from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     is_remove_action,
     is_set_action,
 )
+from cloudshell.shell.flows.connectivity.models.driver_response import ActionResult
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
 
+logger = logging.getLogger(__name__)
 
+
+@define
 class AbcCloudProviderConnectivityFlow(AbcConnectivityFlow):
-    def _clear_targets(
-        self, actions: Collection[ConnectivityActionModel], executor: ThreadPoolExecutor
-    ) -> None:
+    """Base connectivity flow for Cloud Providers.
+
+    vNICs of the VMs are kept in vnics_inventory during the request, use
+    get_cached_vnics in set_vlan, clear, etc. instead of getting them again.
+    """
+
+    # if True actions creating new vNICs on one VM are passed to create_vnics_batch
+    # at once instead of calling set_vlan per action
+    batch_new_vnics_per_vm: ClassVar[bool] = False
+
+    vnics_inventory: VnicInventory = field(init=False, factory=VnicInventory)
+
+    def apply_connectivity(self, request: str) -> str:
+        # vNICs can be changed between the requests
+        self.vnics_inventory = VnicInventory()
+        return super().apply_connectivity(request)
+
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
         """Do not clear targets for Cloud Provider."""
+        return ()
 
-    def _rollback_failed_set_actions(
-        self,
-        set_actions: Collection[Collection[ConnectivityActionModel]],
-        executor: ThreadPoolExecutor,
-    ) -> None:
-        # get failed action ids
-        failed_action_ids = set()
-        for action_id, results in self.results.items():
-            if not all(result.success for result in results):
-                failed_action_ids.add(action_id)
-                continue
-
-        actions_to_rollback = []
-        for action in chain.from_iterable(set_actions):  # type: ConnectivityActionModel
-            if action.action_id in failed_action_ids:
-                # get all sub action for the failed action id
-                actions_to_rollback.append(action)
-
-        # execute clear actions, ignore results
-        futures = [
-            executor.submit(self.clear, a, self.get_target(a))
-            for a in actions_to_rollback
-        ]
-        wait(futures)
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_rollback(set_actions, self.results)
 
     @abstractmethod
     def get_vnics(self, vm: Any) -> Collection[VnicInfo]:
         raise NotImplementedError
 
+    def get_cached_vnics(self, vm_uuid: str) -> list[VnicInfo]:
+        """Get vNICs of the VM from the inventory or with get_vnics.
+
+        vNICs created or replaced by successful set actions are updated.
+        """
+        try:
+            return self.vnics_inventory.get(vm_uuid)
+        except KeyError:
+            pass
+        vnics = self.get_vnics(self.get_target(vm_uuid))
+        self.vnics_inventory.set(vm_uuid, vnics)
+        return self.vnics_inventory.get(vm_uuid)
+
     def vnic_name_to_index(self, name: str, vm: Any) -> str:
         return name.rsplit(" ", 1)[-1]
 
+    def create_vnics_batch(
+        self, vm: Any, actions: Sequence[ConnectivityActionModel]
+    ) -> BatchResult:
+        """Create new vNICs for all the actions and set VLANs on one VM.
+
+        Used if batch_new_vnics_per_vm is True, e.g. to create all the vNICs with
+        one VM reconfiguration. Actions are ordered by vNIC index, the first one is
+        the next after the last existing vNIC. Returns updated interface or an
+        exception for each action in the same order, raised exception fails all
+        the actions. Actions after the first failed one are skipped and rolled
+        back as their vNICs would leave a gap.
+        """
+        raise NotImplementedError
+
+    def set_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        """Set VLANs for the sequence of actions and update vNICs inventory."""
+        if self.batch_new_vnics_per_vm and self._is_new_vnics_group(actions):
+            self._create_vnics_batch(actions)
+        else:
+            self._execute_actions(self._set_vlan_and_update_vnics, actions)
+
+    def _is_new_vnics_group(self, actions: Collection[ConnectivityActionModel]) -> bool:
+        return isinstance(actions, NewVnicsGroup)
+
+    def _create_vnics_batch(self, actions: Collection[ConnectivityActionModel]) -> None:
+        actions = tuple(actions)
+        vm_uuid = get_vm_uuid(actions[0])
+        try:
+            batch_result: BatchResult | Exception = self.create_vnics_batch(
+                self.get_target(vm_uuid), actions
+            )
+        except Exception as e:
+            batch_result = e
+        # vNICs are created in order, the ones after the failed vNIC are skipped
+        action_results = save_batch_result(
+            self.results, actions, batch_result, skip_after_failure=True
+        )
+        for action, result in zip(actions, action_results):
+            if result.success:
+                self.vnics_inventory.set_vnic_connected(
+                    vm_uuid, int(get_vnic(action)), result.updated_interface
+                )
+
+    def _set_vlan_and_update_vnics(
+        self, action: ConnectivityActionModel, target: Any
+    ) -> str:
+        iface = self.set_vlan(action, target)
+        self.vnics_inventory.set_vnic_connected(
+            get_vm_uuid(action), int(get_vnic(action)), iface
+        )
+        return iface
+
     def _prepare_remove_actions(
         self, actions: Collection[ConnectivityActionModel]
     ) -> Collection[Collection[ConnectivityActionModel]]:
@@ -64,7 +146,9 @@ class AbcCloudProviderConnectivityFlow(AbcConnectivityFlow):
         return remove_actions_groups
 
     def _prepare_set_actions(
-        self, actions: Collection[ConnectivityActionModel]
+        self,
+        actions: Collection[ConnectivityActionModel],
+        executor: Executor | None = None,
     ) -> list[tuple[ConnectivityActionModel, ...]]:
         """Prepare set actions for a Cloud Provider.
 
@@ -73,20 +157,34 @@ class AbcCloudProviderConnectivityFlow(AbcConnectivityFlow):
         Return groups of actions:
             existed vNICs in separate groups (one action per group)
             new vNICs in one group in the right order
+        VMs are prepared in parallel if the executor is passed, if preparation for
+        a VM fails its actions are failed and not returned.
         """
         set_actions = list(filter(is_set_action, actions))
 
-        actions_by_vm = _group_actions_by_vm(set_actions)
-        set_actions_groups: list[tuple[ConnectivityActionModel, ...]] = []
-        for vm_uuid, actions in actions_by_vm.items():
+        vms_actions = _group_actions_by_vm(set_actions).values()
+        if executor is None:
+            vms_groups = map(self._prepare_vm_set_actions, vms_actions)
+        else:
+            vms_groups = executor.map(self._prepare_vm_set_actions, vms_actions)
+
+        return list(chain.from_iterable(vms_groups))
+
+    def _prepare_vm_set_actions(
+        self, actions: list[ConnectivityActionModel]
+    ) -> list[tuple[ConnectivityActionModel, ...]]:
+        """Prepare set actions for one VM, errors are saved as the actions results."""
+        try:
+            vm_uuid = get_vm_uuid(actions[0])
             vm = self.get_target(vm_uuid)
             self._replace_vnic_names_with_indexes(actions, vm)
             _validate_not_duplicated_vnics(actions)
-            vnics = self.get_vnics(vm)
-            new_groups_actions = group_actions(actions, vnics)
-            set_actions_groups.extend(new_groups_actions)
-
-        return set_actions_groups
+            vnics = self.get_cached_vnics(vm_uuid)
+            return group_actions(actions, vnics)
+        except Exception as e:
+            logger.exception("Failed to prepare set actions for the VM")
+            _save_prepare_vm_error(self.results, actions, e)
+            return []
 
     def _replace_vnic_names_with_indexes(
         self, actions: Collection[ConnectivityActionModel], vm: Any
@@ -97,13 +195,6 @@ class AbcCloudProviderConnectivityFlow(AbcConnectivityFlow):
             action.custom_action_attrs.vnic = vnic_index
 
 
-@define
-class VnicInfo:
-    name: str
-    index: int
-    network_can_be_replaced: bool
-
-
 def _group_actions_by_vm(
     actions: Collection[ConnectivityActionModel],
 ) -> dict[str, list[ConnectivityActionModel]]:
@@ -115,6 +206,29 @@ def _group_actions_by_vm(
     }
 
 
+def _save_prepare_vm_error(
+    results: ResultsAggregator,
+    actions: Collection[ConnectivityActionModel],
+    e: Exception,
+) -> None:
+    for action in actions:
+        emsg = get_response_emsg(action, e)
+        logger.error(emsg)
+        results.add(action, ActionResult.fail_result(action, emsg))
+
+
+def _get_actions_to_rollback(
+    set_actions: Collection[Collection[ConnectivityActionModel]],
+    all_results: ResultsAggregator,
+) -> list[ConnectivityActionModel]:
+    # get all sub actions for the failed action ids
+    actions = list(chain.from_iterable(set_actions))
+    failed_action_ids = get_failed_action_ids(
+        {a.action_id for a in actions}, all_results
+    )
+    return [action for action in actions if action.action_id in failed_action_ids]
+
+
 def _validate_not_duplicated_vnics(
     actions: Collection[ConnectivityActionModel],
 ) -> None:
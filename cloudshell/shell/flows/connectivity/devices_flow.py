@@ -1,83 +1,179 @@
 from __future__ import annotations
 
+import logging
 from abc import ABC
-from collections.abc import Collection
-from concurrent.futures import ThreadPoolExecutor, wait
-from itertools import chain
+from collections.abc import Callable, Collection, Iterable, Sequence
+from concurrent.futures import Executor
+from itertools import chain, groupby
+from typing import Any, ClassVar
 
 from .abstrace_flow import AbcConnectivityFlow
+from .helpers.action_results import (
+    BatchResult,
+    get_failed_action_ids,
+    save_batch_result,
+)
+from .helpers.results_aggregator import ResultsAggregator
 from .models.connectivity_model import (
     ConnectivityActionModel,
     ConnectivityTypeEnum,
+    get_resource_name,
     is_remove_action,
     is_set_action,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AbcDeviceConnectivityFlow(AbcConnectivityFlow, ABC):
+    # if True all actions for one device are passed to set_vlans_batch and
+    # remove_vlans_batch at once instead of calling set_vlan/remove_vlan per action
+    batch_actions_per_device: ClassVar[bool] = False
+
+    def set_vlans_batch(
+        self, target_resource: Any, actions: Sequence[ConnectivityActionModel]
+    ) -> BatchResult:
+        """Set VLANs for all the actions on one device.
+
+        Used if batch_actions_per_device is True. target_resource is the target
+        loaded by the resource name. Returns updated interface or an exception for
+        each action in the same order, raised exception fails all the actions.
+        """
+        raise NotImplementedError
+
+    def remove_vlans_batch(
+        self, target_resource: Any, actions: Sequence[ConnectivityActionModel]
+    ) -> BatchResult:
+        """Remove VLANs for all the actions on one device.
+
+        Used if batch_actions_per_device is True. target_resource is the target
+        loaded by the resource name. Returns updated interface or an exception for
+        each action in the same order, raised exception fails all the actions.
+        """
+        raise NotImplementedError
+
+    def set_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        if self.batch_actions_per_device:
+            self._execute_actions_batch(self.set_vlans_batch, actions)
+        else:
+            super().set_vlans(actions)
+
+    def remove_vlans(self, actions: Collection[ConnectivityActionModel]) -> None:
+        if self.batch_actions_per_device:
+            self._execute_actions_batch(self.remove_vlans_batch, actions)
+        else:
+            super().remove_vlans(actions)
+
+    def _execute_actions_batch(
+        self,
+        fn: Callable[[Any, Sequence[ConnectivityActionModel]], BatchResult],
+        actions: Collection[ConnectivityActionModel],
+    ) -> None:
+        """Execute actions for one device at once and save results per action."""
+        actions = tuple(actions)
+        resource_names = set(map(get_resource_name, actions))
+        assert len(resource_names) == 1
+
+        target = self.get_target(resource_names.pop())
+        try:
+            batch_result: BatchResult | Exception = fn(target, actions)
+        except Exception as e:
+            batch_result = e
+        save_batch_result(self.results, actions, batch_result)
+
+    def _group_actions(
+        self, actions: Iterable[ConnectivityActionModel]
+    ) -> list[tuple[ConnectivityActionModel, ...]]:
+        if not self.batch_actions_per_device:
+            return [(a,) for a in actions]
+        return [
+            tuple(grouped_actions)
+            for _, grouped_actions in groupby(
+                sorted(actions, key=get_resource_name), key=get_resource_name
+            )
+        ]
+
     def _prepare_remove_actions(
         self, actions: Collection[ConnectivityActionModel]
     ) -> Collection[Collection[ConnectivityActionModel]]:
-        remove_actions_groups = [(a,) for a in actions if is_remove_action(a)]
+        remove_actions_groups = self._group_actions(
+            a for a in actions if is_remove_action(a)
+        )
         return remove_actions_groups
 
     def _prepare_set_actions(
-        self, actions: Collection[ConnectivityActionModel]
+        self,
+        actions: Collection[ConnectivityActionModel],
+        executor: Executor | None = None,
     ) -> Collection[Collection[ConnectivityActionModel]]:
-        # get failed actions
-        failed_action_ids = {
-            result.actionId
-            for result in chain.from_iterable(self.results.values())
-            if not result.success
-        }
-
-        # do not add failed actions to the set actions
-        set_actions_groups = [
-            (a,)
-            for a in actions
-            if is_set_action(a) and a.action_id not in failed_action_ids
-        ]
+        set_actions_groups = self._group_actions(
+            _get_not_failed_set_actions(actions, self.results)
+        )
         return set_actions_groups
 
-    def _clear_targets(
-        self, actions: Collection[ConnectivityActionModel], executor: ThreadPoolExecutor
-    ) -> None:
-        """Remove all VLANs for the targets."""
-        # get one set action per action id
-        actions_map = {
-            action.action_id: action
-            for action in actions
-            if action.type is ConnectivityTypeEnum.SET_VLAN
-        }
-
-        futures = [
-            executor.submit(self._execute_actions, self.clear, (a,))
-            for a in actions_map.values()
-        ]
-        wait(futures)
+    def _prepare_clear_actions(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_clear(actions)
 
-    def _rollback_failed_set_actions(
-        self,
-        set_actions: Collection[Collection[ConnectivityActionModel]],
-        executor: ThreadPoolExecutor,
-    ) -> None:
-        # get failed action ids
-        failed_action_ids = set()
-        for action_id, results in self.results.items():
-            if not all(result.success for result in results):
-                failed_action_ids.add(action_id)
-                continue
-
-        actions_to_rollback = []
-        for action in chain.from_iterable(set_actions):  # type: ConnectivityActionModel
-            if action.action_id in failed_action_ids:
-                actions_to_rollback.append(action)
-                # get only one sub action per action id
-                failed_action_ids.remove(action.action_id)
-
-        # execute clear actions, ignore results
-        futures = [
-            executor.submit(self.clear, a, self.get_target(a))
-            for a in actions_to_rollback
-        ]
-        wait(futures)
+    def _prepare_rollback_actions(
+        self, set_actions: Collection[Collection[ConnectivityActionModel]]
+    ) -> Collection[ConnectivityActionModel]:
+        return _get_actions_to_rollback(set_actions, self.results)
+
+    def _get_target_names(
+        self, actions: Collection[ConnectivityActionModel]
+    ) -> Collection[str]:
+        if not self.batch_actions_per_device:
+            return super()._get_target_names(actions)
+        # remove and set batches use the device, only clear uses the ports
+        return {get_resource_name(a) for a in actions} | set(
+            super()._get_target_names(self._prepare_clear_actions(actions))
+        )
+
+    def _get_pipeline_key(self, action: ConnectivityActionModel) -> str:
+        if self.batch_actions_per_device:
+            # all the actions for the device are executed in one batch
+            return get_resource_name(action)
+        return super()._get_pipeline_key(action)
+
+
+def _get_not_failed_set_actions(
+    actions: Iterable[ConnectivityActionModel],
+    all_results: ResultsAggregator,
+) -> list[ConnectivityActionModel]:
+    # do not add failed actions to the set actions
+    set_actions = [a for a in actions if is_set_action(a)]
+    failed_action_ids = get_failed_action_ids(
+        {a.action_id for a in set_actions}, all_results
+    )
+    return [a for a in set_actions if a.action_id not in failed_action_ids]
+
+
+def _get_actions_to_clear(
+    actions: Iterable[ConnectivityActionModel],
+) -> Collection[ConnectivityActionModel]:
+    # get one set action per action id
+    actions_map = {
+        action.action_id: action
+        for action in actions
+        if action.type is ConnectivityTypeEnum.SET_VLAN
+    }
+    return actions_map.values()
+
+
+def _get_actions_to_rollback(
+    set_actions: Collection[Collection[ConnectivityActionModel]],
+    all_results: ResultsAggregator,
+) -> list[ConnectivityActionModel]:
+    actions = list(chain.from_iterable(set_actions))
+    failed_action_ids = get_failed_action_ids(
+        {a.action_id for a in actions}, all_results
+    )
+    actions_to_rollback = []
+    for action in actions:
+        if action.action_id in failed_action_ids:
+            actions_to_rollback.append(action)
+            # get only one sub action per action id
+            failed_action_ids.remove(action.action_id)
+    return actions_to_rollback
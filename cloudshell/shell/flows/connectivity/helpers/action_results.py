@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Sequence
+from typing import Union
+
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+    get_vm_uuid,
+    get_vnic,
+)
+from cloudshell.shell.flows.connectivity.models.driver_response import ActionResult
+
+logger = logging.getLogger(__name__)
+
+# updated interface or an error for every action in the batch
+BatchResult = Sequence[Union[str, Exception]]
+
+
+def get_response_emsg(action: ConnectivityActionModel, e: Exception) -> str:
+    vlan = action.connection_params.vlan_id
+    target_name = action.action_target.name
+    type_ = action.type.value
+    emsg = f"Failed to {type_} {vlan} for {target_name}"
+    if vm_uuid := get_vm_uuid(action):
+        emsg += f" on VM ID {vm_uuid}"
+        if vnic := get_vnic(action):
+            emsg += f" for vNIC {vnic}"
+    emsg = f"{emsg}. Error: {e}"
+    return emsg
+
+
+def save_batch_result(
+    results: ResultsAggregator,
+    actions: Sequence[ConnectivityActionModel],
+    batch_result: BatchResult | Exception,
+    skip_after_failure: bool = False,
+) -> list[ActionResult]:
+    """Save results of the batch per action.
+
+    :param batch_result: result of the batch or raised exception that fails all
+        the actions
+    :param skip_after_failure: actions after the first failed one are skipped as
+        when they are executed sequentially, raised exception still fails all
+        the actions
+    """
+    if not isinstance(batch_result, Exception) and len(batch_result) != len(actions):
+        batch_result = ValueError(
+            f"Expected {len(actions)} results, got {len(batch_result)}"
+        )
+    if isinstance(batch_result, Exception):
+        batch_result = [batch_result] * len(actions)
+        skip_after_failure = False
+
+    action_results = []
+    failed = False
+    for action, iface_or_error in zip(actions, batch_result):
+        if failed and skip_after_failure:
+            logger.debug(f"Skip action {action} due to previous failure")
+            result = ActionResult.skip_result(action)
+        elif isinstance(iface_or_error, Exception):
+            emsg = get_response_emsg(action, iface_or_error)
+            logger.error(emsg)
+            result = ActionResult.fail_result(action, emsg)
+            failed = True
+        else:
+            result = ActionResult.success_result(action, iface=iface_or_error)
+        results.add(action, result)
+        action_results.append(result)
+    return action_results
+
+
+def get_failed_action_ids(
+    action_ids: Iterable[str],
+    all_results: ResultsAggregator,
+) -> set[str]:
+    return {
+        action_id for action_id in action_ids if not all_results.is_success(action_id)
+    }
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from contextvars import Context, copy_context
+from typing import Any, TypeVar
+
+from attrs import define, field
+
+T = TypeVar("T")
+
+
+@define
+class ContextExecutor(Executor):
+    """Executes tasks in the context captured when it was created.
+
+    Threads of a long-lived executor keep the context they were started with,
+    e.g. the log context of the first request. Every task is run in a copy of the
+    captured context instead. The executor isn't shut down.
+    """
+
+    _executor: Executor
+    _context: Context = field(factory=copy_context)
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        # a context can't be entered by several threads at once, copy it per task
+        return self._executor.submit(self._context.copy().run, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        pass
@@ -2,13 +2,22 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any
 
+from attrs import define, field
+
 if TYPE_CHECKING:
+    from typing_extensions import Self
+
     from .types import ActionsAttributeDict
 
 NOT_SET = object()
 
 
-def get_val_from_list_attrs(list_attrs: list[ActionsAttributeDict], name: str) -> str:
+def get_val_from_list_attrs(
+    list_attrs: list[ActionsAttributeDict] | IndexedListAttrs, name: str
+) -> str:
+    """Get the attribute value, O(1) if the list is already indexed."""
+    if isinstance(list_attrs, IndexedListAttrs):
+        return list_attrs.get_val(name)
     for attr_dict in list_attrs:
         if attr_dict["attributeName"] == name:
             return attr_dict["attributeValue"]
@@ -16,11 +25,15 @@ def get_val_from_list_attrs(list_attrs: list[ActionsAttributeDict], name: str) -
 
 
 def set_val_to_list_attrs(
-    list_attrs: list[ActionsAttributeDict],
+    list_attrs: list[ActionsAttributeDict] | IndexedListAttrs,
     name: str,
     value: str,
     set_if_eq: Any = NOT_SET,
 ) -> None:
+    """Set the attribute value, O(1) if the list is already indexed."""
+    if isinstance(list_attrs, IndexedListAttrs):
+        list_attrs.set_val(name, value, set_if_eq)
+        return
     for attr_dict in list_attrs:
         if attr_dict["attributeName"] == name:
             if set_if_eq is NOT_SET or attr_dict["attributeValue"] == set_if_eq:
@@ -28,3 +41,70 @@ def set_val_to_list_attrs(
             break
     else:
         raise KeyError(f"Attribute '{name}' not found in list of attributes")
+
+
+def replace_val_in_list_attrs(
+    list_attrs: list[ActionsAttributeDict], name: str, value: str
+) -> list[ActionsAttributeDict]:
+    """Return a copy of the list of attributes with the new value.
+
+    Only the changed attribute is copied, others are shared with the original list.
+    """
+    return IndexedListAttrs(list_attrs).replace_val(name, value).list_attrs
+
+
+def _build_index(list_attrs: list[ActionsAttributeDict]) -> dict[str, int]:
+    index: dict[str, int] = {}
+    for i, attr_dict in enumerate(list_attrs):
+        # the first attribute wins as with a linear search
+        index.setdefault(attr_dict["attributeName"], i)
+    return index
+
+
+@define
+class IndexedListAttrs:
+    """List of attributes with O(1) access by the attribute name.
+
+    The index is built once and shared by the copies created with replace_val, the
+    positions of the attributes don't change there.
+    """
+
+    list_attrs: list[ActionsAttributeDict]
+    _index: dict[str, int] = field(repr=False)
+
+    @_index.default
+    def _index_default(self) -> dict[str, int]:
+        return _build_index(self.list_attrs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def _get_attr_dict(self, name: str) -> ActionsAttributeDict:
+        try:
+            return self.list_attrs[self._index[name]]
+        except KeyError:
+            raise KeyError(f"Attribute '{name}' not found in list of attributes")
+
+    def get_val(self, name: str, default: Any = NOT_SET) -> Any:
+        try:
+            return self._get_attr_dict(name)["attributeValue"]
+        except KeyError:
+            if default is NOT_SET:
+                raise
+            return default
+
+    def set_val(self, name: str, value: str, set_if_eq: Any = NOT_SET) -> None:
+        attr_dict = self._get_attr_dict(name)
+        if set_if_eq is NOT_SET or attr_dict["attributeValue"] == set_if_eq:
+            attr_dict["attributeValue"] = value
+
+    def replace_val(self, name: str, value: str) -> Self:
+        """Return a copy with the new value, not changed attributes are shared."""
+        i = self._index.get(name)
+        if i is None:
+            raise KeyError(f"Attribute '{name}' not found in list of attributes")
+        new_list_attrs = self.list_attrs.copy()
+        new_attr_dict = new_list_attrs[i].copy()
+        new_attr_dict["attributeValue"] = value
+        new_list_attrs[i] = new_attr_dict
+        return type(self)(new_list_attrs, self._index)
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-from collections.abc import Collection
+from collections.abc import Collection, Container, Iterator
 from itertools import filterfalse
-from typing import TYPE_CHECKING
 
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectivityActionModel,
     get_vm_uuid,
     get_vnic,
 )
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
 
-if TYPE_CHECKING:
-    from cloudshell.shell.flows.connectivity.cloud_providers_flow import VnicInfo
+
+class NewVnicsGroup(tuple[ConnectivityActionModel, ...]):
+    """Group of actions that create new vNICs on a VM, ordered by vNIC index."""
+
+    __slots__ = ()
 
 
 def group_actions(
@@ -21,8 +24,8 @@ def group_actions(
 
     Return groups of actions:
         - groups with one action per group for vNICs that exists on a VM
-        - one group for all actions that will create new vNICs on a VM in right order -
-          from the lowest index to the highest
+        - one NewVnicsGroup for all actions that will create new vNICs on a VM in
+          right order - from the lowest index to the highest
     """
     # all vNICs should be digit strings or empty string with the same VM UUID
     assert all(v.isdigit() or v == "" for v in map(get_vnic, actions))
@@ -47,28 +50,22 @@ def group_actions(
                     f"Cannot connect to vNIC {vnic_index} because it is already used"
                 )
 
+    # vNICs that can be replaced in the order of the VM, new vNICs get the lowest
+    # indexes that are not requested yet
+    vnics_to_replace = iter(vnics_to_use)
+    new_vnic_indexes = _iterate_free_indexes(
+        last_vnic_index + 1, {int(get_vnic(a)) for a in actions_to_create_new_vnics}
+    )
     for action in filterfalse(get_vnic, actions):
-        if vnics_to_use:
-            vnic_index = next(iter(vnics_to_use))  # get first index
-            vnics_to_use.pop(vnic_index)
-            action.custom_action_attrs.vnic = str(vnic_index)
+        vnic_index = next(vnics_to_replace, None)
+        if vnic_index is not None:
             actions_to_replace_vnics.append(action)
         else:
-            prev_used_index = last_vnic_index
-            for i, another_action in enumerate(actions_to_create_new_vnics):
-                action_vnic_index = int(get_vnic(another_action))
-                if action_vnic_index == prev_used_index + 1:
-                    prev_used_index += 1
-                    continue
-                else:
-                    # inserting action before prev_action
-                    action.custom_action_attrs.vnic = str(prev_used_index + 1)
-                    actions_to_create_new_vnics.insert(i, action)
-                    break
-            else:
-                # inserting action at the end
-                action.custom_action_attrs.vnic = str(prev_used_index + 1)
-                actions_to_create_new_vnics.append(action)
+            vnic_index = next(new_vnic_indexes)
+            actions_to_create_new_vnics.append(action)
+        action.custom_action_attrs.vnic = str(vnic_index)
+    # sort is stable and the list is mostly sorted, requested indexes go first
+    actions_to_create_new_vnics.sort(key=lambda a: int(get_vnic(a)))
 
     prev_index = last_vnic_index
     for action in actions_to_create_new_vnics:
@@ -83,11 +80,20 @@ def group_actions(
         (a,) for a in actions_to_replace_vnics
     ]
     if actions_to_create_new_vnics:
-        groups_actions.append(tuple(actions_to_create_new_vnics))
+        groups_actions.append(NewVnicsGroup(actions_to_create_new_vnics))
 
     return groups_actions
 
 
+def _iterate_free_indexes(start: int, used: Container[int]) -> Iterator[int]:
+    """Iterate over indexes from the start skipping used ones."""
+    index = start
+    while True:
+        if index not in used:
+            yield index
+        index += 1
+
+
 def _sort_actions_by_vnic(action: ConnectivityActionModel) -> tuple[int, int]:
     """Sort actions by vNIC index.
 
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from functools import cache
+from typing import Any, Union
+
+from attrs import define
+
+from cloudshell.shell.flows.connectivity.exceptions import ConnectivityException
+
+JsonStr = Union[str, bytes, bytearray]
+
+# backends in the order of preference
+BACKEND_NAMES = ("orjson", "ujson", "json")
+
+
+class JsonBackendNotAvailable(ConnectivityException):
+    """JSON backend is unknown or its package isn't installed."""
+
+
+@define(frozen=True)
+class JsonBackend:
+    """Functions to parse and dump JSON.
+
+    dumps writes compact JSON without escaping non-ASCII characters, the same
+    output for all the backends.
+    """
+
+    name: str
+    loads: Callable[[JsonStr], Any]
+    dumps: Callable[[Any], str]
+
+
+def _create_orjson_backend() -> JsonBackend:
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    return JsonBackend("orjson", orjson.loads, dumps)
+
+
+def _create_ujson_backend() -> JsonBackend:
+    import ujson  # type: ignore[import]
+
+    def dumps(obj: Any) -> str:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+    return JsonBackend("ujson", ujson.loads, dumps)
+
+
+def _create_json_backend() -> JsonBackend:
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    return JsonBackend("json", json.loads, dumps)
+
+
+_BACKEND_FACTORIES: dict[str, Callable[[], JsonBackend]] = {
+    "orjson": _create_orjson_backend,
+    "ujson": _create_ujson_backend,
+    "json": _create_json_backend,
+}
+
+
+@cache
+def get_json_backend(name: str | None = None) -> JsonBackend:
+    """Get JSON backend by name or the fastest installed one.
+
+    :param name: orjson, ujson or json (stdlib); if None the first installed
+        backend from BACKEND_NAMES is used
+    """
+    if name is None:
+        for name in BACKEND_NAMES:
+            try:
+                return get_json_backend(name)
+            except JsonBackendNotAvailable:
+                pass
+
+    try:
+        factory = _BACKEND_FACTORIES[name]  # type: ignore[index]
+    except KeyError:
+        raise JsonBackendNotAvailable(f"Unknown JSON backend {name}")
+    try:
+        return factory()
+    except ImportError:
+        raise JsonBackendNotAvailable(f"JSON backend {name} isn't installed")
+
+
+def get_available_json_backends() -> list[JsonBackend]:
+    backends = []
+    for name in BACKEND_NAMES:
+        try:
+            backends.append(get_json_backend(name))
+        except JsonBackendNotAvailable:
+            pass
+    return backends
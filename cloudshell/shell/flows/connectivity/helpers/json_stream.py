@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import codecs
+import io
+import json
+from collections.abc import Generator
+from typing import IO, Any, Union
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.helpers.types import ActionDict
+
+RequestSource = Union[str, bytes, bytearray, IO[str], IO[bytes]]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+# chars that can follow a complete number
+_NUMBER_END = _WHITESPACE + ",]}"
+_decoder = json.JSONDecoder()
+
+
+def iterate_request_actions(
+    source: RequestSource, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Generator[ActionDict, None, None]:
+    """Iterate over driverRequest.actions decoding them one by one.
+
+    Only the current action is decoded and kept in memory, the rest of the
+    request is read from the file in chunks when it's needed.
+
+    :param source: JSON request as a string, bytes or a text or binary file
+    :param chunk_size: size of chunks read from the file
+    """
+    reader = _Reader.create(source, chunk_size)
+    reader.expect("{")
+    if not reader.find_key("driverRequest"):
+        raise KeyError("driverRequest")
+    reader.expect("{")
+    if not reader.find_key("actions"):
+        raise KeyError("actions")
+
+    reader.expect("[")
+    if reader.next_char() == "]":
+        return
+    while True:
+        yield reader.read_value()
+        char = reader.next_char()
+        reader.pos += 1
+        if char == "]":
+            return
+        if char != ",":
+            reader.raise_error("Expecting ',' delimiter")
+
+
+@define
+class _Reader:
+    _file: IO[str] | None
+    _chunk_size: int
+    buffer: str = ""
+    pos: int = 0
+    _eof: bool = field(init=False, default=False)
+
+    @classmethod
+    def create(cls, source: RequestSource, chunk_size: int) -> _Reader:
+        if isinstance(source, str):
+            # already in memory, nothing to read
+            reader = cls(None, chunk_size, source)
+            reader._eof = True
+            return reader
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        if isinstance(source.read(0), bytes):
+            source = _TextReader(source)  # type: ignore[arg-type]
+        return cls(source, chunk_size)  # type: ignore[arg-type]
+
+    def _read_more(self, size: int) -> bool:
+        """Read more data to the buffer, returns False on the end of the file."""
+        if self._eof:
+            return False
+        assert self._file is not None
+        data = self._file.read(max(size, self._chunk_size))
+        if not data:
+            self._eof = True
+            return False
+        # drop the consumed part to keep memory flat
+        self.buffer = self.buffer[self.pos :] + data
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """Skip whitespaces and return the next char without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more(self._chunk_size):
+                self.raise_error("Unexpected end of the request")
+
+    def expect(self, char: str) -> None:
+        if self.next_char() != char:
+            self.raise_error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        """Decode the next JSON value."""
+        self.next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # the value can be incomplete, read at least the same size again
+                # so big values are decoded a few times only
+                if not self._read_more(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # a number cut by the chunk is decoded in part, "1.5" cut to "1." as 1
+            if (
+                not _is_number(value)
+                or self._is_number_end(end)
+                or not self._read_more(self._chunk_size)
+            ):
+                break
+        self.pos = end
+        return value
+
+    def _is_number_end(self, pos: int) -> bool:
+        return pos < len(self.buffer) and self.buffer[pos] in _NUMBER_END
+
+    def find_key(self, key: str) -> bool:
+        """Skip values of the object until the key, the object is started."""
+        if self.next_char() == "}":
+            return False
+        while True:
+            current_key = self.read_value()
+            self.expect(":")
+            if current_key == key:
+                return True
+            self.read_value()
+            char = self.next_char()
+            self.pos += 1
+            if char == "}":
+                return False
+            if char != ",":
+                self.raise_error("Expecting ',' delimiter")
+
+    def raise_error(self, msg: str) -> None:
+        raise json.JSONDecodeError(msg, self.buffer, self.pos)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@define
+class _TextReader:
+    """Decodes UTF-8 binary file chunk by chunk."""
+
+    _file: IO[bytes]
+    _decoder: codecs.IncrementalDecoder = field(
+        init=False, factory=lambda: codecs.getincrementaldecoder("utf-8")()
+    )
+
+    def read(self, size: int) -> str:
+        while True:
+            data = self._file.read(size)
+            text = self._decoder.decode(data, final=not data)
+            # a chunk can end in the middle of a multibyte char
+            if text or not data:
+                return text
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from collections.abc import Callable, Collection, Hashable
+from concurrent.futures import Executor, Future, wait
+from functools import partial
+from threading import RLock
+from typing import Any, TypeVar
+
+from attrs import define, field
+
+T = TypeVar("T")
+
+
+def execute_limited(
+    executor: Executor,
+    fn: Callable[[T], Any],
+    items: Collection[T],
+    key_fn: Callable[[T], Hashable],
+    limit: int | None,
+) -> list[Future[Any]]:
+    """Execute fn for every item in the executor and wait for all of them.
+
+    No more than limit items with the same key are executed at the same time, others
+    are queued and submitted when the previous item with the key is finished.
+    Threads are not blocked while waiting, so items with different keys are not
+    affected by the limit.
+    Returns futures in the order of items.
+    """
+    if not limit:
+        futures = [executor.submit(fn, item) for item in items]
+    else:
+        submitter = LimitedSubmitter(executor, limit)
+        futures = [submitter.submit(key_fn(item), fn, item) for item in items]
+    wait(futures)
+    return futures
+
+
+@define
+class LimitedSubmitter:
+    """Submits calls to the executor, no more than limit calls per key are running.
+
+    Calls over the limit are queued and submitted when a running call with the same
+    key is finished, threads are not blocked while waiting.
+
+    :param executor: executor that runs the calls
+    :param limit: max running calls per key, not limited if None
+    """
+
+    _executor: Executor
+    _limit: int | None
+    _queues: dict[Hashable, deque[tuple[Future[Any], Callable[[], Any]]]] = field(
+        init=False, factory=lambda: defaultdict(deque)
+    )
+    _running: dict[Hashable, int] = field(init=False, factory=lambda: defaultdict(int))
+    # done callbacks can be called immediately in the submitting thread
+    _lock: RLock = field(init=False, factory=RLock)
+
+    def submit(self, key: Hashable, fn: Callable[..., T], *args: Any) -> Future[T]:
+        """Schedule fn(*args), returned future is done when the call is finished."""
+        future: Future[T] = Future()
+        with self._lock:
+            self._queues[key].append((future, partial(fn, *args)))
+            self._submit_next(key)
+        return future
+
+    def _submit_next(self, key: Hashable) -> None:
+        """Submit queued calls for the key while the limit isn't reached."""
+        queue = self._queues[key]
+        while queue and (not self._limit or self._running[key] < self._limit):
+            future, call = queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._running[key] += 1
+            executor_future = self._executor.submit(call)
+            executor_future.add_done_callback(partial(self._on_done, key, future))
+
+    def _on_done(
+        self, key: Hashable, future: Future[Any], executor_future: Future[Any]
+    ) -> None:
+        with self._lock:
+            self._running[key] -= 1
+            self._submit_next(key)
+        if (e := executor_future.exception()) is not None:
+            future.set_exception(e)
+        else:
+            future.set_result(executor_future.result())
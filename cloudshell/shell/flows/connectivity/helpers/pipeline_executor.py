@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Collection, Hashable, Iterator
+from concurrent.futures import Executor, Future
+from threading import Condition, Lock
+from typing import Any, Generic, TypeVar
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.helpers.limited_executor import (
+    LimitedSubmitter,
+)
+
+T = TypeVar("T")
+
+
+@define(frozen=True)
+class Phase(Generic[T]):
+    """Groups executed in parallel, the next phase starts when all of them are done.
+
+    :param fn: called for every group
+    :param groups: groups of the phase
+    :param raise_errors: if False errors of the groups are ignored, otherwise the
+        first error stops the pipeline
+    """
+
+    fn: Callable[[T], Any]
+    groups: Collection[T]
+    raise_errors: bool = True
+
+
+def execute_pipelines(
+    executor: Executor,
+    pipelines: Collection[Iterator[Phase[T]]],
+    key_fn: Callable[[T], Hashable],
+    limit: int | None,
+) -> None:
+    """Execute pipelines independently and wait for all of them.
+
+    Phases of one pipeline are executed one after another, the next phase is
+    taken from the iterator when the previous one is done, so it can depend on its
+    results. Pipelines don't wait for each other.
+    No more than limit groups with the same key are executed at the same time for
+    all the pipelines. Threads are not blocked while waiting.
+    Raises the first error after all the pipelines are finished.
+    """
+    _PipelinesExecution(executor, LimitedSubmitter(executor, limit), key_fn).run(
+        pipelines
+    )
+
+
+@define
+class _PipelinesExecution(Generic[T]):
+    _executor: Executor
+    _submitter: LimitedSubmitter
+    _key_fn: Callable[[T], Hashable]
+    _not_finished: int = field(init=False, default=0)
+    _errors: list[BaseException] = field(init=False, factory=list)
+    _condition: Condition = field(init=False, factory=Condition)
+
+    def run(self, pipelines: Collection[Iterator[Phase[T]]]) -> None:
+        self._not_finished = len(pipelines)
+        for phases in pipelines:
+            self._submit_next_phase(phases)
+        with self._condition:
+            self._condition.wait_for(lambda: not self._not_finished)
+        if self._errors:
+            raise self._errors[0]
+
+    def _next_phase(self, phases: Iterator[Phase[T]]) -> None:
+        """Take the next not empty phase and submit its groups."""
+        try:
+            phase = next(phases)
+            while not phase.groups:
+                phase = next(phases)
+        except StopIteration:
+            self._finish()
+            return
+        except BaseException as e:
+            self._finish(e)
+            return
+
+        futures: list[Future[Any]] = []
+        try:
+            for group in phase.groups:
+                futures.append(
+                    self._submitter.submit(self._key_fn(group), phase.fn, group)
+                )
+        except BaseException as e:
+            # finish the pipeline when already submitted groups are done
+            error = e
+            if futures:
+                _when_all(futures, lambda: self._finish(error))
+            else:
+                self._finish(error)
+            return
+        _when_all(futures, lambda: self._on_phase_done(phases, phase, futures))
+
+    def _on_phase_done(
+        self,
+        phases: Iterator[Phase[T]],
+        phase: Phase[T],
+        futures: list[Future[Any]],
+    ) -> None:
+        if phase.raise_errors:
+            for future in futures:
+                if (e := future.exception()) is not None:
+                    self._finish(e)
+                    return
+        # take the next phase in a worker thread, it can be slow
+        self._submit_next_phase(phases)
+
+    def _submit_next_phase(self, phases: Iterator[Phase[T]]) -> None:
+        try:
+            self._executor.submit(self._next_phase, phases)
+        except BaseException as e:
+            # e.g. the executor is shut down
+            self._finish(e)
+
+    def _finish(self, error: BaseException | None = None) -> None:
+        with self._condition:
+            if error is not None:
+                self._errors.append(error)
+            self._not_finished -= 1
+            self._condition.notify_all()
+
+
+def _when_all(futures: Collection[Future[Any]], callback: Callable[[], None]) -> None:
+    """Call the callback once when all the futures are done."""
+    not_done = [len(futures)]
+    lock = Lock()
+
+    def on_done(_: Future[Any]) -> None:
+        with lock:
+            not_done[0] -= 1
+            if not_done[0]:
+                return
+        callback()
+
+    for future in futures:
+        future.add_done_callback(on_done)
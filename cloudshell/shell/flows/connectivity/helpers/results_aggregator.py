@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from itertools import count
+from threading import Lock
+from typing import Union, overload
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+)
+from cloudshell.shell.flows.connectivity.models.driver_response import (
+    ActionResult,
+    ConnectivityActionResult,
+)
+
+MESSAGES_SEP = "\n"
+IFACES_SEP = ";"
+
+# set of values or values with the position they were first seen at
+_Values = Union[set[str], dict[str, int]]
+
+
+def _add_values(values: _Values, new_values: Iterable[str], position: int) -> None:
+    if isinstance(values, set):
+        values.update(new_values)
+        return
+    for value in new_values:
+        # keep the lowest position, results can come in any order
+        if values.get(value, position) >= position:
+            values[value] = position
+
+
+def _join_values(values: _Values, sep: str) -> str:
+    if isinstance(values, dict):
+        # sort is stable, values with the same position keep insertion order
+        values = sorted(values, key=values.__getitem__)  # type: ignore[assignment]
+    return sep.join(filter(bool, values))
+
+
+@define
+class AggregatedResult(Sequence[ConnectivityActionResult]):
+    """Result of the action merged from results of its sub actions.
+
+    Results are folded in as they arrive, messages and interfaces are kept in sets
+    and joined only once when the result is rendered.
+    It's also a read-only sequence of the sub actions results, as the list of
+    results used to be.
+
+    :param ordered: keep messages and interfaces in the order of sub actions
+        instead of sets, so the rendered result doesn't depend on the order in which
+        sub actions were finished
+    """
+
+    ordered: bool = False
+    _results: list[ActionResult] = field(init=False, factory=list)
+    success: bool = field(init=False, default=True)
+    _info_messages: _Values = field(init=False)
+    _error_messages: _Values = field(init=False)
+    _ifaces: _Values = field(init=False)
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def __attrs_post_init__(self) -> None:
+        values_type = dict if self.ordered else set
+        self._info_messages = values_type()
+        self._error_messages = values_type()
+        self._ifaces = values_type()
+
+    def append(
+        self, result: ConnectivityActionResult | ActionResult, position: int = 0
+    ) -> None:
+        """Add the result of the sub action.
+
+        :param position: position of the sub action, used if ordered
+        """
+        if isinstance(result, ConnectivityActionResult):
+            result = ActionResult.from_model(result)
+        with self._lock:
+            self._results.append(result)
+            self.success = self.success and result.success
+            if self.success:
+                _add_values(
+                    self._info_messages,
+                    result.info_message.split(MESSAGES_SEP),
+                    position,
+                )
+            else:
+                # clear info messages if any of sub actions failed
+                self._info_messages.clear()
+            _add_values(
+                self._error_messages, result.error_message.split(MESSAGES_SEP), position
+            )
+            _add_values(
+                self._ifaces, result.updated_interface.split(IFACES_SEP), position
+            )
+
+    @overload
+    def __getitem__(self, index: int) -> ConnectivityActionResult:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ConnectivityActionResult]:
+        ...
+
+    def __getitem__(
+        self, index: int | slice
+    ) -> ConnectivityActionResult | list[ConnectivityActionResult]:
+        if isinstance(index, slice):
+            return [r.to_model() for r in self._results[index]]
+        return self._results[index].to_model()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def is_empty(self) -> bool:
+        return not self._results
+
+    def to_record(self) -> ActionResult:
+        if not self._results:
+            raise ValueError("There are no results for the action")
+        first = self._results[0]
+        if len(self._results) == 1:
+            return first
+        return ActionResult(
+            first.action_id,
+            first.type,
+            _join_values(self._ifaces, IFACES_SEP),
+            _join_values(self._info_messages, MESSAGES_SEP),
+            _join_values(self._error_messages, MESSAGES_SEP),
+            self.success,
+        )
+
+    def to_result(self) -> ConnectivityActionResult:
+        return self.to_record().to_model()
+
+
+@define
+class ResultsAggregator(Mapping[str, AggregatedResult]):
+    """Results of sub actions aggregated per action id.
+
+    results[action_id].append(result) adds the result of the sub action.
+    It's a read-only mapping of action ids to sequences of sub actions results
+    compatible with the dict of lists of results used before, e.g. items().
+
+    :param ordered: merge results in the order of registered sub actions, identical
+        requests give identical responses independently of the execution order
+    """
+
+    ordered: bool = False
+    _results: dict[str, AggregatedResult] = field(init=False, factory=dict)
+    # positions of registered sub actions by their ids
+    _positions: dict[int, int] = field(init=False, factory=dict)
+    _next_position: Iterator[int] = field(init=False, factory=count)
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def register(self, actions: Collection[ConnectivityActionModel]) -> None:
+        """Register sub actions of the request before executing them.
+
+        Results are returned in the order of the actions, if ordered messages and
+        interfaces are merged in the order of the sub actions.
+        """
+        with self._lock:
+            for action in actions:
+                self._positions[id(action)] = next(self._next_position)
+                if action.action_id not in self._results:
+                    self._results[action.action_id] = AggregatedResult(self.ordered)
+
+    def __getitem__(self, action_id: str) -> AggregatedResult:
+        try:
+            return self._results[action_id]
+        except KeyError:
+            with self._lock:
+                return self._results.setdefault(
+                    action_id, AggregatedResult(self.ordered)
+                )
+
+    def __contains__(self, action_id: object) -> bool:
+        return action_id in self._results
+
+    def get(  # type: ignore[override]
+        self, action_id: str, default: AggregatedResult | None = None
+    ) -> AggregatedResult | None:
+        # don't create missed results as __getitem__ does
+        return self._results.get(action_id, default)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._results)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def add(
+        self,
+        action: ConnectivityActionModel,
+        result: ConnectivityActionResult | ActionResult,
+    ) -> None:
+        """Add the result of the sub action."""
+        try:
+            position = self._positions[id(action)]
+        except KeyError:
+            # not registered, use the order of the results
+            with self._lock:
+                position = next(self._next_position)
+        action_id = (
+            result.action_id if isinstance(result, ActionResult) else result.actionId
+        )
+        self[action_id].append(result, position)
+
+    def is_success(self, action_id: str) -> bool:
+        """True if all sub actions succeeded or there are no results yet."""
+        try:
+            return self._results[action_id].success
+        except KeyError:
+            return True
+
+    def get_records(self) -> list[ActionResult]:
+        """One merged result per action.
+
+        Results are in the order of registered actions and then in the order of
+        the first results.
+        """
+        with self._lock:
+            aggregated_results = list(self._results.values())
+        return [r.to_record() for r in aggregated_results if not r.is_empty()]
+
+    def get_results(self) -> list[ConnectivityActionResult]:
+        """The same as get_records but converted to ConnectivityActionResult."""
+        return [r.to_model() for r in self.get_records()]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Any
+
+from attrs import define, field
+
+
+@define
+class TargetCache:
+    """Thread-safe cache of loaded targets shared between connectivity requests.
+
+    :param ttl: seconds the target is valid after loading, not limited if None
+    :param max_size: max number of cached targets, least recently used targets are
+        evicted first, not limited if None
+    :param clock: returns current time in seconds
+    """
+
+    ttl: float | None = None
+    max_size: int | None = None
+    clock: Callable[[], float] = time.monotonic
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _data: OrderedDict[Hashable, tuple[float, Any]] = field(
+        init=False, factory=OrderedDict
+    )
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def get(self, key: Hashable) -> Any:
+        """Returns cached target or raises KeyError if it's missed or expired."""
+        with self._lock:
+            try:
+                loaded_at, target = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            if self.ttl is not None and self.clock() - loaded_at >= self.ttl:
+                del self._data[key]
+                self.misses += 1
+                raise KeyError(key)
+            self._data.move_to_end(key)
+            self.hits += 1
+            return target
+
+    def set(self, key: Hashable, target: Any) -> None:  # noqa: A003
+        with self._lock:
+            self._data[key] = (self.clock(), target)
+            self._data.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 from collections.abc import Generator, Iterable
-from copy import deepcopy
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
 
 from attrs import define
 
-from .dict_action_helpers import get_val_from_list_attrs, set_val_to_list_attrs
+from .dict_action_helpers import (
+    IndexedListAttrs,
+    get_val_from_list_attrs,
+    set_val_to_list_attrs,
+)
+from .vlan_set import (  # noqa: F401
+    VlanContainNotInt,
+    VlanSet,
+    _validate_vlan_number,
+    _validate_vlan_range,
+    iterate_vlan_str,
+)
 from cloudshell.shell.flows.connectivity.exceptions import VLANHandlerException
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectionModeEnum,
-    ConnectivityActionModel,
 )
 
 if TYPE_CHECKING:
@@ -18,14 +27,8 @@ if TYPE_CHECKING:
 
 VLAN_ID = "VLAN ID"
 VIRTUAL_NETWORK = "Virtual Network"
-
-
-@define
-class VlanContainNotInt(VLANHandlerException):
-    value: Any
-
-    def __str__(self) -> str:
-        return f"VLAN {self.value} isn't a integer"
+QNQ = "QnQ"
+TRUE_STRINGS = {"true", "1", "yes", "on", "t", "y"}
 
 
 @define
@@ -36,56 +39,53 @@ class VirtualNetworkDeprecated(VLANHandlerException):
         )
 
 
-def _validate_vlan_number(str_number: str) -> None:
-    try:
-        number = int(str_number)
-    except ValueError:
-        raise VlanContainNotInt(str_number)
-    if not 1 <= number <= 4094:
-        raise VLANHandlerException(f"Wrong VLAN detected {number}")
-
-
-def _validate_vlan_range(vlan_range: str) -> None:
-    start, end = vlan_range.split("-")
-    for vlan_number in (start, end):
-        _validate_vlan_number(vlan_number)
-
-
 def _sort_vlans(vlans: Iterable[str]) -> list[str]:
     return sorted(vlans, key=lambda v: tuple(map(int, v.split("-"))))
 
 
 def get_vlan_list(
-    vlan_str: str, is_vlan_range_supported: bool, is_multi_vlan_supported: bool
+    vlan_str: str,
+    is_vlan_range_supported: bool,
+    is_multi_vlan_supported: bool,
+    normalize_vlan_ranges: bool = False,
 ) -> list[str]:
-    result: set[str] = set()
-    for vlan_range in map(str.strip, vlan_str.split(",")):
-        if "-" not in vlan_range:
-            _validate_vlan_number(vlan_range)
-            result.add(vlan_range)
-        else:
-            _validate_vlan_range(vlan_range)
-            if is_vlan_range_supported:
-                result.add(vlan_range)
-            else:
-                start, end = sorted(map(int, vlan_range.split("-")))
-                result.update(map(str, range(start, end + 1)))
+    """Split VLAN string on VLANs or VLAN ranges.
+
+    :param normalize_vlan_ranges: merge overlapping and adjacent VLAN ranges,
+        "10-20,15-25,26" becomes "10-26"; used only if VLAN ranges are supported
+    """
+    if is_vlan_range_supported and normalize_vlan_ranges:
+        vlans = VlanSet.from_str(vlan_str).to_ranges_list()
+    elif is_vlan_range_supported:
+        # keep VLAN ranges as they were requested
+        vlans = _sort_vlans(
+            {vlan_range for vlan_range, *_ in iterate_vlan_str(vlan_str)}
+        )
+    else:
+        vlans = VlanSet.from_str(vlan_str).to_vlan_list()
     if is_multi_vlan_supported:
-        return [",".join(_sort_vlans(result))]
+        return [",".join(vlans)]
     else:
-        return _sort_vlans(result)
+        return vlans
 
 
 def iterate_dict_actions_by_vlan_range(
     dict_action: ActionDict,
     is_vlan_range_supported: bool,
     is_multi_vlan_supported: bool,
+    normalize_vlan_ranges: bool = False,
+    vlan_service_attrs: IndexedListAttrs | None = None,
 ) -> Generator[ActionDict, None, None]:
-    action = ConnectivityActionModel.parse_obj(dict_action)
-    vlan_str = action.connection_params.vlan_service_attrs.vlan_id
-    if (
-        action.connection_params.mode is ConnectionModeEnum.ACCESS
-        or action.connection_params.vlan_service_attrs.qnq
+    """Split the action by VLANs.
+
+    :param vlan_service_attrs: indexed VLAN service attributes of the action, to not
+        index them again
+    """
+    if vlan_service_attrs is None:
+        vlan_service_attrs = get_indexed_vlan_service_attrs(dict_action)
+    vlan_str = vlan_service_attrs.get_val(VLAN_ID)
+    if get_connection_mode(dict_action) is ConnectionModeEnum.ACCESS or _is_qnq(
+        vlan_service_attrs
     ):
         try:
             int(vlan_str)
@@ -100,35 +100,72 @@ def iterate_dict_actions_by_vlan_range(
             else:
                 raise ValueError(emsg)
     for vlan in get_vlan_list(
-        vlan_str, is_vlan_range_supported, is_multi_vlan_supported
+        vlan_str,
+        is_vlan_range_supported,
+        is_multi_vlan_supported,
+        normalize_vlan_ranges,
     ):
-        new_dict_action = deepcopy(dict_action)
-        new_dict_action["connectionParams"]["vlanId"] = vlan
-        vlan_service_attrs = get_vlan_service_attrs(new_dict_action)
-        set_val_to_list_attrs(vlan_service_attrs, VLAN_ID, vlan)
+        # copy only changed parts, the rest is shared with the original action
+        new_connection_params = dict_action["connectionParams"].copy()
+        new_connection_params["vlanId"] = vlan
+        new_attrs = vlan_service_attrs.replace_val(VLAN_ID, vlan)
+        new_connection_params["vlanServiceAttributes"] = new_attrs.list_attrs
+        new_dict_action = dict_action.copy()
+        new_dict_action["connectionParams"] = new_connection_params
         yield new_dict_action
 
 
-def patch_vlan_service_vlan_id(dict_action: ActionDict) -> None:
+def patch_vlan_service_vlan_id(
+    dict_action: ActionDict, vlan_service_attrs: IndexedListAttrs | None = None
+) -> None:
     """VLAN ID in VLAN service attributes can be empty."""
     vlan_id = dict_action["connectionParams"]["vlanId"]
-    vlan_service_attrs = get_vlan_service_attrs(dict_action)
+    if vlan_service_attrs is None:
+        vlan_service_attrs = get_indexed_vlan_service_attrs(dict_action)
     set_val_to_list_attrs(vlan_service_attrs, VLAN_ID, vlan_id)
 
 
-def patch_virtual_network(dict_action: ActionDict) -> None:
+def patch_virtual_network(
+    dict_action: ActionDict, vlan_service_attrs: IndexedListAttrs | None = None
+) -> None:
     """Removes Virtual Network if it's equal to VLAN ID.
 
     Virtual Network can contain name or ID of the existed network for this user should
     edit the attribute in Resource Manager.
     By default, Virtual Network contains VLAN ID.
     """
-    vlan_service_attrs = get_vlan_service_attrs(dict_action)
-    vlan_id = get_val_from_list_attrs(vlan_service_attrs, VLAN_ID)
-    set_val_to_list_attrs(
-        vlan_service_attrs, VIRTUAL_NETWORK, "", set_if_eq=str(vlan_id)
-    )
+    if vlan_service_attrs is None:
+        vlan_service_attrs = get_indexed_vlan_service_attrs(dict_action)
+    vlan_id = vlan_service_attrs.get_val(VLAN_ID)
+    vlan_service_attrs.set_val(VIRTUAL_NETWORK, "", set_if_eq=str(vlan_id))
 
 
 def get_vlan_service_attrs(dict_action: ActionDict) -> list[ActionsAttributeDict]:
     return dict_action["connectionParams"]["vlanServiceAttributes"]
+
+
+def get_indexed_vlan_service_attrs(dict_action: ActionDict) -> IndexedListAttrs:
+    return IndexedListAttrs(get_vlan_service_attrs(dict_action))
+
+
+def get_connection_mode(dict_action: ActionDict) -> ConnectionModeEnum:
+    return ConnectionModeEnum(dict_action["connectionParams"]["mode"])
+
+
+def get_vlan_service_vlan_id(
+    dict_action: ActionDict, vlan_service_attrs: IndexedListAttrs | None = None
+) -> str:
+    if vlan_service_attrs is None:
+        return get_val_from_list_attrs(get_vlan_service_attrs(dict_action), VLAN_ID)
+    return vlan_service_attrs.get_val(VLAN_ID)
+
+
+def is_qnq(dict_action: ActionDict) -> bool:
+    """Read QnQ flag without validating the whole action."""
+    return _is_qnq(get_indexed_vlan_service_attrs(dict_action))
+
+
+def _is_qnq(vlan_service_attrs: IndexedListAttrs) -> bool:
+    # if QnQ is missed full validation of the action will fail later
+    value = vlan_service_attrs.get_val(QNQ, "")
+    return str(value).strip().lower() in TRUE_STRINGS
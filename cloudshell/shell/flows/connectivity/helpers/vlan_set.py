@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Generator, Iterable, Iterator, Sequence
+from functools import cache
+from itertools import chain
+from typing import TYPE_CHECKING, Any
+
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.exceptions import VLANHandlerException
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+MIN_VLAN = 1
+MAX_VLAN = 4094
+
+# VLAN or VLAN range, "10", "10-20" or " 10 - 20 "
+_VLAN_RANGE_PATTERN = r"\s*([0-9]+)\s*(?:-\s*([0-9]+)\s*)?"
+_VLAN_STR_RE = re.compile(rf"{_VLAN_RANGE_PATTERN}(?:,{_VLAN_RANGE_PATTERN})*")
+_VLAN_RANGE_RE = re.compile(_VLAN_RANGE_PATTERN)
+
+
+@define
+class VlanContainNotInt(VLANHandlerException):
+    value: Any
+
+    def __str__(self) -> str:
+        return f"VLAN {self.value} isn't a integer"
+
+
+def _validate_vlan_number(str_number: str) -> None:
+    try:
+        number = int(str_number)
+    except ValueError:
+        raise VlanContainNotInt(str_number)
+    if not MIN_VLAN <= number <= MAX_VLAN:
+        raise VLANHandlerException(f"Wrong VLAN detected {number}")
+
+
+def _validate_vlan_range(vlan_range: str) -> None:
+    start, end = vlan_range.split("-")
+    for vlan_number in (start, end):
+        _validate_vlan_number(vlan_number)
+
+
+def iterate_vlan_str(vlan_str: str) -> Generator[tuple[str, int, int], None, None]:
+    """Validate comma separated VLANs and iterate over them.
+
+    Yields stripped VLAN or VLAN range string as it was requested and its first and
+    last VLAN numbers in increasing order.
+    """
+    vlan_ranges = _parse_vlan_str(vlan_str)
+    if vlan_ranges is None:
+        # validate one by one to raise the error for the first wrong VLAN
+        vlan_ranges = map(_parse_vlan_range, map(str.strip, vlan_str.split(",")))
+    yield from vlan_ranges
+
+
+def _parse_vlan_str(vlan_str: str) -> list[tuple[str, int, int]] | None:
+    """Parse the whole VLAN string at once.
+
+    Returns None if it isn't valid or isn't in the simple form of digits.
+    """
+    if _VLAN_STR_RE.fullmatch(vlan_str) is None:
+        return None
+    vlan_ranges = []
+    min_vlan, max_vlan = MAX_VLAN, MIN_VLAN
+    for match in _VLAN_RANGE_RE.finditer(vlan_str):
+        start = int(match[1])
+        end = start if match[2] is None else int(match[2])
+        if start > end:
+            start, end = end, start
+        min_vlan = min(min_vlan, start)
+        max_vlan = max(max_vlan, end)
+        vlan_ranges.append((match[0].strip(), start, end))
+    if min_vlan < MIN_VLAN or max_vlan > MAX_VLAN:
+        return None
+    return vlan_ranges
+
+
+def _parse_vlan_range(vlan_range: str) -> tuple[str, int, int]:
+    if "-" not in vlan_range:
+        _validate_vlan_number(vlan_range)
+        start = end = int(vlan_range)
+    else:
+        _validate_vlan_range(vlan_range)
+        start, end = sorted(map(int, vlan_range.split("-")))
+    return vlan_range, start, end
+
+
+@cache
+def _get_vlan_strs() -> Sequence[str]:
+    """Strings of all VLAN numbers, index is the VLAN number."""
+    return tuple(map(str, range(MAX_VLAN + 1)))
+
+
+def _expand_interval(start: int, end: int) -> Iterable[str]:
+    if 0 <= start and end <= MAX_VLAN:
+        return _get_vlan_strs()[start : end + 1]
+    return map(str, range(start, end + 1))
+
+
+def _normalize(intervals: Iterable[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+    """Merge overlapping and adjacent intervals."""
+    result: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if result and start <= result[-1][1] + 1:
+            if end > result[-1][1]:
+                result[-1] = (result[-1][0], end)
+        else:
+            result.append((start, end))
+    return tuple(result)
+
+
+@define(frozen=True)
+class VlanSet:
+    """Set of VLANs stored as a sorted list of not overlapping intervals."""
+
+    _intervals: tuple[tuple[int, int], ...] = field(converter=_normalize, default=())
+
+    @classmethod
+    def from_str(cls, vlan_str: str) -> Self:
+        """Create from comma separated VLANs and VLAN ranges, "10-20,15-25,26"."""
+        return cls((start, end) for _, start, end in iterate_vlan_str(vlan_str))
+
+    @property
+    def intervals(self) -> tuple[tuple[int, int], ...]:
+        return self._intervals
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self._intervals:
+            yield from range(start, end + 1)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self._intervals)
+
+    def __bool__(self) -> bool:
+        return bool(self._intervals)
+
+    def __contains__(self, vlan: object) -> bool:
+        if not isinstance(vlan, int):
+            return False
+        return any(start <= vlan <= end for start, end in self._intervals)
+
+    def __or__(self, other: VlanSet) -> VlanSet:
+        return self.union(other)
+
+    def __sub__(self, other: VlanSet) -> VlanSet:
+        return self.difference(other)
+
+    def union(self, other: VlanSet) -> VlanSet:
+        return VlanSet(self._intervals + other._intervals)
+
+    def difference(self, other: VlanSet) -> VlanSet:
+        result = []
+        others = other._intervals
+        i = 0
+        for start, end in self._intervals:
+            # skip intervals that end before the current one
+            while i < len(others) and others[i][1] < start:
+                i += 1
+            j = i
+            while j < len(others) and others[j][0] <= end:
+                o_start, o_end = others[j]
+                if o_start > start:
+                    result.append((start, o_start - 1))
+                start = max(start, o_end + 1)
+                j += 1
+            if start <= end:
+                result.append((start, end))
+        return VlanSet(result)
+
+    def to_ranges_list(self) -> list[str]:
+        """Minimal list of VLAN ranges, ["10-26", "30"]."""
+        return [
+            str(start) if start == end else f"{start}-{end}"
+            for start, end in self._intervals
+        ]
+
+    def to_vlan_list(self) -> list[str]:
+        """List of single VLANs, ["10", "11", "12"]."""
+        return list(chain.from_iterable(_expand_interval(*i) for i in self._intervals))
+
+    def __str__(self) -> str:
+        return ",".join(self.to_ranges_list())
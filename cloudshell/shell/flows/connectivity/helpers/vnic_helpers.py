@@ -2,10 +2,9 @@ from __future__ import annotations
 
 import re
 from collections.abc import Generator
-from copy import deepcopy
 from typing import TYPE_CHECKING
 
-from .dict_action_helpers import get_val_from_list_attrs, set_val_to_list_attrs
+from .dict_action_helpers import IndexedListAttrs
 
 if TYPE_CHECKING:
     from .types import ActionDict, ActionsAttributeDict
@@ -24,36 +23,46 @@ def get_connector_attrs(dict_action: ActionDict) -> list[ActionsAttributeDict]:
 
 
 def iterate_dict_actions_by_requested_vnic(
-    dict_action: ActionDict,
+    dict_action: ActionDict, custom_action_attrs: IndexedListAttrs | None = None
 ) -> Generator[ActionDict, None, None]:
-    """Iterates over dict actions by requested vNIC."""
-    custom_action_attrs = get_custom_action_attrs(dict_action)
+    """Iterates over dict actions by requested vNIC.
+
+    :param custom_action_attrs: indexed custom action attributes of the action, to
+        not index them again
+    """
+    if custom_action_attrs is None:
+        custom_action_attrs = IndexedListAttrs(get_custom_action_attrs(dict_action))
     try:
-        vnic_str = get_val_from_list_attrs(custom_action_attrs, VNIC_NAME)
+        vnic_str = custom_action_attrs.get_val(VNIC_NAME)
     except KeyError:
         yield dict_action  # not a Cloud Provider action
     else:
         for vnic in get_vnic_list(vnic_str):
-            new_dict_action = deepcopy(dict_action)
-            custom_action_attrs = get_custom_action_attrs(new_dict_action)
-            set_val_to_list_attrs(custom_action_attrs, VNIC_NAME, vnic)
+            new_dict_action = dict_action.copy()
+            new_attrs = custom_action_attrs.replace_val(VNIC_NAME, vnic)
+            new_dict_action["customActionAttributes"] = new_attrs.list_attrs
             yield new_dict_action
 
 
 def iterate_dict_actions_by_interface(
-    dict_action: ActionDict,
+    dict_action: ActionDict, connector_attrs: IndexedListAttrs | None = None
 ) -> Generator[ActionDict, None, None]:
-    """Iterates over dict actions by requested interface."""
-    connector_attrs = get_connector_attrs(dict_action)
+    """Iterates over dict actions by requested interface.
+
+    :param connector_attrs: indexed connector attributes of the action, to not index
+        them again
+    """
+    if connector_attrs is None:
+        connector_attrs = IndexedListAttrs(get_connector_attrs(dict_action))
     try:
-        iface_str = get_val_from_list_attrs(connector_attrs, INTERFACE)
+        iface_str = connector_attrs.get_val(INTERFACE)
     except KeyError:
         yield dict_action  # not a Cloud Provider action or not a remove action
     else:
         for iface in split_list_str(iface_str):
-            new_dict_action = deepcopy(dict_action)
-            connector_attrs = get_connector_attrs(new_dict_action)
-            set_val_to_list_attrs(connector_attrs, INTERFACE, iface)
+            new_dict_action = dict_action.copy()
+            new_attrs = connector_attrs.replace_val(INTERFACE, iface)
+            new_dict_action["connectorAttributes"] = new_attrs.list_attrs
             yield new_dict_action
 
 
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from collections.abc import Collection
+from threading import Lock
+
+from attrs import define, evolve, field
+
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
+
+
+@define
+class VnicInventory:
+    """Thread-safe vNICs of VMs by VM UUID known during the request.
+
+    Filled with vNICs returned by get_vnics and updated when set actions create
+    or replace vNICs, so the next phases don't need to get vNICs again.
+    """
+
+    _vms_vnics: dict[str, dict[int, VnicInfo]] = field(init=False, factory=dict)
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def get(self, vm_uuid: str) -> list[VnicInfo]:
+        """Returns vNICs of the VM ordered by index or raises KeyError."""
+        with self._lock:
+            vnics = self._vms_vnics[vm_uuid]
+            return [vnics[index] for index in sorted(vnics)]
+
+    def set(self, vm_uuid: str, vnics: Collection[VnicInfo]) -> None:  # noqa: A003
+        with self._lock:
+            self._vms_vnics[vm_uuid] = {vnic.index: vnic for vnic in vnics}
+
+    def set_vnic(self, vm_uuid: str, vnic: VnicInfo) -> None:
+        """Add or replace the vNIC of the VM."""
+        with self._lock:
+            self._vms_vnics.setdefault(vm_uuid, {})[vnic.index] = vnic
+
+    def set_vnic_connected(self, vm_uuid: str, index: int, name: str) -> None:
+        """Mark the vNIC as used by the set action.
+
+        :param name: name of the new vNIC, e.g. the interface returned when it's
+            created, the known vNIC keeps its name
+        """
+        with self._lock:
+            vnics = self._vms_vnics.setdefault(vm_uuid, {})
+            try:
+                vnic = evolve(vnics[index], network_can_be_replaced=False)
+            except KeyError:
+                vnic = VnicInfo(name, index, network_can_be_replaced=False)
+            vnics[index] = vnic
+
+    def invalidate(self, vm_uuid: str) -> None:
+        with self._lock:
+            self._vms_vnics.pop(vm_uuid, None)
+
+    def __contains__(self, vm_uuid: object) -> bool:
+        return vm_uuid in self._vms_vnics
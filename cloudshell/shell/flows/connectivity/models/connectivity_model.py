@@ -4,6 +4,8 @@ from typing import Any, Optional
 
 from pydantic import BaseModel, Field, validator
 
+from cloudshell.shell.flows.connectivity.helpers.vlan_set import VlanSet
+
 
 class ConnectivityTypeEnum(Enum):
     SET_VLAN = "setVlan"
@@ -44,6 +46,11 @@ def get_vm_uuid_or_target(action: "ConnectivityActionModel") -> str:
     return get_vm_uuid(action) or action.action_target.name
 
 
+def get_resource_name(action: "ConnectivityActionModel") -> str:
+    """Returns resource name from the target name, "switch/CH1/M1/P1" -> "switch"."""
+    return action.action_target.name.split("/", 1)[0]
+
+
 class VlanServiceModel(BaseModel):
     qnq: bool = Field(..., alias="QnQ")
     ctag: str = Field(..., alias="CTag")
@@ -65,6 +72,14 @@ class VlanServiceModel(BaseModel):
             warnings.warn(msg, DeprecationWarning, stacklevel=2)
         return super().__getattribute__(item)
 
+    @property
+    def vlan_set(self) -> VlanSet:
+        """VLAN ID as a set of VLAN numbers.
+
+        Raises VLANHandlerException if VLAN ID isn't a valid VLAN or VLAN range.
+        """
+        return VlanSet.from_str(self.vlan_id)
+
 
 class ConnectionParamsModel(BaseModel):
     # if Virtual Network set vlanId will be overwritten
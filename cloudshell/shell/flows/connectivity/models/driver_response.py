@@ -1,14 +1,34 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
 
+from attrs import define
+from pydantic import VERSION as PYDANTIC_VERSION
 from pydantic import BaseModel
 
 from .connectivity_model import ConnectivityActionModel
+from cloudshell.shell.flows.connectivity.helpers.json_backend import (
+    JsonBackend,
+    get_json_backend,
+)
 
 if TYPE_CHECKING:
     from typing_extensions import Self
 
+_PYDANTIC_V1 = PYDANTIC_VERSION.startswith("1.")
+
+# fields of the action result in the order of the wire format
+_ACTION_RESULT_FIELDS = (
+    "actionId",
+    "type",
+    "updatedInterface",
+    "infoMessage",
+    "errorMessage",
+    "success",
+)
+
 
 class ConnectivityActionResult(BaseModel):
     actionId: str  # noqa: N815
@@ -62,6 +82,80 @@ class ConnectivityActionResult(BaseModel):
         return cls.fail_result(action, msg)
 
 
+@define
+class ActionResult:
+    """Result of the sub action used inside the flows.
+
+    Slotted record without validation, cheaper than ConnectivityActionResult for
+    requests with many sub actions. Converted to ConnectivityActionResult or
+    serialized directly when the response is built.
+    """
+
+    action_id: str
+    type: str  # noqa: A003
+    updated_interface: str
+    info_message: str = ""
+    error_message: str = ""
+    success: bool = True
+
+    @classmethod
+    def success_result(
+        cls, action: ConnectivityActionModel, msg: str = "", iface: str = ""
+    ) -> Self:
+        type_ = action.type.value
+        if not msg:
+            msg = f"{type_} {action.connection_params.vlan_id} applied successfully"
+        return cls(
+            action.action_id,
+            type_,
+            iface or action.action_target.name,
+            info_message=msg,
+        )
+
+    @classmethod
+    def fail_result(cls, action: ConnectivityActionModel, msg: str) -> Self:
+        return cls(
+            action.action_id,
+            action.type.value,
+            action.action_target.name,
+            error_message=msg,
+            success=False,
+        )
+
+    @classmethod
+    def skip_result(
+        cls, action: ConnectivityActionModel, msg: str | None = None
+    ) -> Self:
+        if msg is None:
+            msg = "Another action failed. Skipping this action"
+        return cls.fail_result(action, msg)
+
+    @classmethod
+    def from_model(cls, result: ConnectivityActionResult) -> Self:
+        return cls(
+            result.actionId,
+            result.type,
+            result.updatedInterface,
+            result.infoMessage,
+            result.errorMessage,
+            result.success,
+        )
+
+    def to_model(self) -> ConnectivityActionResult:
+        return ConnectivityActionResult(**self.to_dict())
+
+    def to_dict(self) -> dict[str, Any]:
+        """Dict in the wire format."""
+        return {
+            "actionId": self.action_id,
+            "type": self.type,
+            "updatedInterface": self.updated_interface,
+            "infoMessage": self.info_message,
+            "errorMessage": self.error_message,
+            "success": self.success,
+        }
+
+
 class DriverResponse(BaseModel):
     actionResults: list[ConnectivityActionResult]  # noqa: N815
 
@@ -72,3 +166,32 @@ class DriverResponseRoot(BaseModel):
     @classmethod
     def prepare_response(cls, action_results: list[ConnectivityActionResult]) -> Self:
         return cls(driverResponse=DriverResponse(actionResults=action_results))
+
+
+def serialize_response(
+    action_results: Iterable[ConnectivityActionResult | ActionResult],
+    json_backend: JsonBackend | None = None,
+) -> str:
+    """Dump action results in the format of DriverResponseRoot.
+
+    Writes the same JSON as DriverResponseRoot.json() but without creating and
+    validating the models, results are created by the flow and already valid.
+
+    :param action_results: results of the actions
+    :param json_backend: backend to dump JSON, the fastest installed by default;
+        not used with pydantic v1, its json() output is written with the json
+        module
+    """
+    response = {
+        "driverResponse": {"actionResults": list(map(_result_to_dict, action_results))}
+    }
+    if _PYDANTIC_V1:
+        # pydantic v1 dumps with the default separators and escapes non-ASCII
+        return json.dumps(response)
+    return (json_backend or get_json_backend()).dumps(response)
+
+
+def _result_to_dict(result: ConnectivityActionResult | ActionResult) -> dict[str, Any]:
+    if isinstance(result, ActionResult):
+        return result.to_dict()
+    return {name: getattr(result, name) for name in _ACTION_RESULT_FIELDS}
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+from attrs import define
+
+
+@define
+class VnicInfo:
+    name: str
+    index: int
+    network_can_be_replaced: bool
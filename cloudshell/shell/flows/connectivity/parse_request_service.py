@@ -1,14 +1,21 @@
-import json
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
 
+from .helpers.dict_action_helpers import IndexedListAttrs
+from .helpers.json_backend import JsonBackend, get_json_backend
+from .helpers.json_stream import RequestSource, iterate_request_actions
 from .helpers.types import ActionDict
 from .helpers.vlan_helper import (
+    get_indexed_vlan_service_attrs,
     iterate_dict_actions_by_vlan_range,
     patch_virtual_network,
     patch_vlan_service_vlan_id,
 )
 from .helpers.vnic_helpers import (
+    get_connector_attrs,
+    get_custom_action_attrs,
     iterate_dict_actions_by_interface,
     iterate_dict_actions_by_requested_vnic,
 )
@@ -20,6 +27,14 @@ class AbstractParseConnectivityService(ABC):
     def get_actions(self, request: str) -> list[ConnectivityActionModel]:
         raise NotImplementedError()
 
+    def iterate_actions(self, request: str) -> Iterator[ConnectivityActionModel]:
+        """Iterate over actions lazily.
+
+        Allows to start working on the first actions while the rest of them are
+        still being parsed. By default, falls back to get_actions.
+        """
+        yield from self.get_actions(request)
+
 
 class ParseConnectivityRequestService(AbstractParseConnectivityService):
     def __init__(
@@ -27,6 +42,9 @@ class ParseConnectivityRequestService(AbstractParseConnectivityService):
         is_vlan_range_supported: bool,
         is_multi_vlan_supported: bool,
         connectivity_model_cls: type[ConnectivityActionModel] = ConnectivityActionModel,
+        normalize_vlan_ranges: bool = False,
+        json_backend: JsonBackend | None = None,
+        incremental_parsing: bool = False,
     ):
         """Parse a connectivity request and returns connectivity actions.
 
@@ -36,44 +54,72 @@ class ParseConnectivityRequestService(AbstractParseConnectivityService):
             VLAN request like "45, 65, 120-130"
         :param connectivity_model_cls: model that will be returned filled with request
             actions values
+        :param normalize_vlan_ranges: merge overlapping and adjacent VLAN ranges into
+            the minimal set of ranges like "10-20,15-25,26" -> "10-26", used only if
+            VLAN ranges are supported
+        :param json_backend: backend to parse the request, the fastest installed
+            (orjson, ujson, json) by default
+        :param incremental_parsing: decode request actions one by one instead of
+            loading the whole request, memory doesn't grow with the number of
+            actions; the request can be a string, bytes or a file, json_backend
+            isn't used
         """
         self.is_vlan_range_supported = is_vlan_range_supported
         self.is_multi_vlan_supported = is_multi_vlan_supported
         self.connectivity_model_cls = connectivity_model_cls
+        self.normalize_vlan_ranges = normalize_vlan_ranges
+        self.json_backend = json_backend or get_json_backend()
+        self.incremental_parsing = incremental_parsing
 
-    def _iterate_dict_actions(self, request: str) -> Generator[ActionDict, None, None]:
-        dict_actions = json.loads(request)["driverRequest"]["actions"]
+    def _iterate_dict_actions(
+        self, request: RequestSource
+    ) -> Generator[ActionDict, None, None]:
+        """Iterate over request actions split by VLANs, vNICs and interfaces.
 
-        patched_actions = []
+        Every raw action goes through the patching and all the splitters before
+        the next one is touched, so expanded actions are not kept in memory.
+        """
+        if self.incremental_parsing:
+            dict_actions = iterate_request_actions(request)
+        else:
+            if not isinstance(request, (str, bytes, bytearray)):
+                request = request.read()
+            dict_actions = self.json_backend.loads(request)["driverRequest"]["actions"]
         for dict_action in dict_actions:
-            patch_vlan_service_vlan_id(dict_action)
-            patch_virtual_network(dict_action)
-            patched_actions.append(dict_action)
+            yield from self._iterate_split_dict_action(dict_action)
 
-        actions_split_by_vlan_range = []
-        for dict_action in patched_actions:
-            for new_action in iterate_dict_actions_by_vlan_range(
-                dict_action, self.is_vlan_range_supported, self.is_multi_vlan_supported
-            ):
-                actions_split_by_vlan_range.append(new_action)
-
-        actions_split_by_requested_vnic = []
-        for dict_action in actions_split_by_vlan_range:
-            for new_action in iterate_dict_actions_by_requested_vnic(dict_action):
-                actions_split_by_requested_vnic.append(new_action)
+    def _iterate_split_dict_action(
+        self, dict_action: ActionDict
+    ) -> Generator[ActionDict, None, None]:
+        # every list of attributes is indexed once, split actions share the lists
+        # that are not changed by the split
+        vlan_service_attrs = get_indexed_vlan_service_attrs(dict_action)
+        custom_action_attrs = IndexedListAttrs(get_custom_action_attrs(dict_action))
+        connector_attrs = IndexedListAttrs(get_connector_attrs(dict_action))
+        patch_vlan_service_vlan_id(dict_action, vlan_service_attrs)
+        patch_virtual_network(dict_action, vlan_service_attrs)
 
-        actions_split_by_iface: list[ActionDict] = []
-        # for Cloud Provides in remove actions if in set action was specified several
-        # vNICs for the same VLAN Service
-        for dict_action in actions_split_by_requested_vnic:
-            for new_action in iterate_dict_actions_by_interface(dict_action):
-                actions_split_by_iface.append(new_action)
+        for vlan_action in iterate_dict_actions_by_vlan_range(
+            dict_action,
+            self.is_vlan_range_supported,
+            self.is_multi_vlan_supported,
+            self.normalize_vlan_ranges,
+            vlan_service_attrs,
+        ):
+            for vnic_action in iterate_dict_actions_by_requested_vnic(
+                vlan_action, custom_action_attrs
+            ):
+                # for Cloud Provides in remove actions if in set action was
+                # specified several vNICs for the same VLAN Service
+                yield from iterate_dict_actions_by_interface(
+                    vnic_action, connector_attrs
+                )
 
-        # for backward compatibility
-        yield from actions_split_by_iface
+    def iterate_actions(
+        self, request: RequestSource
+    ) -> Iterator[ConnectivityActionModel]:
+        for dict_action in self._iterate_dict_actions(request):
+            yield self.connectivity_model_cls.parse_obj(dict_action)
 
-    def get_actions(self, request: str) -> list[ConnectivityActionModel]:
-        return [
-            self.connectivity_model_cls.parse_obj(da)
-            for da in self._iterate_dict_actions(request)
-        ]
+    def get_actions(self, request: RequestSource) -> list[ConnectivityActionModel]:
+        return list(self.iterate_actions(request))
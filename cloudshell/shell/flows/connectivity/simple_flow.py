@@ -3,7 +3,7 @@ from typing import Callable
 
 from .exceptions import ApplyConnectivityException
 from .models.connectivity_model import ConnectivityActionModel, ConnectivityTypeEnum
-from .models.driver_response import ConnectivityActionResult, DriverResponseRoot
+from .models.driver_response import ConnectivityActionResult, serialize_response
 from .parse_request_service import ParseConnectivityRequestService
 
 logger = logging.getLogger(__name__)
@@ -38,11 +38,11 @@ def apply_connectivity_changes(
 
     results = []
     for action in actions:
-        logger.info(f"Action: {actions}")
+        logger.info(f"Action: {action}")
         if action.type is ConnectivityTypeEnum.SET_VLAN:
             action_result = add_vlan_action(action)
         else:
             action_result = remove_vlan_action(action)
         results.append(action_result)
 
-    return str(DriverResponseRoot.prepare_response(results).json())
+    return serialize_response(results)
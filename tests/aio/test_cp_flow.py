@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from unittest.mock import Mock, call
+from uuid import uuid4
+
+import pytest
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.aio.cloud_providers_flow import (
+    AbcAsyncCloudProviderConnectivityFlow,
+)
+from cloudshell.shell.flows.connectivity.cloud_providers_flow import VnicInfo
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+    get_vnic,
+)
+from tests.base import (
+    DEFAULT_VM_UUID,
+    AsyncTestConnectivityFlowHelper,
+    check_successful_result,
+    create_cp_ad,
+    create_request,
+    get_actions,
+    get_one_action,
+    get_one_result,
+    get_results,
+)
+
+
+@define
+class ConnectivityFlow(
+    AsyncTestConnectivityFlowHelper, AbcAsyncCloudProviderConnectivityFlow
+):
+    is_clear_success: bool | list[bool] = True
+    is_set_success: bool | list[bool] = True
+    is_remove_success: bool | list[bool] = True
+    manager = field(factory=Mock)
+    vnics = field(factory=list)
+    def_vm = field(init=False)
+    vms = field(factory=dict)
+    load_target_calls: int = 0
+
+    def __attrs_post_init__(self):
+        self.def_vm = Mock(macs={i: str(uuid4()) for i in range(1, 11)})
+        self.vnics = [VnicInfo("Network adapter 1", 1, True)]
+        self.vms = {DEFAULT_VM_UUID: self.def_vm}
+
+    async def get_vnics(self, vm: Any) -> list[VnicInfo]:
+        return self.vnics
+
+    async def load_target(self, target_name: str) -> Any:
+        self.load_target_calls += 1
+        await asyncio.sleep(0)
+        return self.vms[target_name]
+
+    async def set_vlan(self, action: ConnectivityActionModel, target: Any) -> str:
+        await super().set_vlan(action, target)
+        return target.macs[int(get_vnic(action))]
+
+
+@pytest.fixture(params=(False, True), ids=("phases", "pipeline"))
+def cf(request, parse_connectivity_request_service):
+    return ConnectivityFlow(
+        parse_connectivity_request_service=parse_connectivity_request_service,
+        pipeline_targets=request.param,
+    )
+
+
+def test_one_set_vlan(cf):
+    """Request contains one set VLAN action without vnic specified.
+
+    - execute set VLAN action
+    - return success response
+    """
+    request = create_request(create_cp_ad(set_vlan=True, vnic=None))
+
+    resp_str = asyncio.run(cf.apply_connectivity(request))
+
+    action = get_one_action(cf)
+    assert cf.manager.mock_calls == [call.set_vlan(action, cf.def_vm)]
+    assert get_vnic(action) == "1"
+    result = get_one_result(resp_str)
+    check_successful_result(result, action, targets=[cf.def_vm.macs[1]])
+
+
+def test_set_vlan_with_several_vnics_failed_rollback(cf):
+    """Request contains 2 set VLAN actions for new vNICs, the 2nd fails.
+
+    - VM has 1 vNIC that can be used
+    - the first action connects existed vNIC
+    - the failed action and skipped actions are rolled back
+    - VM is loaded only once
+    """
+    cf.is_set_success = [True, False, True]
+    set_ad1 = create_cp_ad(set_vlan=True, vnic="1", vlan_id="11")
+    set_ad2 = create_cp_ad(set_vlan=True, vnic="2,3", vlan_id="12")
+    request = create_request(set_ad1, set_ad2)
+    set_ad2_2 = create_cp_ad(
+        set_vlan=True, vnic="2", vlan_id="12", action_id=set_ad2["actionId"]
+    )
+    set_ad2_3 = create_cp_ad(
+        set_vlan=True, vnic="3", vlan_id="12", action_id=set_ad2["actionId"]
+    )
+
+    resp_str = asyncio.run(cf.apply_connectivity(request))
+
+    set_action1, set_action2_2, set_action2_3 = get_actions(
+        cf, set_ad1, set_ad2_2, set_ad2_3
+    )
+    assert cf.manager.mock_calls == [
+        call.set_vlan(set_action1, cf.def_vm),
+        call.set_vlan(set_action2_2, cf.def_vm),
+        call.clear(set_action2_2, cf.def_vm),
+        call.clear(set_action2_3, cf.def_vm),
+    ]
+    assert cf.load_target_calls == 1
+
+    set_res1, set_res2 = get_results(resp_str, set_ad1, set_ad2)
+    check_successful_result(set_res1, set_action1, targets=[cf.def_vm.macs[1]])
+    assert set_res2.success is False
+
+
+def test_vnics_inventory_reset_for_every_request(cf):
+    set_ad = create_cp_ad(set_vlan=True, vnic="2")
+
+    asyncio.run(cf.apply_connectivity(create_request(set_ad)))
+    # vNIC was added on the VM between the requests
+    cf.vnics = [
+        VnicInfo("Network adapter 1", 1, True),
+        VnicInfo("Network adapter 2", 2, True),
+    ]
+    asyncio.run(cf.apply_connectivity(create_request(set_ad)))
+
+    assert cf.vnics_inventory.get(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, True),
+        VnicInfo("Network adapter 2", 2, False),
+    ]
+
+
+def test_vnics_inventory_updated_by_set_actions(cf):
+    set_ad1 = create_cp_ad(set_vlan=True, vnic="1", vlan_id="11")
+    set_ad2 = create_cp_ad(set_vlan=True, vnic="2", vlan_id="12")
+
+    asyncio.run(cf.apply_connectivity(create_request(set_ad1, set_ad2)))
+
+    assert cf.vnics_inventory.get(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, False),
+        VnicInfo(cf.def_vm.macs[2], 2, False),
+    ]
+
+
+@define
+class BatchConnectivityFlow(ConnectivityFlow):
+    batch_new_vnics_per_vm = True
+
+    async def create_vnics_batch(self, vm, actions):
+        self.manager.create_vnics_batch(vm, actions)
+        return [vm.macs[int(get_vnic(a))] for a in actions]
+
+
+def test_create_vnics_batch(parse_connectivity_request_service):
+    cf = BatchConnectivityFlow(
+        parse_connectivity_request_service=parse_connectivity_request_service
+    )
+    ads = [
+        create_cp_ad(set_vlan=True, vnic=str(vnic), vlan_id=str(10 + vnic))
+        for vnic in (1, 2, 3)
+    ]
+
+    resp_str = asyncio.run(cf.apply_connectivity(create_request(*ads)))
+
+    action1, action2, action3 = get_actions(cf, *ads)
+    assert sorted(cf.manager.mock_calls, key=str) == [
+        call.create_vnics_batch(cf.def_vm, (action2, action3)),
+        call.set_vlan(action1, cf.def_vm),
+    ]
+    results = get_results(resp_str, *ads)
+    for res, action, vnic in zip(results, (action1, action2, action3), (1, 2, 3)):
+        check_successful_result(res, action, targets=[cf.def_vm.macs[vnic]])
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import Mock, call
+
+import pytest
+from attrs import define, field
+
+from cloudshell.shell.flows.connectivity.aio.devices_flow import (
+    AbcAsyncDeviceConnectivityFlow,
+)
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectionModeEnum,
+)
+from cloudshell.shell.flows.connectivity.parse_request_service import (
+    ParseConnectivityRequestService,
+)
+from tests.base import (
+    DEFAULT_TARGET,
+    AsyncTestConnectivityFlowHelper,
+    check_failed_result,
+    check_successful_result,
+    create_net_ad,
+    create_request,
+    get_actions,
+    get_one_action,
+    get_one_result,
+    get_results,
+)
+
+
+@define
+class ConnectivityFlow(AsyncTestConnectivityFlowHelper, AbcAsyncDeviceConnectivityFlow):
+    is_clear_success: bool | list[bool] = True
+    is_set_success: bool | list[bool] = True
+    is_remove_success: bool | list[bool] = True
+    manager = field(factory=Mock)
+
+
+@pytest.fixture()
+def parse_connectivity_request_service():
+    return ParseConnectivityRequestService(
+        is_vlan_range_supported=False, is_multi_vlan_supported=False
+    )
+
+
+@pytest.fixture(params=(False, True), ids=("phases", "pipeline"))
+def connectivity_flow(request, parse_connectivity_request_service):
+    return ConnectivityFlow(
+        parse_connectivity_request_service, pipeline_targets=request.param
+    )
+
+
+def test_one_set_vlan(connectivity_flow):
+    """Request contains one set VLAN action.
+
+    - execute clear for the target
+    - execute set VLAN for the target
+    - return success response
+    """
+    request = create_request(create_net_ad(set_vlan=True))
+
+    resp_str = asyncio.run(connectivity_flow.apply_connectivity(request))
+
+    action = get_one_action(connectivity_flow)
+    expected_calls = [call.clear(action, None), call.set_vlan(action, None)]
+    assert connectivity_flow.manager.mock_calls == expected_calls
+    check_successful_result(get_one_result(resp_str), action)
+
+
+def test_one_set_vlan_failed_to_set(connectivity_flow):
+    """Request contains one set VLAN action.
+
+    - execute clear for the target
+    - execute set VLAN for the target that fails
+    - execute rollback - clear the target
+    - return failed response
+    """
+    connectivity_flow.is_set_success = False
+    request = create_request(create_net_ad(set_vlan=True))
+
+    resp_str = asyncio.run(connectivity_flow.apply_connectivity(request))
+
+    action = get_one_action(connectivity_flow)
+    expected_calls = [
+        call.clear(action, None),
+        call.set_vlan(action, None),
+        call.clear(action, None),
+    ]
+    assert connectivity_flow.manager.mock_calls == expected_calls
+    check_failed_result(get_one_result(resp_str), action)
+
+
+def test_one_set_and_one_remove_vlan_failed_to_clear(connectivity_flow):
+    """Request contains one set VLAN action and one remove VLAN action.
+
+    - execute clear with set VLAN action that fails
+    - execute remove VLAN with remove VLAN action
+    - do not execute set VLAN
+    - return two results - set VLAN failed, remove VLAN success
+    """
+    connectivity_flow.is_clear_success = False
+    set_ad = create_net_ad(set_vlan=True)
+    remove_ad = create_net_ad(set_vlan=False)
+    request = create_request(set_ad, remove_ad)
+
+    resp_str = asyncio.run(connectivity_flow.apply_connectivity(request))
+
+    set_action, remove_action = get_actions(connectivity_flow, set_ad, remove_ad)
+    expected_calls = [
+        call.clear(set_action, None),
+        call.remove_vlan(remove_action, None),
+    ]
+    assert connectivity_flow.manager.mock_calls == expected_calls
+
+    set_resp, remove_resp = get_results(resp_str, set_ad, remove_ad)
+    check_failed_result(set_resp, set_action)
+    check_successful_result(remove_resp, remove_action)
+
+
+def test_set_vlan_range_failed_to_set(connectivity_flow):
+    """Request contains one set VLAN range action that splits to sub actions.
+
+    - execute clear with the last of the set VLAN sub actions
+    - execute set VLAN for sub actions, 1st and 3rd fail, 2nd success
+    - return one failed result with 2 errors
+    """
+    connectivity_flow.is_set_success = [False, True, False]
+    set_ad1 = create_net_ad(
+        set_vlan=True, vlan_id="11-13", mode=ConnectionModeEnum.TRUNK, uniq_id=False
+    )
+    request = create_request(set_ad1)
+    set_ad1_1 = create_net_ad(set_vlan=True, vlan_id="11", uniq_id=False)
+    set_ad1_2 = create_net_ad(set_vlan=True, vlan_id="12", uniq_id=False)
+    set_ad1_3 = create_net_ad(set_vlan=True, vlan_id="13", uniq_id=False)
+
+    resp_str = asyncio.run(connectivity_flow.apply_connectivity(request))
+
+    set_action1_1, set_action1_2, set_action1_3 = get_actions(
+        connectivity_flow, set_ad1_1, set_ad1_2, set_ad1_3
+    )
+    expected_calls = [
+        call.clear(set_action1_3, None),
+        call.set_vlan(set_action1_1, None),
+        call.set_vlan(set_action1_2, None),
+        call.set_vlan(set_action1_3, None),
+        call.clear(set_action1_1, None),
+    ]
+    assert connectivity_flow.manager.mock_calls == expected_calls
+    check_failed_result(get_one_result(resp_str), set_action1_1, set_action1_3)
+
+
+def test_max_concurrent_actions_per_resource(parse_connectivity_request_service):
+    running = {"sw1": 0, "sw2": 0}
+    max_running = {"sw1": 0, "sw2": 0}
+
+    @define
+    class Flow(ConnectivityFlow):
+        async def set_vlan(self, action, target):
+            resource = action.action_target.name.split("/")[0]
+            running[resource] += 1
+            max_running[resource] = max(max_running[resource], running[resource])
+            await asyncio.sleep(0.01)
+            running[resource] -= 1
+            return await super().set_vlan(action, target)
+
+    cf = Flow(parse_connectivity_request_service, max_concurrent_actions_per_resource=2)
+    ads = [
+        create_net_ad(set_vlan=True, target=f"{sw}/1/{port}")
+        for sw in ("sw1", "sw2")
+        for port in range(4)
+    ]
+
+    resp_str = asyncio.run(cf.apply_connectivity(create_request(*ads)))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert max_running == {"sw1": 2, "sw2": 2}
+
+
+def test_prefetch_targets_with_load_targets(parse_connectivity_request_service):
+    load_targets_calls = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        async def load_targets(self, target_names):
+            load_targets_calls.append(set(target_names))
+            return {name: f"target {name}" for name in target_names}
+
+        async def load_target(self, target_name):
+            raise AssertionError("shouldn't be called")
+
+    ads = [
+        create_net_ad(target="sw1/Port1", vlan_id="10"),
+        create_net_ad(target="sw1/Port1", vlan_id="11"),
+        create_net_ad(target="sw2/Port1", vlan_id="10"),
+    ]
+    cf = Flow(parse_connectivity_request_service)
+    resp_str = asyncio.run(cf.apply_connectivity(create_request(*ads)))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert load_targets_calls == [{"sw1/Port1", "sw2/Port1"}]
+
+
+@pytest.mark.parametrize("pipeline_targets", (False, True), ids=("phases", "pipeline"))
+def test_prefetch_target_failed_is_not_loaded_again(
+    parse_connectivity_request_service, pipeline_targets, caplog
+):
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        async def load_target(self, target_name):
+            loaded.append(target_name)
+            raise ValueError("fail")
+
+    ads = [create_net_ad(vlan_id="10"), create_net_ad(vlan_id="11", set_vlan=False)]
+    cf = Flow(parse_connectivity_request_service, pipeline_targets=pipeline_targets)
+    with pytest.raises(ValueError, match="fail"):
+        asyncio.run(cf.apply_connectivity(create_request(*ads)))
+
+    assert loaded == [DEFAULT_TARGET]
+    assert f"Failed to prefetch target {DEFAULT_TARGET}" in caplog.text
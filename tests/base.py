@@ -28,6 +28,8 @@ from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectionModeEnum,
     ConnectivityActionModel,
     ConnectivityTypeEnum,
+    get_vm_uuid,
+    get_vnic,
 )
 from cloudshell.shell.flows.connectivity.models.driver_response import (
     ConnectivityActionResult,
@@ -225,6 +227,17 @@ class TestConnectivityFlowHelper:
         return actions
 
 
+class AsyncTestConnectivityFlowHelper(TestConnectivityFlowHelper):
+    async def clear(self, action: ConnectivityActionModel, target: Any) -> str:
+        return super().clear(action, target)
+
+    async def set_vlan(self, action: ConnectivityActionModel, target: Any) -> str:
+        return super().set_vlan(action, target)
+
+    async def remove_vlan(self, action: ConnectivityActionModel, target: Any) -> str:
+        return super().remove_vlan(action, target)
+
+
 def get_one_result(resp_str: str) -> ConnectivityActionResult:
     resp: DriverResponseRoot = DriverResponseRoot.parse_raw(resp_str)
     assert len(resp.driverResponse.actionResults) == 1, "Only one result is expected"
@@ -304,7 +317,9 @@ def check_successful_result(
 
 
 def check_failed_result(
-    resp: ConnectivityActionResult, *actions: ConnectivityActionModel
+    resp: ConnectivityActionResult,
+    *actions: ConnectivityActionModel,
+    error: str = "fail",
 ) -> None:
     assert resp.success is False
     assert resp.infoMessage == ""
@@ -319,7 +334,14 @@ def check_failed_result(
     expected_msgs = []
     for action in actions:
         vlan = action.connection_params.vlan_id
-        expected_msgs.append(f"Failed to {type_} {vlan} for {target}. Error: fail")
+        vm_info = ""
+        if vm_uuid := get_vm_uuid(action):
+            vm_info = f" on VM ID {vm_uuid}"
+            if vnic := get_vnic(action):
+                vm_info += f" for vNIC {vnic}"
+        expected_msgs.append(
+            f"Failed to {type_} {vlan} for {target}{vm_info}. Error: {error}"
+        )
 
     msgs = resp.errorMessage.splitlines()
     assert sorted(msgs) == sorted(expected_msgs)
@@ -0,0 +1,66 @@
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.action_results import (
+    get_failed_action_ids,
+    save_batch_result,
+)
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectivityActionModel,
+)
+from tests.base import create_net_ad
+
+
+@pytest.fixture
+def actions():
+    return [
+        ConnectivityActionModel.parse_obj(create_net_ad(vlan_id=str(vlan)))
+        for vlan in (10, 11, 12)
+    ]
+
+
+@pytest.fixture
+def results(actions):
+    results = ResultsAggregator()
+    results.register(actions)
+    return results
+
+
+def test_save_batch_result(actions, results):
+    batch_result = ["Port1", ValueError("fail"), "Port3"]
+
+    action_results = save_batch_result(results, actions, batch_result)
+
+    assert [r.success for r in action_results] == [True, False, True]
+    assert action_results[0].updated_interface == "Port1"
+    assert action_results[1].error_message.endswith("Error: fail")
+    assert get_failed_action_ids([a.action_id for a in actions], results) == {
+        actions[1].action_id
+    }
+
+
+def test_save_batch_result_skip_after_failure(actions, results):
+    batch_result = ["Port1", ValueError("fail"), "Port3"]
+
+    action_results = save_batch_result(
+        results, actions, batch_result, skip_after_failure=True
+    )
+
+    assert [r.success for r in action_results] == [True, False, False]
+    assert action_results[2].error_message == (
+        "Another action failed. Skipping this action"
+    )
+
+
+@pytest.mark.parametrize(
+    "batch_result", (ValueError("fail"), ["Port1"]), ids=("raised", "wrong-length")
+)
+def test_save_batch_result_fails_all_actions(actions, results, batch_result):
+    action_results = save_batch_result(
+        results, actions, batch_result, skip_after_failure=True
+    )
+
+    assert not any(r.success for r in action_results)
+    assert all("Error: " in r.error_message for r in action_results)
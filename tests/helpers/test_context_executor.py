@@ -0,0 +1,26 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudshell.shell.flows.connectivity.helpers.context_executor import (
+    ContextExecutor,
+)
+
+var: contextvars.ContextVar[str] = contextvars.ContextVar("var")
+
+
+def test_context_executor_runs_tasks_in_captured_context():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        var.set("first")
+        first = ContextExecutor(executor)
+        var.set("second")
+        second = ContextExecutor(executor)
+
+        assert list(first.map(lambda _: var.get(), range(4))) == ["first"] * 4
+        assert second.submit(var.get).result() == "second"
+
+        # changes in tasks don't leak to the captured context
+        first.submit(var.set, "changed").result()
+        assert first.submit(var.get).result() == "first"
+
+        first.shutdown()
+        assert executor.submit(lambda: 1).result() == 1
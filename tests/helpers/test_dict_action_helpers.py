@@ -1,7 +1,9 @@
 import pytest
 
 from cloudshell.shell.flows.connectivity.helpers.dict_action_helpers import (
+    IndexedListAttrs,
     get_val_from_list_attrs,
+    replace_val_in_list_attrs,
     set_val_to_list_attrs,
 )
 
@@ -28,3 +30,56 @@ def test_set_val_to_list_attrs():
     assert "new_value2" == get_val_from_list_attrs(list_attrs, "name2")
     with pytest.raises(KeyError):
         set_val_to_list_attrs(list_attrs, "name3", "new_value3")
+
+
+def test_replace_val_in_list_attrs():
+    list_attrs = [
+        {"attributeName": "name1", "attributeValue": "value1"},
+        {"attributeName": "name2", "attributeValue": "value2"},
+    ]
+    new_list_attrs = replace_val_in_list_attrs(list_attrs, "name1", "new_value1")
+    assert "new_value1" == get_val_from_list_attrs(new_list_attrs, "name1")
+    assert "value1" == get_val_from_list_attrs(list_attrs, "name1")
+    assert new_list_attrs[1] is list_attrs[1]
+    with pytest.raises(KeyError):
+        replace_val_in_list_attrs(list_attrs, "name3", "new_value3")
+
+
+def test_indexed_list_attrs():
+    list_attrs = [
+        {"attributeName": "name1", "attributeValue": "value1"},
+        {"attributeName": "name2", "attributeValue": "value2"},
+        {"attributeName": "name1", "attributeValue": "duplicate"},
+    ]
+    attrs = IndexedListAttrs(list_attrs)
+
+    assert "name1" in attrs
+    assert "name3" not in attrs
+    assert "value1" == attrs.get_val("name1")
+    assert "default" == attrs.get_val("name3", "default")
+    with pytest.raises(KeyError):
+        attrs.get_val("name3")
+
+    attrs.set_val("name2", "new_value2", set_if_eq="another")
+    assert "value2" == get_val_from_list_attrs(list_attrs, "name2")
+    attrs.set_val("name2", "new_value2", set_if_eq="value2")
+    assert "new_value2" == get_val_from_list_attrs(list_attrs, "name2")
+    with pytest.raises(KeyError):
+        attrs.set_val("name3", "new_value3")
+
+
+def test_indexed_list_attrs_replace_val():
+    list_attrs = [
+        {"attributeName": "name1", "attributeValue": "value1"},
+        {"attributeName": "name2", "attributeValue": "value2"},
+    ]
+    attrs = IndexedListAttrs(list_attrs)
+
+    new_attrs = attrs.replace_val("name2", "new_value2")
+
+    assert "new_value2" == new_attrs.get_val("name2")
+    assert "value2" == attrs.get_val("name2")
+    assert new_attrs.list_attrs[0] is list_attrs[0]
+    assert new_attrs._index is attrs._index
+    with pytest.raises(KeyError):
+        attrs.replace_val("name3", "new_value3")
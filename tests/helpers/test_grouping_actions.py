@@ -1,11 +1,22 @@
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Collection
+from itertools import filterfalse
+
 import pytest
 
-from cloudshell.shell.flows.connectivity.cloud_providers_flow import VnicInfo
-from cloudshell.shell.flows.connectivity.helpers.group_cp_actions import group_actions
+from cloudshell.shell.flows.connectivity.helpers.group_cp_actions import (
+    NewVnicsGroup,
+    _sort_actions_by_vnic,
+    group_actions,
+)
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectivityActionModel,
     get_vnic,
 )
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
 from tests.base import create_cp_ad
 
 
@@ -136,3 +147,143 @@ def test_grouping_actions(
         for action, expected_indexes in zip(actions, expected_actions_indexes):
             assert get_vnic(action) == expected_indexes[0]
             assert requested_actions.index(action) == expected_indexes[1]
+
+
+def test_grouping_actions_marks_new_vnics_group():
+    actions = _create_actions(["1", "", "3"])
+
+    groups = group_actions(actions, [VnicInfo("1", 1, True)])
+
+    assert [type(group) for group in groups] == [tuple, NewVnicsGroup]
+    assert groups[-1] == tuple(actions[1:])
+
+
+def _group_actions_quadratic(
+    actions: Collection[ConnectivityActionModel], vnics: Collection[VnicInfo]
+) -> list[tuple[ConnectivityActionModel, ...]]:
+    """Previous implementation of group_actions, used as the reference."""
+    last_vnic_index = max(vnic.index for vnic in vnics)
+    vnics_to_use = {vnic.index: vnic for vnic in vnics if vnic.network_can_be_replaced}
+    actions = sorted(actions, key=_sort_actions_by_vnic)
+
+    actions_to_replace_vnics = []
+    actions_to_create_new_vnics = []
+    for action in filter(get_vnic, actions):
+        vnic_index = int(get_vnic(action))
+        if vnics_to_use.pop(vnic_index, None):
+            actions_to_replace_vnics.append(action)
+        elif vnic_index > last_vnic_index:
+            actions_to_create_new_vnics.append(action)
+        else:
+            raise ValueError(
+                f"Cannot connect to vNIC {vnic_index} because it is already used"
+            )
+
+    for action in filterfalse(get_vnic, actions):
+        if vnics_to_use:
+            vnic_index = next(iter(vnics_to_use))
+            vnics_to_use.pop(vnic_index)
+            action.custom_action_attrs.vnic = str(vnic_index)
+            actions_to_replace_vnics.append(action)
+        else:
+            prev_used_index = last_vnic_index
+            for i, another_action in enumerate(actions_to_create_new_vnics):
+                if int(get_vnic(another_action)) == prev_used_index + 1:
+                    prev_used_index += 1
+                else:
+                    action.custom_action_attrs.vnic = str(prev_used_index + 1)
+                    actions_to_create_new_vnics.insert(i, action)
+                    break
+            else:
+                action.custom_action_attrs.vnic = str(prev_used_index + 1)
+                actions_to_create_new_vnics.append(action)
+
+    prev_index = last_vnic_index
+    for action in actions_to_create_new_vnics:
+        vnic_index = int(get_vnic(action))
+        if vnic_index != prev_index + 1:
+            raise ValueError(
+                "There are gaps between vNIC indexes that should be created"
+            )
+        prev_index = vnic_index
+
+    groups_actions = [(a,) for a in actions_to_replace_vnics]
+    if actions_to_create_new_vnics:
+        groups_actions.append(tuple(actions_to_create_new_vnics))
+    return groups_actions
+
+
+def _create_actions(actions_vnics):
+    return [
+        ConnectivityActionModel.parse_obj(create_cp_ad(vnic=vnic))
+        for vnic in actions_vnics
+    ]
+
+
+def _get_positions(actions, groups):
+    """Groups as (action position, vNIC)."""
+    positions = {id(a): i for i, a in enumerate(actions)}
+    return [[(positions[id(a)], get_vnic(a)) for a in group] for group in groups]
+
+
+def _run_grouping(fn, vnics, actions_vnics):
+    """Returns groups as (action position, vNIC) or the error message."""
+    actions = _create_actions(actions_vnics)
+    try:
+        groups = fn(actions, vnics)
+    except ValueError as e:
+        return str(e)
+    return _get_positions(actions, groups)
+
+
+def _random_case(rnd: random.Random) -> tuple[list[VnicInfo], list[str]]:
+    indexes = rnd.sample(range(12), rnd.randint(1, 6))
+    vnics = [VnicInfo(str(i), i, rnd.random() < 0.5) for i in indexes]
+    last_index = max(indexes)
+    # mostly vNICs that can be used, sometimes any index to check errors
+    free_indexes = [v.index for v in vnics if v.network_can_be_replaced]
+    free_indexes += range(last_index + 1, last_index + 6)
+    actions_vnics = []
+    for _ in range(rnd.randint(1, 10)):
+        chance = rnd.random()
+        if chance < 0.05:
+            actions_vnics.append(str(rnd.randint(0, last_index + 6)))
+        elif chance < 0.4:
+            actions_vnics.append(str(rnd.choice(free_indexes)))
+        else:
+            actions_vnics.append("")
+    return vnics, actions_vnics
+
+
+def test_grouping_actions_matches_previous_implementation():
+    rnd = random.Random(24)
+    for _ in range(500):
+        vnics, actions_vnics = _random_case(rnd)
+
+        expected = _run_grouping(_group_actions_quadratic, vnics, actions_vnics)
+        result = _run_grouping(group_actions, vnics, actions_vnics)
+
+        assert result == expected, (vnics, actions_vnics)
+
+
+def test_grouping_actions_hundreds_of_vnics_benchmark(record_property):
+    vnics = [VnicInfo(str(i), i, i % 2 == 0) for i in range(1, 201)]
+    # requested new vNICs with gaps filled by actions without vNIC
+    actions_vnics = [str(i) for i in range(201, 1001, 4)] + [""] * 700
+
+    quadratic_actions = _create_actions(actions_vnics)
+    actions = _create_actions(actions_vnics)
+
+    # time only the grouping, timings depend on the machine and are only recorded
+    start = time.perf_counter()
+    quadratic_groups = _group_actions_quadratic(quadratic_actions, vnics)
+    quadratic_time = time.perf_counter() - start
+    start = time.perf_counter()
+    groups = group_actions(actions, vnics)
+    linear_time = time.perf_counter() - start
+
+    record_property("quadratic_time", quadratic_time)
+    record_property("linear_time", linear_time)
+    result = _get_positions(actions, groups)
+    assert result == _get_positions(quadratic_actions, quadratic_groups)
+    assert len(result[-1]) == 800
@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.json_backend import (
+    JsonBackendNotAvailable,
+    get_available_json_backends,
+    get_json_backend,
+)
+from cloudshell.shell.flows.connectivity.parse_request_service import (
+    ParseConnectivityRequestService,
+)
+from tests.base import create_net_ad, create_request
+
+BACKENDS = get_available_json_backends()
+BACKEND_IDS = [b.name for b in BACKENDS]
+
+
+def test_default_backend():
+    assert get_json_backend() is BACKENDS[0]
+    assert get_json_backend("json") is get_json_backend("json")
+
+
+def test_unknown_backend():
+    with pytest.raises(JsonBackendNotAvailable, match="Unknown JSON backend"):
+        get_json_backend("simplejson")
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=BACKEND_IDS)
+def test_backend_loads_and_dumps(backend):
+    obj = {"b": [1, "é中", 'a "quoted"\n</tag>'], "a": {"c": True, "d": None}}
+
+    dumped = backend.dumps(obj)
+
+    assert dumped == json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    assert backend.loads(dumped) == obj
+    assert backend.loads(dumped.encode()) == obj
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=BACKEND_IDS)
+def test_parse_request_with_backend(backend):
+    request = create_request(create_net_ad(), create_net_ad(set_vlan=False))
+    service = ParseConnectivityRequestService(
+        is_vlan_range_supported=False,
+        is_multi_vlan_supported=False,
+        json_backend=backend,
+    )
+    stdlib_service = ParseConnectivityRequestService(
+        is_vlan_range_supported=False,
+        is_multi_vlan_supported=False,
+        json_backend=get_json_backend("json"),
+    )
+
+    assert service.get_actions(request) == stdlib_service.get_actions(request)
+    assert service.get_actions(request.encode()) == service.get_actions(request)
+
+
+def test_benchmark_backends_on_big_request(record_property):
+    """Compare backends on a request from a big sandbox (several MB)."""
+    request = create_request(
+        *(create_net_ad(target=f"sw{i % 50}/1/{i}") for i in range(8000))
+    )
+    assert len(request) > 5_000_000
+
+    timings = {}
+    for backend in BACKENDS:
+        data = backend.loads(request)
+        assert data == json.loads(request)
+        timings[backend.name] = min(_measure(backend.loads, request) for _ in range(3))
+        assert json.loads(backend.dumps(data)) == data
+
+    # timings depend on the machine, only record them
+    for name, timing in timings.items():
+        record_property(f"{name}_loads_ms", round(timing * 1000, 1))
+
+
+def _measure(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
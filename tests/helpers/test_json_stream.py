@@ -0,0 +1,145 @@
+import io
+import json
+import random
+import tracemalloc
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.json_stream import (
+    iterate_request_actions,
+)
+from tests.base import create_net_ad, create_request
+
+ACTIONS = [
+    {"actionId": "1", "vlanId": "10-20", "name": 'é中 "quoted"', "num": 12345},
+    {"actionId": "2", "nested": {"list": [1, 2.5, None, True]}, "num": -7},
+]
+REQUEST = json.dumps(
+    {
+        "before": {"actions": ["not these"]},
+        "driverRequest": {"skip": [1, {"x": "]"}], "actions": ACTIONS, "after": 1},
+        "after": "x",
+    },
+    indent=2,
+    ensure_ascii=False,
+)
+
+
+@pytest.mark.parametrize(
+    "source",
+    (
+        REQUEST,
+        REQUEST.encode(),
+        io.StringIO(REQUEST),
+        io.BytesIO(REQUEST.encode()),
+    ),
+    ids=("str", "bytes", "text file", "binary file"),
+)
+@pytest.mark.parametrize("chunk_size", (1, 7, 1024))
+def test_iterate_request_actions(source, chunk_size):
+    if not isinstance(source, (str, bytes)):
+        source.seek(0)
+
+    actions = list(iterate_request_actions(source, chunk_size=chunk_size))
+
+    assert actions == ACTIONS
+
+
+@pytest.mark.parametrize(
+    "request_str",
+    ('{"driverRequest": {"actions": []}}', '{"driverRequest":{"actions":[ ]}}'),
+)
+def test_iterate_request_actions_empty(request_str):
+    assert list(iterate_request_actions(io.StringIO(request_str), chunk_size=3)) == []
+
+
+@pytest.mark.parametrize(
+    ("request_str", "key"),
+    (
+        ("{}", "driverRequest"),
+        ('{"driverRequest": {}}', "actions"),
+        ('{"driverRequest": {"other": []}}', "actions"),
+    ),
+)
+def test_iterate_request_actions_missed_key(request_str, key):
+    with pytest.raises(KeyError, match=key):
+        list(iterate_request_actions(request_str))
+
+
+@pytest.mark.parametrize(
+    "request_str",
+    (
+        "",
+        "[]",
+        '{"driverRequest": {"actions": [{"a": 1} {"b": 2}]}}',
+        '{"driverRequest": {"actions": [{"a": 1}',
+        '{"driverRequest": {"actions": [{"a": ',
+    ),
+)
+def test_iterate_request_actions_invalid_json(request_str):
+    with pytest.raises(json.JSONDecodeError):
+        list(iterate_request_actions(io.StringIO(request_str), chunk_size=4))
+
+
+def test_iterate_request_actions_is_lazy():
+    request = create_request(*(create_net_ad() for _ in range(100)))
+    file = io.StringIO(request)
+
+    actions = iterate_request_actions(file, chunk_size=1024)
+    next(actions)
+
+    assert file.tell() < len(request) / 10
+
+
+def test_iterate_request_actions_memory_is_flat():
+    def get_peak(actions_count):
+        request = create_request(*(create_net_ad() for _ in range(actions_count)))
+        file = io.BytesIO(request.encode())
+        del request
+        tracemalloc.start()
+        for _ in iterate_request_actions(file):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    small_peak = get_peak(200)
+    big_peak = get_peak(4000)
+    assert big_peak < small_peak * 1.5
+
+
+def _random_number(rnd: random.Random) -> str:
+    number = str(rnd.choice((rnd.randint(-999, 999), rnd.uniform(-1e3, 1e3))))
+    if rnd.random() < 0.5:
+        number += rnd.choice(("e", "E")) + rnd.choice(("", "+", "-"))
+        number += str(rnd.randint(0, 20))
+    return number
+
+
+def _random_request(rnd: random.Random) -> str:
+    """Request with numbers in other keys around driverRequest and actions."""
+
+    def other_keys():
+        spaces = " " * rnd.randint(0, 1)
+        return "".join(
+            f'"k{i}":{spaces}{_random_number(rnd)}{spaces},'
+            for i in range(rnd.randint(0, 3))
+        )
+
+    actions = json.dumps(ACTIONS)
+    return (
+        f'{{{other_keys()}"driverRequest":{{{other_keys()}"actions":{actions}}},'
+        f'"after":{_random_number(rnd)}}}'
+    )
+
+
+def test_iterate_request_actions_numbers_cut_by_chunks():
+    rnd = random.Random(20)
+    for _ in range(20):
+        request_str = _random_request(rnd)
+        assert json.loads(request_str)["driverRequest"]["actions"] == ACTIONS
+        for chunk_size in range(1, len(request_str) + 1):
+            for source in (io.StringIO(request_str), io.BytesIO(request_str.encode())):
+                actions = list(iterate_request_actions(source, chunk_size))
+
+                assert actions == ACTIONS, (request_str, chunk_size)
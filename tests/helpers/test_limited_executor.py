@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.limited_executor import (
+    execute_limited,
+)
+
+
+@pytest.mark.parametrize("limit", (1, 2, None))
+def test_execute_limited_per_key(limit):
+    lock = threading.Lock()
+    running = defaultdict(int)
+    max_running = defaultdict(int)
+
+    def fn(item):
+        key, value = item
+        with lock:
+            running[key] += 1
+            max_running[key] = max(max_running[key], running[key])
+        time.sleep(0.01)
+        with lock:
+            running[key] -= 1
+        return value
+
+    items = [(key, i) for i in range(5) for key in ("a", "b")]
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = execute_limited(executor, fn, items, lambda i: i[0], limit)
+
+    assert [f.result() for f in futures] == [i[1] for i in items]
+    for key in ("a", "b"):
+        assert max_running[key] <= (limit or 5)
+        if limit:
+            assert max_running[key] == limit
+
+
+def test_execute_limited_does_not_block_another_key():
+    """Waiting items for one key don't take threads from another key."""
+    release_a = threading.Event()
+
+    def fn(item):
+        if item == "a":
+            assert release_a.wait(5)
+        else:
+            release_a.set()
+        return item
+
+    items = ["a", "a", "a", "b"]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = execute_limited(executor, fn, items, lambda i: i, 1)
+
+    assert [f.result() for f in futures] == items
+
+
+def test_execute_limited_returns_errors():
+    def fn(item):
+        if item == 2:
+            raise ValueError("fail")
+        return item
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = execute_limited(executor, fn, [1, 2, 3], lambda i: "key", 1)
+
+    assert futures[0].result() == 1
+    with pytest.raises(ValueError, match="fail"):
+        futures[1].result()
+    assert futures[2].result() == 3
@@ -0,0 +1,167 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.pipeline_executor import (
+    Phase,
+    execute_pipelines,
+)
+
+
+def test_execute_pipelines_phases_order():
+    lock = threading.Lock()
+    calls = []
+
+    def fn(group):
+        with lock:
+            calls.append(group)
+
+    def iterate_phases(name):
+        yield Phase(fn, [(name, "clear")])
+        # the next phase is prepared when the previous one is done
+        assert (name, "clear") in calls
+        yield Phase(fn, [])
+        yield Phase(fn, [(name, "set", 1), (name, "set", 2)])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        execute_pipelines(
+            executor, [iterate_phases("a"), iterate_phases("b")], lambda g: g[0], None
+        )
+
+    assert len(calls) == 6
+    for name in ("a", "b"):
+        pipeline_calls = [c for c in calls if c[0] == name]
+        assert pipeline_calls[0] == (name, "clear")
+        assert set(pipeline_calls[1:]) == {(name, "set", 1), (name, "set", 2)}
+
+
+def test_execute_pipelines_slow_pipeline_does_not_block_others():
+    release_slow = threading.Event()
+    fast_done = threading.Event()
+
+    def slow(group):
+        assert release_slow.wait(5)
+
+    def fast(group):
+        if group == "second":
+            fast_done.set()
+            release_slow.set()
+
+    def iterate_slow():
+        yield Phase(slow, ["first"])
+        yield Phase(slow, ["second"])
+
+    def iterate_fast():
+        yield Phase(fast, ["first"])
+        yield Phase(fast, ["second"])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        execute_pipelines(
+            executor, [iterate_slow(), iterate_fast()], lambda g: "key", None
+        )
+
+    assert fast_done.is_set()
+
+
+@pytest.mark.parametrize("raise_errors", (True, False))
+def test_execute_pipelines_errors(raise_errors):
+    calls = []
+
+    def fn(group):
+        calls.append(group)
+        if group == "fail":
+            raise ValueError("failed")
+
+    def iterate_failed():
+        yield Phase(fn, ["fail"], raise_errors=raise_errors)
+        yield Phase(fn, ["after fail"])
+
+    def iterate_other():
+        yield Phase(fn, ["other"])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        if raise_errors:
+            with pytest.raises(ValueError, match="failed"):
+                execute_pipelines(
+                    executor, [iterate_failed(), iterate_other()], str, None
+                )
+        else:
+            execute_pipelines(executor, [iterate_failed(), iterate_other()], str, None)
+
+    assert ("after fail" in calls) is not raise_errors
+    # other pipelines are finished
+    assert "other" in calls
+
+
+def test_execute_pipelines_failed_to_prepare_phase():
+    def iterate_phases():
+        yield Phase(str, ["first"])
+        raise ValueError("failed to prepare")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="failed to prepare"):
+            execute_pipelines(executor, [iterate_phases()], str, 1)
+
+
+def _execute_pipelines_in_time(*args):
+    """Execute pipelines in another thread, fail instead of hanging."""
+    errors = []
+
+    def run():
+        try:
+            execute_pipelines(*args)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), "pipelines are not finished"
+    if errors:
+        raise errors[0]
+
+
+def test_execute_pipelines_failed_to_submit_group():
+    calls = []
+
+    def key_fn(group):
+        if not group:
+            raise ValueError("empty group")
+        return group
+
+    def iterate_phases():
+        yield Phase(calls.append, ["first", ""])
+        yield Phase(calls.append, ["next"])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="empty group"):
+            _execute_pipelines_in_time(executor, [iterate_phases()], key_fn, None)
+
+    assert calls == ["first"]
+
+
+class StoppingExecutor(ThreadPoolExecutor):
+    """Rejects new tasks when stopped as the shut down executor does."""
+
+    stopped = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self.stopped:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_execute_pipelines_failed_to_submit_next_phase():
+    executor = StoppingExecutor(max_workers=2)
+
+    def stop(group):
+        executor.stopped = True
+
+    def iterate_phases():
+        yield Phase(stop, ["first"])
+        yield Phase(str, ["next"])
+
+    with executor:
+        with pytest.raises(RuntimeError, match="after shutdown"):
+            _execute_pipelines_in_time(executor, [iterate_phases()], str, None)
@@ -0,0 +1,137 @@
+from unittest.mock import Mock
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.results_aggregator import (
+    ResultsAggregator,
+)
+from cloudshell.shell.flows.connectivity.models.driver_response import (
+    ConnectivityActionResult,
+)
+
+
+def _result(action_id="1", iface="sw/Port1", info="", error="", success=True):
+    return ConnectivityActionResult(
+        actionId=action_id,
+        type="setVlan",
+        updatedInterface=iface,
+        infoMessage=info,
+        errorMessage=error,
+        success=success,
+    )
+
+
+def test_one_result_is_not_changed():
+    results = ResultsAggregator()
+    result = _result(info="msg")
+    results["1"].append(result)
+
+    assert results.get_results() == [result]
+    assert results.is_success("1")
+
+
+def test_merge_successful_results():
+    results = ResultsAggregator()
+    results["1"].append(_result(iface="mac1", info="set 10"))
+    results["1"].append(_result(iface="mac2", info="set 11"))
+    results["1"].append(_result(iface="mac1", info="set 10"))
+
+    (result,) = results.get_results()
+    assert result.success
+    assert result.actionId == "1"
+    assert set(result.updatedInterface.split(";")) == {"mac1", "mac2"}
+    assert set(result.infoMessage.split("\n")) == {"set 10", "set 11"}
+    assert result.errorMessage == ""
+
+
+@pytest.mark.parametrize("failed_index", (0, 1, 2))
+def test_merge_failed_results(failed_index):
+    results = ResultsAggregator()
+    for i in range(3):
+        if i == failed_index:
+            results["1"].append(_result(error=f"failed {i}", success=False))
+        else:
+            results["1"].append(_result(info=f"set {i}"))
+
+    (result,) = results.get_results()
+    assert not result.success
+    assert not results.is_success("1")
+    assert result.infoMessage == ""
+    assert result.errorMessage == f"failed {failed_index}"
+    assert result.updatedInterface == "sw/Port1"
+
+
+def test_results_order_and_lookup():
+    results = ResultsAggregator()
+    for action_id in ("2", "1", "3", "1"):
+        results[action_id].append(_result(action_id))
+
+    assert [r.actionId for r in results.get_results()] == ["2", "1", "3"]
+    assert list(results) == ["2", "1", "3"]
+    assert len(results) == 3
+    assert "1" in results
+    assert "4" not in results
+    # there are no results yet
+    assert results.is_success("4")
+    assert "4" not in results
+
+
+def test_ordered_results_in_order_of_registered_actions():
+    actions = [Mock(action_id=action_id) for action_id in ("2", "1", "1", "1")]
+    results = ResultsAggregator(ordered=True)
+    results.register(actions)
+
+    # results come in a random order
+    for i in (3, 0, 1, 2):
+        action = actions[i]
+        results.add(action, _result(action.action_id, iface=f"mac{i}", info=str(i)))
+
+    result2, result1 = results.get_results()
+    assert result2.actionId == "2"
+    assert result1.infoMessage == "1\n2\n3"
+    assert result1.updatedInterface == "mac1;mac2;mac3"
+
+
+def test_ordered_results_not_registered_actions():
+    results = ResultsAggregator(ordered=True)
+    for iface in ("mac2", "mac1", "mac2", "mac3"):
+        results.add(Mock(), _result(iface=iface, info=iface))
+
+    (result,) = results.get_results()
+    assert result.updatedInterface == "mac2;mac1;mac3"
+    assert result.infoMessage == "mac2\nmac1\nmac3"
+
+
+def test_registered_actions_without_results_are_skipped():
+    results = ResultsAggregator()
+    results.register([Mock(action_id="1"), Mock(action_id="2")])
+    results.add(Mock(), _result("2"))
+
+    assert [r.actionId for r in results.get_results()] == ["2"]
+
+
+def test_read_results_as_dict_of_lists():
+    """Reading results the way it was done when results was a dict of lists."""
+    results = ResultsAggregator()
+    first, second, failed = (
+        _result(),
+        _result(iface="mac2"),
+        _result("2", success=False),
+    )
+    results["1"].append(first)
+    results["1"].append(second)
+    results["2"].append(failed)
+
+    failed_action_ids = {
+        action_id
+        for action_id, action_results in results.items()
+        if not all(result.success for result in action_results)
+    }
+    assert failed_action_ids == {"2"}
+    assert list(results) == ["1", "2"]
+    assert [list(r) for r in results.values()] == [[first, second], [failed]]
+    assert results["1"][0] == first
+    assert results["1"][-1:] == [second]
+    assert len(results["1"]) == 2
+    assert results.get("3") is None
+    assert "3" not in results
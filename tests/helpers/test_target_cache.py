@@ -0,0 +1,63 @@
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.target_cache import TargetCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_target_cache_hits_and_misses():
+    cache = TargetCache()
+
+    with pytest.raises(KeyError):
+        cache.get("sw1")
+    cache.set("sw1", "target")
+
+    assert cache.get("sw1") == "target"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_target_cache_ttl():
+    clock = Clock()
+    cache = TargetCache(ttl=10, clock=clock)
+    cache.set("sw1", "target")
+
+    clock.now = 9.9
+    assert cache.get("sw1") == "target"
+    clock.now = 10
+    with pytest.raises(KeyError):
+        cache.get("sw1")
+    assert len(cache) == 0
+
+
+def test_target_cache_lru_eviction():
+    cache = TargetCache(max_size=2)
+    cache.set("sw1", "target1")
+    cache.set("sw2", "target2")
+    cache.get("sw1")  # sw2 is least recently used now
+    cache.set("sw3", "target3")
+
+    assert cache.get("sw1") == "target1"
+    assert cache.get("sw3") == "target3"
+    with pytest.raises(KeyError):
+        cache.get("sw2")
+
+
+def test_target_cache_invalidate():
+    cache = TargetCache()
+    cache.set("sw1", "target1")
+    cache.set("sw2", "target2")
+
+    cache.invalidate("sw1")
+    cache.invalidate("unknown")
+    with pytest.raises(KeyError):
+        cache.get("sw1")
+    assert cache.get("sw2") == "target2"
+
+    cache.clear()
+    assert len(cache) == 0
@@ -1,10 +1,23 @@
+import time
+import tracemalloc
+from copy import deepcopy
+
 import pytest
 
 from cloudshell.shell.flows.connectivity.exceptions import VLANHandlerException
+from cloudshell.shell.flows.connectivity.helpers.dict_action_helpers import (
+    get_val_from_list_attrs,
+    set_val_to_list_attrs,
+)
 from cloudshell.shell.flows.connectivity.helpers.vlan_helper import (
+    VLAN_ID,
     _sort_vlans,
     _validate_vlan_number,
+    get_connection_mode,
     get_vlan_list,
+    get_vlan_service_attrs,
+    get_vlan_service_vlan_id,
+    is_qnq,
     iterate_dict_actions_by_vlan_range,
     patch_virtual_network,
 )
@@ -52,6 +65,24 @@ def test_get_vlan_list(vlan_str, vlan_list, vlan_range, multi_vlan):
     )
 
 
+@pytest.mark.parametrize(
+    ("vlan_str", "vlan_list", "vlan_range", "multi_vlan"),
+    (
+        ("10-20,15-25,26", ["10-26"], True, False),
+        ("10-20,15-25,26,30", ["10-26,30"], True, True),
+        ("12-10,11", ["10-12"], True, False),
+        ("10-12,11", ["10", "11", "12"], False, False),
+    ),
+)
+def test_get_vlan_list_normalized(vlan_str, vlan_list, vlan_range, multi_vlan):
+    assert vlan_list == get_vlan_list(
+        vlan_str,
+        is_vlan_range_supported=vlan_range,
+        is_multi_vlan_supported=multi_vlan,
+        normalize_vlan_ranges=True,
+    )
+
+
 @pytest.mark.parametrize(
     ("vlan_str", "error", "match", "vlan_range", "multi_vlan"),
     (
@@ -109,3 +140,76 @@ def test_iterate_dict_action_by_vlan_range_with_qnq(action_request):
 
     with pytest.raises(ValueError, match="Access mode .+ can be only with int VLAN"):
         list(iterate_dict_actions_by_vlan_range(action_request, True, True))
+
+
+def _deepcopy_expansion(dict_action, vlans):
+    # the way actions were expanded before - full copy per VLAN
+    for vlan in vlans:
+        new_dict_action = deepcopy(dict_action)
+        new_dict_action["connectionParams"]["vlanId"] = vlan
+        yield new_dict_action
+
+
+def _peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_iterate_dict_actions_by_vlan_range_shares_not_changed_parts():
+    dict_action = create_net_ad(vlan_id="10-11", mode=ConnectionModeEnum.TRUNK)
+    patch_virtual_network(dict_action)
+    orig_vlan_service_attrs = get_vlan_service_attrs(dict_action)
+
+    first, second = iterate_dict_actions_by_vlan_range(dict_action, False, False)
+
+    assert first["connectionParams"]["vlanId"] == "10"
+    assert second["connectionParams"]["vlanId"] == "11"
+    assert dict_action["connectionParams"]["vlanId"] == "10-11"
+    assert get_val_from_list_attrs(orig_vlan_service_attrs, VLAN_ID) == "10-11"
+    for new_action in (first, second):
+        assert new_action["actionTarget"] is dict_action["actionTarget"]
+        assert new_action["connectorAttributes"] is dict_action["connectorAttributes"]
+        new_attrs = get_vlan_service_attrs(new_action)
+        vlan_id = new_action["connectionParams"]["vlanId"]
+        assert get_val_from_list_attrs(new_attrs, VLAN_ID) == vlan_id
+        # only VLAN ID attribute is copied
+        shared = [a for a in new_attrs if a in orig_vlan_service_attrs]
+        assert all(any(a is b for b in orig_vlan_service_attrs) for a in shared)
+
+
+def test_iterate_dict_actions_by_vlan_range_4000_vlans_benchmark(record_property):
+    dict_action = create_net_ad(vlan_id="2-4001", mode=ConnectionModeEnum.TRUNK)
+    patch_virtual_network(dict_action)
+    vlans = get_vlan_list("2-4001", False, False)
+
+    start = time.perf_counter()
+    cow_peak = _peak_memory(
+        lambda: list(iterate_dict_actions_by_vlan_range(dict_action, False, False))
+    )
+    cow_time = time.perf_counter() - start
+    start = time.perf_counter()
+    deepcopy_peak = _peak_memory(lambda: list(_deepcopy_expansion(dict_action, vlans)))
+    deepcopy_time = time.perf_counter() - start
+
+    record_property("copy_on_write_peak", cow_peak)
+    record_property("copy_on_write_time", cow_time)
+    record_property("deepcopy_peak", deepcopy_peak)
+    record_property("deepcopy_time", deepcopy_time)
+    assert cow_peak * 1.5 < deepcopy_peak
+
+
+@pytest.mark.parametrize(
+    ("qnq_value", "expected"),
+    (("True", True), ("true", True), ("False", False), ("", False)),
+)
+def test_dict_action_accessors(qnq_value, expected):
+    dict_action = create_net_ad(vlan_id="10-11", mode=ConnectionModeEnum.TRUNK)
+    set_val_to_list_attrs(get_vlan_service_attrs(dict_action), "QnQ", qnq_value)
+
+    assert get_connection_mode(dict_action) is ConnectionModeEnum.TRUNK
+    assert get_vlan_service_vlan_id(dict_action) == "10-11"
+    assert is_qnq(dict_action) is expected
@@ -0,0 +1,123 @@
+import random
+import time
+
+import pytest
+
+from cloudshell.shell.flows.connectivity.exceptions import VLANHandlerException
+from cloudshell.shell.flows.connectivity.helpers.vlan_set import (
+    VlanSet,
+    _parse_vlan_range,
+    iterate_vlan_str,
+)
+
+
+@pytest.mark.parametrize(
+    ("vlan_str", "intervals", "ranges", "vlans"),
+    (
+        ("10", ((10, 10),), ["10"], ["10"]),
+        ("12-10", ((10, 12),), ["10-12"], ["10", "11", "12"]),
+        ("10-20,15-25,26", ((10, 26),), ["10-26"], list(map(str, range(10, 27)))),
+        (" 5, 3 ,1-2", ((1, 3), (5, 5)), ["1-3", "5"], ["1", "2", "3", "5"]),
+        ("100,1-2,100", ((1, 2), (100, 100)), ["1-2", "100"], ["1", "2", "100"]),
+    ),
+)
+def test_vlan_set_from_str(vlan_str, intervals, ranges, vlans):
+    vlan_set = VlanSet.from_str(vlan_str)
+    assert vlan_set.intervals == intervals
+    assert vlan_set.to_ranges_list() == ranges
+    assert vlan_set.to_vlan_list() == vlans
+    assert str(vlan_set) == ",".join(ranges)
+    assert len(vlan_set) == len(vlans)
+
+
+@pytest.mark.parametrize(
+    ("vlan_str", "match"),
+    (
+        ("5000", "Wrong VLAN detected 5000"),
+        ("4000-5005", "Wrong VLAN detected 5005"),
+        ("10,abc", "VLAN abc isn't a integer"),
+        ("0,5000", "Wrong VLAN detected 0"),
+        (" 10 - 20 ,10-abc", "VLAN abc isn't a integer"),
+        ("10,", "VLAN  isn't a integer"),
+    ),
+)
+def test_vlan_set_from_str_failed(vlan_str, match):
+    with pytest.raises(VLANHandlerException, match=match):
+        VlanSet.from_str(vlan_str)
+
+
+@pytest.mark.parametrize(
+    ("first", "second", "union", "difference"),
+    (
+        ("10-20", "21-30", "10-30", "10-20"),
+        ("10-20", "15", "10-20", "10-14,16-20"),
+        ("10-20,30-40", "15-35", "10-40", "10-14,36-40"),
+        ("10-20", "1-100", "1-100", ""),
+        ("10,12,14", "11-13", "10-14", "10,14"),
+        ("10-20", "1-2,25-30", "1-2,10-20,25-30", "10-20"),
+    ),
+)
+def test_vlan_set_union_and_difference(first, second, union, difference):
+    first_set, second_set = VlanSet.from_str(first), VlanSet.from_str(second)
+    assert str(first_set | second_set) == union
+    assert str(first_set - second_set) == difference
+    assert set(first_set - second_set) == set(first_set) - set(second_set)
+
+
+def test_vlan_set_contains():
+    vlan_set = VlanSet.from_str("10-20,30")
+    assert 15 in vlan_set
+    assert 30 in vlan_set
+    assert 25 not in vlan_set
+    assert "15" not in vlan_set
+    assert not VlanSet()
+    assert vlan_set
+
+
+def _iterate_vlan_str_one_by_one(vlan_str):
+    try:
+        return [_parse_vlan_range(v.strip()) for v in vlan_str.split(",")]
+    except Exception as e:
+        return type(e), str(e)
+
+
+def _random_vlan_str(rnd: random.Random) -> str:
+    parts = []
+    for _ in range(rnd.randint(1, 6)):
+        vlan_range = str(rnd.choice((rnd.randint(1, 4094), rnd.randint(0, 5000))))
+        if rnd.random() < 0.5:
+            vlan_range += f"{' ' * rnd.randint(0, 1)}-{rnd.randint(0, 4200)}"
+        if rnd.random() < 0.05:
+            vlan_range = rnd.choice(("abc", "", "+10", "1_0", "10-20-30", "-5"))
+        parts.append(" " * rnd.randint(0, 1) + vlan_range + " " * rnd.randint(0, 1))
+    return ",".join(parts)
+
+
+def test_iterate_vlan_str_matches_validation_one_by_one():
+    rnd = random.Random(25)
+    for _ in range(1000):
+        vlan_str = _random_vlan_str(rnd)
+        try:
+            result = list(iterate_vlan_str(vlan_str))
+        except Exception as e:
+            result = type(e), str(e)
+
+        assert result == _iterate_vlan_str_one_by_one(vlan_str), vlan_str
+
+
+def test_vlan_set_full_trunk_benchmark(record_property):
+    vlan_str = ",".join(f"{i}-{min(i + 9, 4094)}" for i in range(1, 4095, 10))
+
+    start = time.perf_counter()
+    for _ in range(10):
+        one_by_one = _iterate_vlan_str_one_by_one(vlan_str)
+        vlans = list(map(str, VlanSet(r[1:] for r in one_by_one)))
+    one_by_one_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        batch_vlans = VlanSet.from_str(vlan_str).to_vlan_list()
+    batch_time = time.perf_counter() - start
+
+    record_property("one_by_one_time", one_by_one_time)
+    record_property("batch_time", batch_time)
+    assert batch_vlans == vlans == list(map(str, range(1, 4095)))
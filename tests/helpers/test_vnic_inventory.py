@@ -0,0 +1,41 @@
+import pytest
+
+from cloudshell.shell.flows.connectivity.helpers.vnic_inventory import VnicInventory
+from cloudshell.shell.flows.connectivity.models.vnic import VnicInfo
+
+
+def test_vnic_inventory_get_set():
+    inventory = VnicInventory()
+
+    with pytest.raises(KeyError):
+        inventory.get("vm1")
+    inventory.set("vm1", [VnicInfo("nic 2", 2, True), VnicInfo("nic 1", 1, False)])
+
+    assert "vm1" in inventory
+    assert inventory.get("vm1") == [
+        VnicInfo("nic 1", 1, False),
+        VnicInfo("nic 2", 2, True),
+    ]
+
+
+def test_vnic_inventory_set_vnic_connected():
+    inventory = VnicInventory()
+    inventory.set("vm1", [VnicInfo("nic 1", 1, True)])
+
+    inventory.set_vnic_connected("vm1", 1, "mac 1")
+    inventory.set_vnic_connected("vm1", 2, "mac 2")
+
+    assert inventory.get("vm1") == [
+        VnicInfo("nic 1", 1, False),
+        VnicInfo("mac 2", 2, False),
+    ]
+
+
+def test_vnic_inventory_set_vnic_and_invalidate():
+    inventory = VnicInventory()
+
+    inventory.set_vnic("vm1", VnicInfo("nic 3", 3, True))
+    assert inventory.get("vm1") == [VnicInfo("nic 3", 3, True)]
+
+    inventory.invalidate("vm1")
+    assert "vm1" not in inventory
@@ -78,3 +78,10 @@ def test_actions_not_equals():
     action1 = create_cp_ad(vnic="vnic1", uniq_id=False)
     action2 = create_cp_ad(vnic="vnic2", uniq_id=False)
     assert action1 != action2
+
+
+def test_vlan_service_vlan_set(action_request):
+    action = ConnectivityActionModel.parse_obj(action_request)
+    vlan_set = action.connection_params.vlan_service_attrs.vlan_set
+    assert vlan_set.intervals == ((10, 11),)
+    assert vlan_set.to_vlan_list() == ["10", "11"]
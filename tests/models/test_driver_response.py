@@ -1,12 +1,22 @@
 import json
+import tracemalloc
 
 import pytest
 
+from cloudshell.shell.flows.connectivity.helpers.json_backend import (
+    get_available_json_backends,
+)
+from cloudshell.shell.flows.connectivity.models import driver_response
 from cloudshell.shell.flows.connectivity.models.driver_response import (
+    _ACTION_RESULT_FIELDS,
+    ActionResult,
     ConnectivityActionResult,
     DriverResponseRoot,
+    serialize_response,
 )
 
+JSON_BACKENDS = get_available_json_backends()
+
 
 @pytest.mark.parametrize(
     ("success", "msg"), ((True, "success msg"), (False, "error msg"))
@@ -45,3 +55,80 @@ def test_prepare_response(action_model):
             ]
         }
     }
+
+
+@pytest.mark.parametrize("backend", JSON_BACKENDS, ids=[b.name for b in JSON_BACKENDS])
+def test_serialize_response_conformance(backend, action_model):
+    results = [
+        ConnectivityActionResult.success_result(action_model, "success msg"),
+        ConnectivityActionResult.success_result(
+            action_model, "line 1\nline 2", iface="mac;é中"
+        ),
+        ConnectivityActionResult.fail_result(action_model, 'error "msg" </tag>\t'),
+    ]
+    expected = DriverResponseRoot.prepare_response(results).json()
+
+    response = serialize_response(results, backend)
+
+    assert json.loads(response) == json.loads(expected)
+    # the same order of the keys
+    assert json.loads(response, object_pairs_hook=list) == json.loads(
+        expected, object_pairs_hook=list
+    )
+    assert response == expected
+
+
+@pytest.mark.parametrize("backend", JSON_BACKENDS, ids=[b.name for b in JSON_BACKENDS])
+def test_serialize_response_as_pydantic_v1(backend, action_model, monkeypatch):
+    monkeypatch.setattr(driver_response, "_PYDANTIC_V1", True)
+    results = [
+        ConnectivityActionResult.success_result(
+            action_model, "line 1\nline 2", iface="mac;é中"
+        ),
+    ]
+    root = DriverResponseRoot.prepare_response(results)
+    # pydantic v1 json() dumps the dict with the default json.dumps arguments
+    expected = json.dumps(json.loads(root.json()))
+
+    assert serialize_response(results, backend) == expected
+
+
+def test_serialize_response_fields():
+    assert _ACTION_RESULT_FIELDS == tuple(ConnectivityActionResult.__fields__)
+
+
+def test_serialize_empty_response():
+    assert serialize_response([]) == '{"driverResponse":{"actionResults":[]}}'
+
+
+@pytest.mark.parametrize(
+    ("factory", "args"),
+    (
+        ("success_result", ()),
+        ("success_result", ("success msg", "mac")),
+        ("fail_result", ("error msg",)),
+        ("skip_result", ()),
+    ),
+)
+def test_action_result_the_same_as_model(factory, args, action_model):
+    record = getattr(ActionResult, factory)(action_model, *args)
+    result = getattr(ConnectivityActionResult, factory)(action_model, *args)
+
+    assert record.to_model() == result
+    assert ActionResult.from_model(result) == record
+    assert serialize_response([record]) == serialize_response([result])
+
+
+def test_action_result_is_smaller_than_model(action_model):
+    def get_peak(factory):
+        tracemalloc.start()
+        results = [factory(action_model) for _ in range(1000)]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(results) == 1000
+        return peak
+
+    assert not hasattr(ActionResult.success_result(action_model), "__dict__")
+    record_peak = get_peak(ActionResult.success_result)
+    model_peak = get_peak(ConnectivityActionResult.success_result)
+    assert record_peak < model_peak
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from typing import Any
 from unittest.mock import Mock, call
 from uuid import uuid4
@@ -18,6 +19,7 @@ from cloudshell.shell.flows.connectivity.models.connectivity_model import (
 from tests.base import (
     DEFAULT_VM_UUID,
     TestConnectivityFlowHelper,
+    check_failed_result,
     check_successful_result,
     create_cp_ad,
     create_request,
@@ -54,10 +56,11 @@ class ConnectivityFlow(TestConnectivityFlowHelper, AbcCloudProviderConnectivityF
         return target.macs[int(get_vnic(action))]
 
 
-@pytest.fixture()
-def cf(parse_connectivity_request_service):
+@pytest.fixture(params=(False, True), ids=("phases", "pipeline"))
+def cf(request, parse_connectivity_request_service):
     return ConnectivityFlow(
-        parse_connectivity_request_service=parse_connectivity_request_service
+        parse_connectivity_request_service=parse_connectivity_request_service,
+        pipeline_targets=request.param,
     )
 
 
@@ -139,12 +142,16 @@ def test_set_vlan_vnic_specified_exists_but_cannot_be_used(cf):
     request = create_request(create_cp_ad(set_vlan=True, vnic="Network adapter 1"))
     cf.vnics = [VnicInfo("Network adapter 1", 1, False)]
 
-    with pytest.raises(ValueError, match="Cannot connect to vNIC 1"):
-        cf.apply_connectivity(request)
+    resp_str = cf.apply_connectivity(request)
 
     action = get_one_action(cf)
     assert cf.manager.mock_calls == []
     assert get_vnic(action) == "1"
+    check_failed_result(
+        get_one_result(resp_str),
+        action,
+        error="Cannot connect to vNIC 1 because it is already used",
+    )
 
 
 def test_set_vlan_specified_doesnt_exists(cf):
@@ -179,12 +186,16 @@ def test_set_vlan_specified_doesnt_exists_and_cannot_be_used(cf):
     request = create_request(create_cp_ad(set_vlan=True, vnic="3"))
     cf.vnics = [VnicInfo("Network adapter 1", 1, True)]
 
-    with pytest.raises(ValueError, match="There are gaps between vNIC indexes"):
-        cf.apply_connectivity(request)
+    resp_str = cf.apply_connectivity(request)
 
     action = get_one_action(cf)
     assert cf.manager.mock_calls == []
     assert get_vnic(action) == "3"
+    check_failed_result(
+        get_one_result(resp_str),
+        action,
+        error="There are gaps between vNIC indexes that should be created",
+    )
 
 
 def test_set_vlan_with_several_vnics(cf):
@@ -238,3 +249,241 @@ def test_set_vlan_with_several_vnics(cf):
     check_successful_result(
         set_res2, set_action2_2, targets=[cf.def_vm.macs[2], cf.def_vm.macs[4]]
     )
+
+
+def test_prepare_set_actions_for_vms_in_parallel(cf):
+    vm2_uuid = str(uuid4())
+    cf.vms[vm2_uuid] = Mock(macs={1: "vm2 mac"})
+    # both VMs have to get vNICs at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_vnics(vm):
+        barrier.wait()
+        return cf.vnics
+
+    cf.get_vnics = get_vnics
+    set_ad1 = create_cp_ad(set_vlan=True)
+    set_ad2 = create_cp_ad(set_vlan=True, vm_uuid=vm2_uuid)
+
+    resp_str = cf.apply_connectivity(create_request(set_ad1, set_ad2))
+
+    set_action1, set_action2 = get_actions(cf, set_ad1, set_ad2)
+    set_res1, set_res2 = get_results(resp_str, set_ad1, set_ad2)
+    check_successful_result(set_res1, set_action1, targets=[cf.def_vm.macs[1]])
+    check_successful_result(set_res2, set_action2, targets=["vm2 mac"])
+
+
+def test_prepare_set_actions_in_pipeline_worker_sequentially(cf):
+    """Pipeline worker doesn't wait for other tasks of the executor."""
+    prepare = cf._prepare_set_actions
+    executors = []
+
+    def prepare_set_actions(actions, executor=None):
+        executors.append(executor)
+        return prepare(actions, executor)
+
+    cf._prepare_set_actions = prepare_set_actions
+    vm2_uuid = str(uuid4())
+    cf.vms[vm2_uuid] = Mock(macs={1: "vm2 mac"})
+    set_ad1 = create_cp_ad(set_vlan=True)
+    set_ad2 = create_cp_ad(set_vlan=True, vm_uuid=vm2_uuid)
+
+    cf.apply_connectivity(create_request(set_ad1, set_ad2))
+
+    if cf.pipeline_targets:
+        assert executors == [None, None]
+    else:
+        assert len(executors) == 1 and executors[0] is not None
+
+
+def test_prepare_set_actions_failed_for_one_vm(cf):
+    vm2_uuid = str(uuid4())
+    cf.vms[vm2_uuid] = Mock()
+
+    def get_vnics(vm):
+        if vm is cf.vms[vm2_uuid]:
+            raise ValueError("failed to get vNICs")
+        return cf.vnics
+
+    cf.get_vnics = get_vnics
+    set_ad1 = create_cp_ad(set_vlan=True)
+    set_ad2 = create_cp_ad(set_vlan=True, vm_uuid=vm2_uuid, vlan_id="11")
+    set_ad3 = create_cp_ad(set_vlan=True, vm_uuid=vm2_uuid, vlan_id="12")
+    ads = (set_ad1, set_ad2, set_ad3)
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    set_action1, set_action2, set_action3 = get_actions(cf, *ads)
+    assert cf.manager.mock_calls == [call.set_vlan(set_action1, cf.def_vm)]
+    set_res1, set_res2, set_res3 = get_results(resp_str, *ads)
+    check_successful_result(set_res1, set_action1, targets=[cf.def_vm.macs[1]])
+    check_failed_result(set_res2, set_action2, error="failed to get vNICs")
+    check_failed_result(set_res3, set_action3, error="failed to get vNICs")
+
+
+def test_vnics_inventory_updated_by_set_actions(cf):
+    """Inventory is filled once and updated with replaced and created vNICs.
+
+    - set_vlan reads vNICs from the inventory without calling get_vnics
+    """
+    get_vnics_calls = []
+    cached_vnics = []
+
+    def get_vnics(vm):
+        get_vnics_calls.append(vm)
+        return cf.vnics
+
+    def set_vlan(action, target):
+        cached_vnics.append(cf.get_cached_vnics(DEFAULT_VM_UUID))
+        return target.macs[int(get_vnic(action))]
+
+    cf.get_vnics = get_vnics
+    cf.set_vlan = set_vlan
+    set_ad1 = create_cp_ad(set_vlan=True, vnic="1", vlan_id="11")
+    set_ad2 = create_cp_ad(set_vlan=True, vnic="2", vlan_id="12")
+
+    cf.apply_connectivity(create_request(set_ad1, set_ad2))
+
+    assert get_vnics_calls == [cf.def_vm]
+    assert len(cached_vnics) == 2
+    assert cf.get_cached_vnics(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, False),
+        VnicInfo(cf.def_vm.macs[2], 2, False),
+    ]
+    assert get_vnics_calls == [cf.def_vm]
+
+
+def test_vnics_inventory_not_updated_by_failed_set_action(cf):
+    cf.is_set_success = False
+    set_ad = create_cp_ad(set_vlan=True, vnic="1")
+
+    cf.apply_connectivity(create_request(set_ad))
+
+    assert cf.get_cached_vnics(DEFAULT_VM_UUID) == cf.vnics
+
+
+def test_vnics_inventory_reset_for_every_request(cf):
+    get_vnics_calls = []
+
+    def get_vnics(vm):
+        get_vnics_calls.append(vm)
+        return cf.vnics
+
+    cf.get_vnics = get_vnics
+    set_ad = create_cp_ad(set_vlan=True, vnic="2")
+
+    cf.apply_connectivity(create_request(set_ad))
+    cf.apply_connectivity(create_request(set_ad))
+
+    assert get_vnics_calls == [cf.def_vm, cf.def_vm]
+
+
+@define
+class BatchConnectivityFlow(ConnectivityFlow):
+    batch_new_vnics_per_vm = True
+    batch_results: dict = field(factory=dict)
+
+    def create_vnics_batch(self, vm, actions):
+        self.manager.create_vnics_batch(vm, actions)
+        return [
+            self.batch_results.get(get_vnic(a), vm.macs[int(get_vnic(a))])
+            for a in actions
+        ]
+
+
+@pytest.fixture(params=(False, True), ids=("phases", "pipeline"))
+def batch_cf(request, parse_connectivity_request_service):
+    return BatchConnectivityFlow(
+        parse_connectivity_request_service=parse_connectivity_request_service,
+        pipeline_targets=request.param,
+    )
+
+
+def test_create_vnics_batch(batch_cf):
+    """New vNICs are created with one batch, existing vNIC is replaced."""
+    cf = batch_cf
+    ads = [
+        create_cp_ad(set_vlan=True, vnic=str(vnic), vlan_id=str(10 + vnic))
+        for vnic in (1, 2, 3)
+    ]
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    action1, action2, action3 = get_actions(cf, *ads)
+    assert sorted(cf.manager.mock_calls, key=str) == [
+        call.create_vnics_batch(cf.def_vm, (action2, action3)),
+        call.set_vlan(action1, cf.def_vm),
+    ]
+    results = get_results(resp_str, *ads)
+    for res, action, vnic in zip(results, (action1, action2, action3), (1, 2, 3)):
+        check_successful_result(res, action, targets=[cf.def_vm.macs[vnic]])
+    assert cf.vnics_inventory.get(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, False),
+        VnicInfo(cf.def_vm.macs[2], 2, False),
+        VnicInfo(cf.def_vm.macs[3], 3, False),
+    ]
+
+
+def test_create_vnics_batch_per_action_error(batch_cf):
+    """Batch fails only one action, it's rolled back."""
+    cf = batch_cf
+    cf.batch_results = {"3": ValueError("fail")}
+    ads = [
+        create_cp_ad(set_vlan=True, vnic=str(vnic), vlan_id=str(10 + vnic))
+        for vnic in (2, 3)
+    ]
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    action2, action3 = get_actions(cf, *ads)
+    assert cf.manager.mock_calls == [
+        call.create_vnics_batch(cf.def_vm, (action2, action3)),
+        call.clear(action3, cf.def_vm),
+    ]
+    res2, res3 = get_results(resp_str, *ads)
+    check_successful_result(res2, action2, targets=[cf.def_vm.macs[2]])
+    check_failed_result(res3, action3)
+    assert cf.vnics_inventory.get(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, True),
+        VnicInfo(cf.def_vm.macs[2], 2, False),
+    ]
+
+
+def test_create_vnics_batch_skips_actions_after_error(batch_cf):
+    """The vNIC after the failed one would leave a gap, it's skipped."""
+    cf = batch_cf
+    cf.batch_results = {"2": ValueError("fail")}
+    ads = [
+        create_cp_ad(set_vlan=True, vnic=str(vnic), vlan_id=str(10 + vnic))
+        for vnic in (2, 3)
+    ]
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    action2, action3 = get_actions(cf, *ads)
+    assert cf.manager.mock_calls[0] == call.create_vnics_batch(
+        cf.def_vm, (action2, action3)
+    )
+    # both vNICs are rolled back
+    assert sorted(cf.manager.mock_calls[1:], key=str) == sorted(
+        [call.clear(action2, cf.def_vm), call.clear(action3, cf.def_vm)], key=str
+    )
+    res2, res3 = get_results(resp_str, *ads)
+    check_failed_result(res2, action2)
+    assert res3.success is False
+    assert res3.errorMessage == "Another action failed. Skipping this action"
+    assert cf.vnics_inventory.get(DEFAULT_VM_UUID) == [
+        VnicInfo("Network adapter 1", 1, True),
+    ]
+
+
+def test_create_vnics_batch_raises(batch_cf):
+    cf = batch_cf
+    cf.create_vnics_batch = Mock(side_effect=ValueError("fail"))
+    ads = [create_cp_ad(set_vlan=True, vnic=str(vnic)) for vnic in (2, 3)]
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    results = get_results(resp_str, *ads)
+    for res, action in zip(results, get_actions(cf, *ads)):
+        check_failed_result(res, action)
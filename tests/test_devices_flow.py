@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-from unittest.mock import Mock, call
+import contextvars
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, call, patch
 
 import pytest
 from attrs import define, field
 
+from cloudshell.logging.context_filters import folder_name_var, set_logger_context
+
 from cloudshell.shell.flows.connectivity.devices_flow import AbcDeviceConnectivityFlow
+from cloudshell.shell.flows.connectivity.helpers.target_cache import TargetCache
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectionModeEnum,
 )
@@ -13,6 +22,7 @@ from cloudshell.shell.flows.connectivity.parse_request_service import (
     ParseConnectivityRequestService,
 )
 from tests.base import (
+    DEFAULT_TARGET,
     TestConnectivityFlowHelper,
     check_failed_result,
     check_successful_result,
@@ -33,10 +43,11 @@ class ConnectivityFlow(TestConnectivityFlowHelper, AbcDeviceConnectivityFlow):
     manager = field(factory=Mock)
 
 
-@pytest.fixture()
-def connectivity_flow(parse_connectivity_request_service):
+@pytest.fixture(params=(False, True), ids=("phases", "pipeline"))
+def connectivity_flow(request, parse_connectivity_request_service):
     return ConnectivityFlow(
-        parse_connectivity_request_service=parse_connectivity_request_service
+        parse_connectivity_request_service=parse_connectivity_request_service,
+        pipeline_targets=request.param,
     )
 
 
@@ -416,3 +427,465 @@ def test_set_vlan_range_failed_to_set(connectivity_flow):
 
     set_resp = get_one_result(resp_str)
     check_failed_result(set_resp, set_action1_1, set_action1_3)
+
+
+@define
+class BatchConnectivityFlow(ConnectivityFlow):
+    batch_actions_per_device = True
+    batch_set_results: dict = field(factory=dict)
+
+    def set_vlans_batch(self, target_resource, actions):
+        self.manager.set_vlans_batch(target_resource, actions)
+        results = []
+        for action in actions:
+            result = self.batch_set_results.get(action.action_target.name, "")
+            if isinstance(result, type) and issubclass(result, Exception):
+                raise result("fail")
+            results.append(result)
+        return results
+
+    def remove_vlans_batch(self, target_resource, actions):
+        self.manager.remove_vlans_batch(target_resource, actions)
+        return [""] * len(actions)
+
+    def load_target(self, target_name):
+        return f"device {target_name}"
+
+
+@pytest.fixture()
+def batch_connectivity_flow(parse_connectivity_request_service):
+    return BatchConnectivityFlow(
+        parse_connectivity_request_service=parse_connectivity_request_service
+    )
+
+
+def test_set_and_remove_vlans_batch_per_device(batch_connectivity_flow):
+    """Request contains set and remove actions for ports on two devices.
+
+    - execute clear for every set VLAN action
+    - execute one remove VLAN batch per device
+    - execute one set VLAN batch per device
+    - return result for every action
+    """
+    cf = batch_connectivity_flow
+    set_ad1 = create_net_ad(set_vlan=True, target="sw1/1/1")
+    set_ad2 = create_net_ad(set_vlan=True, target="sw1/1/2")
+    set_ad3 = create_net_ad(set_vlan=True, target="sw2/1/1")
+    remove_ad1 = create_net_ad(set_vlan=False, target="sw1/1/3")
+    remove_ad2 = create_net_ad(set_vlan=False, target="sw1/1/4")
+    ads = (set_ad1, set_ad2, set_ad3, remove_ad1, remove_ad2)
+    request = create_request(*ads)
+
+    resp_str = cf.apply_connectivity(request)
+
+    set_a1, set_a2, set_a3, remove_a1, remove_a2 = get_actions(cf, *ads)
+    batch_calls = [c for c in cf.manager.mock_calls if "batch" in c[0]]
+    assert sorted(batch_calls, key=str) == sorted(
+        [
+            call.remove_vlans_batch("device sw1", (remove_a1, remove_a2)),
+            call.set_vlans_batch("device sw1", (set_a1, set_a2)),
+            call.set_vlans_batch("device sw2", (set_a3,)),
+        ],
+        key=str,
+    )
+    assert not [c for c in cf.manager.mock_calls if c[0] in ("set_vlan", "remove_vlan")]
+
+    results = get_results(resp_str, *ads)
+    for result, action in zip(results, (set_a1, set_a2, set_a3, remove_a1, remove_a2)):
+        check_successful_result(result, action)
+
+
+def test_set_vlans_batch_failed(batch_connectivity_flow):
+    """Set VLAN batch for one device fails.
+
+    - all actions for the device fail and rolled back
+    - actions for another device succeed
+    """
+    cf = batch_connectivity_flow
+    cf.batch_set_results = {"sw1/1/2": Exception}
+    set_ad1 = create_net_ad(set_vlan=True, target="sw1/1/1")
+    set_ad2 = create_net_ad(set_vlan=True, target="sw1/1/2")
+    set_ad3 = create_net_ad(set_vlan=True, target="sw2/1/1")
+    ads = (set_ad1, set_ad2, set_ad3)
+    request = create_request(*ads)
+
+    resp_str = cf.apply_connectivity(request)
+
+    set_a1, set_a2, set_a3 = get_actions(cf, *ads)
+    assert call.clear(set_a1, "device sw1/1/1") in cf.manager.mock_calls[-2:]
+    assert call.clear(set_a2, "device sw1/1/2") in cf.manager.mock_calls[-2:]
+    set_res1, set_res2, set_res3 = get_results(resp_str, *ads)
+    assert not set_res1.success
+    assert set_res1.errorMessage == "Failed to setVlan 10 for sw1/1/1. Error: fail"
+    assert not set_res2.success
+    check_successful_result(set_res3, set_a3)
+
+
+def test_set_vlans_batch_per_action_error(batch_connectivity_flow):
+    """Set VLAN batch returns an error only for one action."""
+    cf = batch_connectivity_flow
+    cf.batch_set_results = {"sw1/1/2": ValueError("wrong port")}
+    set_ad1 = create_net_ad(set_vlan=True, target="sw1/1/1")
+    set_ad2 = create_net_ad(set_vlan=True, target="sw1/1/2")
+    request = create_request(set_ad1, set_ad2)
+
+    resp_str = cf.apply_connectivity(request)
+
+    set_a1, set_a2 = get_actions(cf, set_ad1, set_ad2)
+    set_res1, set_res2 = get_results(resp_str, set_ad1, set_ad2)
+    check_successful_result(set_res1, set_a1)
+    assert not set_res2.success
+    assert set_res2.errorMessage == (
+        "Failed to setVlan 10 for sw1/1/2. Error: wrong port"
+    )
+
+
+def test_shared_executor_is_reused(parse_connectivity_request_service):
+    """Flows use the shared executor and don't shut it down."""
+    thread_names = set()
+
+    @define
+    class Flow(ConnectivityFlow):
+        def set_vlan(self, action, target):
+            thread_names.add(threading.current_thread().name)
+            return super().set_vlan(action, target)
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="shared") as executor:
+        for _ in range(2):
+            cf = Flow(parse_connectivity_request_service, executor=executor)
+            resp_str = cf.apply_connectivity(create_request(create_net_ad()))
+            check_successful_result(get_one_result(resp_str), get_one_action(cf))
+
+        assert executor.submit(lambda: 1).result() == 1  # still alive
+
+    assert thread_names and all(n.startswith("shared") for n in thread_names)
+
+
+def test_shared_executor_uses_log_context_of_request(
+    parse_connectivity_request_service,
+):
+    """Threads of the shared executor log to the context of the current request."""
+    folder_names = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def set_vlan(self, action, target):
+            folder_names.append(folder_name_var.get())
+            return super().set_vlan(action, target)
+
+    def apply_connectivity(folder_name):
+        set_logger_context(folder_name, "prefix")
+        cf = Flow(parse_connectivity_request_service, executor=executor)
+        cf.apply_connectivity(create_request(create_net_ad()))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for folder_name in ("reservation 1", "reservation 2"):
+            # every request starts in its own context like in the driver
+            contextvars.Context().run(apply_connectivity, folder_name)
+
+    assert folder_names == ["reservation 1", "reservation 2"]
+
+
+def test_max_workers(parse_connectivity_request_service):
+    cf = ConnectivityFlow(parse_connectivity_request_service, max_workers=3)
+
+    with patch(
+        "cloudshell.shell.flows.connectivity.abstrace_flow.ThreadPoolExecutor",
+        wraps=ThreadPoolExecutor,
+    ) as executor_cls:
+        cf.apply_connectivity(create_request(create_net_ad()))
+
+    assert executor_cls.call_args.kwargs["max_workers"] == 3
+
+
+def test_max_concurrent_actions_per_resource(parse_connectivity_request_service):
+    """Actions for the same device are queued, other devices are not limited."""
+    lock = threading.Lock()
+    running = defaultdict(int)
+    max_running = defaultdict(int)
+
+    @define
+    class Flow(ConnectivityFlow):
+        def set_vlan(self, action, target):
+            resource = action.action_target.name.split("/")[0]
+            with lock:
+                running[resource] += 1
+                max_running[resource] = max(max_running[resource], running[resource])
+            time.sleep(0.01)
+            with lock:
+                running[resource] -= 1
+            return super().set_vlan(action, target)
+
+    cf = Flow(
+        parse_connectivity_request_service,
+        max_workers=8,
+        max_concurrent_actions_per_resource=2,
+    )
+    ads = [
+        create_net_ad(set_vlan=True, target=f"{sw}/1/{port}")
+        for sw in ("sw1", "sw2")
+        for port in range(4)
+    ]
+
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert max_running == {"sw1": 2, "sw2": 2}
+
+
+def test_get_target_loads_targets_in_parallel(parse_connectivity_request_service):
+    """Slow loading of one target doesn't block others, the same target loads once."""
+    slow_started = threading.Event()
+    release_slow = threading.Event()
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_target(self, target_name):
+            loaded.append(target_name)
+            if target_name == "slow":
+                slow_started.set()
+                assert release_slow.wait(5)
+            return f"target {target_name}"
+
+    cf = Flow(parse_connectivity_request_service)
+    assert cf.get_target("cached") == "target cached"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        slow_futures = [executor.submit(cf.get_target, "slow") for _ in range(2)]
+        assert slow_started.wait(5)
+        # the slow target is loading, others are not blocked
+        assert executor.submit(cf.get_target, "fast").result(5) == "target fast"
+        assert executor.submit(cf.get_target, "cached").result(5) == "target cached"
+        release_slow.set()
+        assert [f.result(5) for f in slow_futures] == ["target slow"] * 2
+
+    assert sorted(loaded) == ["cached", "fast", "slow"]
+
+
+def test_get_target_failed_loading_is_not_cached(parse_connectivity_request_service):
+    is_fail = [True, False]
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_target(self, target_name):
+            if is_fail.pop(0):
+                raise ValueError("failed to load")
+            return "target"
+
+    cf = Flow(parse_connectivity_request_service)
+    with pytest.raises(ValueError, match="failed to load"):
+        cf.get_target("name")
+    assert cf.get_target("name") == "target"
+
+
+def test_target_cache_shared_between_requests(parse_connectivity_request_service):
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_target(self, target_name):
+            loaded.append(target_name)
+            return f"target {target_name}"
+
+    cache = TargetCache()
+    for _ in range(2):
+        cf = Flow(parse_connectivity_request_service, target_cache=cache)
+        resp_str = cf.apply_connectivity(create_request(create_net_ad()))
+        check_successful_result(get_one_result(resp_str), get_one_action(cf))
+
+    assert loaded == [DEFAULT_TARGET]
+    assert cache.misses == 1
+    assert cache.hits == 1
+
+
+def test_prefetch_targets_with_load_targets(parse_connectivity_request_service):
+    load_targets_calls = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_targets(self, target_names):
+            load_targets_calls.append(set(target_names))
+            return {name: f"target {name}" for name in target_names}
+
+        def load_target(self, target_name):
+            raise AssertionError("shouldn't be called")
+
+    ads = [
+        create_net_ad(target="sw1/Port1", vlan_id="10"),
+        create_net_ad(target="sw1/Port1", vlan_id="11"),
+        create_net_ad(target="sw2/Port1", vlan_id="10"),
+    ]
+    cf = Flow(parse_connectivity_request_service)
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert load_targets_calls == [{"sw1/Port1", "sw2/Port1"}]
+
+
+def test_prefetch_targets_loads_every_target_once(parse_connectivity_request_service):
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_target(self, target_name):
+            loaded.append(target_name)
+            return f"target {target_name}"
+
+    ads = [
+        create_net_ad(target="sw1/Port1", vlan_id="10"),
+        create_net_ad(target="sw1/Port1", vlan_id="11", set_vlan=False),
+        create_net_ad(target="sw2/Port1", vlan_id="10"),
+    ]
+    cf = Flow(parse_connectivity_request_service)
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert sorted(loaded) == ["sw1/Port1", "sw2/Port1"]
+
+
+def test_prefetch_targets_failed(parse_connectivity_request_service):
+    """Failed bulk loading falls back to loading targets one by one."""
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_targets(self, target_names):
+            raise ValueError("failed to load")
+
+        def load_target(self, target_name):
+            loaded.append(target_name)
+            return f"target {target_name}"
+
+    cf = Flow(parse_connectivity_request_service)
+    resp_str = cf.apply_connectivity(create_request(create_net_ad()))
+
+    check_successful_result(get_one_result(resp_str), get_one_action(cf))
+    assert loaded == [DEFAULT_TARGET]
+
+
+def test_prefetch_targets_skipped_without_load_target(connectivity_flow):
+    with patch.object(ConnectivityFlow, "_prefetch_target") as prefetch_mock:
+        resp_str = connectivity_flow.apply_connectivity(create_request(create_net_ad()))
+
+    check_successful_result(get_one_result(resp_str), get_one_action(connectivity_flow))
+    prefetch_mock.assert_not_called()
+
+
+@pytest.mark.parametrize("pipeline_targets", (False, True), ids=("phases", "pipeline"))
+def test_prefetch_target_failed_is_not_loaded_again(
+    parse_connectivity_request_service, pipeline_targets, caplog
+):
+    loaded = []
+
+    @define
+    class Flow(ConnectivityFlow):
+        def load_target(self, target_name):
+            loaded.append(target_name)
+            raise ValueError("fail")
+
+    ads = [create_net_ad(vlan_id="10"), create_net_ad(vlan_id="11", set_vlan=False)]
+    cf = Flow(parse_connectivity_request_service, pipeline_targets=pipeline_targets)
+    with pytest.raises(ValueError, match="fail"):
+        cf.apply_connectivity(create_request(*ads))
+
+    assert loaded == [DEFAULT_TARGET]
+    assert f"Failed to prefetch target {DEFAULT_TARGET}" in caplog.text
+
+
+def test_pipeline_targets_slow_remove_does_not_hold_up_other_targets(
+    parse_connectivity_request_service,
+):
+    release_slow = threading.Event()
+
+    @define
+    class Flow(ConnectivityFlow):
+        def remove_vlan(self, action, target):
+            if action.action_target.name == "sw1/Port1":
+                assert release_slow.wait(5)
+            return super().remove_vlan(action, target)
+
+        def set_vlan(self, action, target):
+            if action.action_target.name == "sw2/Port1":
+                # sw1 is still removing VLAN
+                release_slow.set()
+            return super().set_vlan(action, target)
+
+    ads = [
+        create_net_ad(target="sw1/Port1", vlan_id="10", set_vlan=False),
+        create_net_ad(target="sw1/Port1", vlan_id="11"),
+        create_net_ad(target="sw2/Port1", vlan_id="10"),
+    ]
+    cf = Flow(parse_connectivity_request_service, pipeline_targets=True)
+    resp_str = cf.apply_connectivity(create_request(*ads))
+
+    for result, action in zip(get_results(resp_str, *ads), get_actions(cf, *ads)):
+        check_successful_result(result, action)
+    assert release_slow.is_set()
+    remove_sw1, set_sw1, set_sw2 = get_actions(cf, *ads)
+    sw1_calls = [c for c in cf.manager.mock_calls if c.args[0] in (remove_sw1, set_sw1)]
+    assert sw1_calls == [
+        call.clear(set_sw1, None),
+        call.remove_vlan(remove_sw1, None),
+        call.set_vlan(set_sw1, None),
+    ]
+
+
+def test_ordered_results_are_identical(parse_connectivity_request_service):
+    """Sub actions finish in random order, the response is the same."""
+
+    @define
+    class Flow(ConnectivityFlow):
+        def set_vlan(self, action, target):
+            time.sleep(random.random() / 100)
+            super().set_vlan(action, target)
+            return f"{action.action_target.name}.{action.connection_params.vlan_id}"
+
+    ads = (
+        create_net_ad(vlan_id="10-30", mode=ConnectionModeEnum.TRUNK),
+        create_net_ad(vlan_id="40-45", mode=ConnectionModeEnum.TRUNK),
+    )
+    request = create_request(*ads)
+    responses = {
+        Flow(
+            parse_connectivity_request_service, ordered_results=True
+        ).apply_connectivity(request)
+        for _ in range(3)
+    }
+
+    assert len(responses) == 1
+    result1, result2 = get_results(responses.pop(), *ads)
+    assert result1.infoMessage == "\n".join(
+        f"setVlan {vlan} applied successfully" for vlan in range(10, 31)
+    )
+    assert result2.infoMessage == "\n".join(
+        f"setVlan {vlan} applied successfully" for vlan in range(40, 46)
+    )
+    # clear for the target is executed with the last sub action
+    ifaces = [f"{DEFAULT_TARGET}.{vlan}" for vlan in range(10, 31)]
+    ifaces.insert(-1, DEFAULT_TARGET)
+    assert result1.updatedInterface == ";".join(ifaces)
+
+
+def test_prefetch_targets_for_batches(batch_connectivity_flow):
+    """Devices are loaded for batches, ports only for set actions to clear them."""
+    cf = batch_connectivity_flow
+    loaded_targets = []
+
+    def load_target(target_name):
+        loaded_targets.append(target_name)
+        return f"device {target_name}"
+
+    cf.load_target = load_target
+    ads = (
+        create_net_ad(set_vlan=True, target="sw1/1/1"),
+        create_net_ad(set_vlan=False, target="sw1/1/3"),
+        create_net_ad(set_vlan=False, target="sw1/1/4"),
+    )
+
+    cf.apply_connectivity(create_request(*ads))
+
+    assert sorted(loaded_targets) == ["sw1", "sw1/1/1"]
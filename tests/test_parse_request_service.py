@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import io
 import json
 from collections.abc import Collection
+from unittest.mock import patch
 
 import pytest
 
+from cloudshell.shell.flows.connectivity.exceptions import VLANHandlerException
 from cloudshell.shell.flows.connectivity.helpers.dict_action_helpers import (
+    _build_index,
     set_val_to_list_attrs,
 )
 from cloudshell.shell.flows.connectivity.helpers.vlan_helper import (
     VirtualNetworkDeprecated,
 )
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    ConnectionModeEnum,
     ConnectivityActionModel,
 )
 from cloudshell.shell.flows.connectivity.parse_request_service import (
@@ -176,3 +181,109 @@ def test_vlan_manual_existing_network(service):
     assert action.connection_params.vlan_service_attrs.vlan_id == "10"
     assert action.connection_params.vlan_service_attrs.virtual_network == ""
     assert action.connection_params.vlan_service_attrs.existing_network == "test"
+
+
+def test_iterate_actions_is_lazy(service):
+    valid_ad = create_cp_ad(vlan_id="10-11", mode=ConnectionModeEnum.TRUNK)
+    broken_ad = create_cp_ad(vlan_id="5000")
+    request = create_request(valid_ad, broken_ad)
+
+    actions = service.iterate_actions(request)
+
+    first, second = next(actions), next(actions)
+    assert first.connection_params.vlan_id == "10"
+    assert second.connection_params.vlan_id == "11"
+    with pytest.raises(VLANHandlerException, match="Wrong VLAN detected 5000"):
+        next(actions)
+
+
+def test_iterate_actions_split_all_in_one_pass(service):
+    ad = create_cp_ad(vlan_id="10-11", mode=ConnectionModeEnum.TRUNK, vnic="1,2")
+    request = create_request(ad)
+
+    actions = list(service.iterate_actions(request))
+
+    assert [
+        (a.connection_params.vlan_id, a.custom_action_attrs.vnic) for a in actions
+    ] == [
+        ("10", "1"),
+        ("10", "2"),
+        ("11", "1"),
+        ("11", "2"),
+    ]
+    assert actions == service.get_actions(request)
+
+
+def test_get_actions_validates_each_action_once(service):
+    ad1 = create_cp_ad(vlan_id="10-12", mode=ConnectionModeEnum.TRUNK, vnic="1,2")
+    ad2 = create_cp_ad(vlan_id="20")
+    request = create_request(ad1, ad2)
+    parse_obj = ConnectivityActionModel.parse_obj
+
+    with patch.object(
+        ConnectivityActionModel, "parse_obj", side_effect=parse_obj
+    ) as parse_mock:
+        actions = service.get_actions(request)
+
+    assert len(actions) == 7
+    assert parse_mock.call_count == len(actions)
+
+
+def test_iterate_actions_indexes_each_list_of_attrs_once(service):
+    ad1 = create_cp_ad(vlan_id="10-12", mode=ConnectionModeEnum.TRUNK, vnic="1,2")
+    ad2 = create_cp_ad(vlan_id="20")
+    request = create_request(ad1, ad2)
+
+    with patch(
+        "cloudshell.shell.flows.connectivity.helpers.dict_action_helpers."
+        "_build_index",
+        side_effect=_build_index,
+    ) as build_mock:
+        actions = list(service.iterate_actions(request))
+
+    assert len(actions) == 7
+    # vlan service, custom action and connector attributes of each raw action
+    assert build_mock.call_count == 3 * 2
+
+
+@pytest.mark.parametrize(
+    ("normalize", "expected_vlans"),
+    ((False, ["10-20", "15-25", "26"]), (True, ["10-26"])),
+)
+def test_normalize_vlan_ranges(normalize, expected_vlans):
+    service = ParseConnectivityRequestService(
+        is_vlan_range_supported=True,
+        is_multi_vlan_supported=False,
+        normalize_vlan_ranges=normalize,
+    )
+    ad = create_cp_ad(vlan_id="10-20,15-25,26", mode=ConnectionModeEnum.TRUNK)
+    request = create_request(ad)
+
+    actions = service.get_actions(request)
+
+    assert [a.connection_params.vlan_id for a in actions] == expected_vlans
+    assert [a.connection_params.vlan_service_attrs.vlan_id for a in actions] == (
+        expected_vlans
+    )
+
+
+@pytest.mark.parametrize("as_file", (False, True))
+def test_incremental_parsing(as_file):
+    request = create_request(
+        create_cp_ad(vlan_id="10-12", vnic="1,2", mode=ConnectionModeEnum.TRUNK),
+        create_cp_ad(set_vlan=False),
+    )
+    service = ParseConnectivityRequestService(
+        is_vlan_range_supported=False, is_multi_vlan_supported=False
+    )
+    incremental_service = ParseConnectivityRequestService(
+        is_vlan_range_supported=False,
+        is_multi_vlan_supported=False,
+        incremental_parsing=True,
+    )
+
+    source = io.BytesIO(request.encode()) if as_file else request
+    actions = incremental_service.get_actions(source)
+
+    assert len(actions) == 7
+    assert actions == service.get_actions(request)
@@ -1,9 +1,13 @@
 import json
 from copy import deepcopy
+from unittest.mock import Mock
 
 import pytest
 
-from cloudshell.shell.flows.connectivity.exceptions import ApplyConnectivityException
+from cloudshell.shell.flows.connectivity.exceptions import (
+    ApplyConnectivityException,
+    VLANHandlerException,
+)
 from cloudshell.shell.flows.connectivity.models.connectivity_model import (
     ConnectivityActionModel,
 )
@@ -11,6 +15,7 @@ from cloudshell.shell.flows.connectivity.models.driver_response import (
     ConnectivityActionResult,
 )
 from cloudshell.shell.flows.connectivity.simple_flow import apply_connectivity_changes
+from tests.base import create_net_ad, create_request
 
 
 def _add_vlan_action(action: ConnectivityActionModel) -> ConnectivityActionResult:
@@ -62,3 +67,14 @@ def test_apply_connectivity_changes(action_request):
 def test_apply_connectivity_changes_without_request():
     with pytest.raises(ApplyConnectivityException, match="Request is None or empty"):
         apply_connectivity_changes("", _add_vlan_action, _remove_vlan_action)
+
+
+def test_apply_connectivity_changes_validates_all_actions_first():
+    """Nothing is applied if any action of the request is invalid."""
+    add_vlan_action = Mock(side_effect=_add_vlan_action)
+    request = create_request(create_net_ad(vlan_id="10"), create_net_ad(vlan_id="5000"))
+
+    with pytest.raises(VLANHandlerException, match="Wrong VLAN detected 5000"):
+        apply_connectivity_changes(request, add_vlan_action, _remove_vlan_action)
+
+    add_vlan_action.assert_not_called()